@@ -8,6 +8,7 @@
 
 import bpy
 from math import radians
+from image_cache import cache
   
 # initializes the world texture nodes necessary to load an HDRI image with set_background_image()
 # only needs to be called once  
@@ -24,17 +25,24 @@ def initialize_world_texture() -> None:
     node_tree.links.new(texture_coordinates_node.outputs["Generated"], mapping_node.inputs["Vector"])
     node_tree.links.new(mapping_node.outputs["Vector"], environment_texture_node.inputs["Vector"])
     
-# sets the background image to image specified by hdri_path    
+# sets the background image to image specified by hdri_path
+# images loaded before are taken from the image cache
 def set_background_image(hdri_path: str) -> None:
+    use_background_image(cache.get(hdri_path))
+
+# sets an image which is already loaded as background
+def use_background_image(image: bpy.types.Image) -> None:
     world = bpy.data.worlds["World"]
     environment_texture_node = world.node_tree.nodes["Environment Texture"]
     background_node = world.node_tree.nodes["Background"]
     
     world.node_tree.links.new(environment_texture_node.outputs["Color"], background_node.inputs["Color"])
-    environment_texture_node.image = bpy.data.images.load(bpy.path.relpath(hdri_path))
+    environment_texture_node.image = image
 
 # removes the background image
-def remove_background_image() -> None:
+# keep_image: only unlink it, e.g. because it is used again later (the image cache
+# removes it once it needs the memory)
+def remove_background_image(keep_image: bool = False) -> None:
     world = bpy.data.worlds["World"]
     environment_texture_node = world.node_tree.nodes["Environment Texture"]
     if environment_texture_node.outputs["Color"].links:
@@ -42,7 +50,10 @@ def remove_background_image() -> None:
         world.node_tree.links.remove(link)
     
     image = world.node_tree.nodes["Environment Texture"].image
-    bpy.data.images.remove(image, do_unlink=True)
+    if keep_image:
+        world.node_tree.nodes["Environment Texture"].image = None
+    else:
+        bpy.data.images.remove(image, do_unlink=True)
 
 # rotates background image around global Z axis
 # angle: degree, image moves to the right if positive
@@ -0,0 +1,158 @@
+# created on: 17/10/2026
+
+# description:
+# Reader for Radiance .hdr files (RGBE pixels, flat or run-length encoded scanlines)
+# with NumPy only, so thumbnails and previews of HDRIs are made in memory, without
+# Blender, temporary files or image datablocks. Imports no bpy, it can run in any process.
+# The file is memory-mapped. Only the run headers of the RLE scanlines are walked in
+# Python, the bytes are gathered with one index array per band of scanlines.
+
+import mmap
+import numpy as np
+from PIL import Image, ImageOps
+
+BAND_ROWS = 64   # scanlines gathered at once, bounds the memory of the index arrays
+
+# Pixels of a .hdr file as float32 array (height, width, 3), top row first
+def read_hdr(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            width, height, flip_y, flip_x, offset = read_header(data)
+            rgbe = decode_pixels(data, offset, width, height)
+    rgb = rgbe_to_float(rgbe)
+    if flip_y:
+        rgb = rgb[::-1]
+    if flip_x:
+        rgb = rgb[:, ::-1]
+    return np.ascontiguousarray(rgb)
+
+# Returns (width, height, flip_y, flip_x, offset of the pixel data)
+def read_header(data) -> tuple:
+    pos = 0
+    first = True
+    while True:
+        end = data.find(b"\n", pos)
+        if end < 0:
+            raise ValueError("Truncated Radiance header")
+        line = bytes(data[pos:end]).strip()
+        pos = end + 1
+        if first and not line.startswith(b"#?"):
+            raise ValueError("Not a Radiance file")
+        first = False
+        if line.startswith(b"FORMAT=") and line != b"FORMAT=32-bit_rle_rgbe":
+            raise ValueError("Unsupported Radiance format " + line[7:].decode(errors="replace"))
+        if not line:
+            break
+    end = data.find(b"\n", pos)
+    if end < 0:
+        raise ValueError("Missing Radiance resolution")
+    parts = bytes(data[pos:end]).split()
+    if len(parts) != 4 or parts[0][1:] != b"Y" or parts[2][1:] != b"X":
+        raise ValueError("Unsupported Radiance orientation " + b" ".join(parts).decode(errors="replace"))
+    height, width = int(parts[1]), int(parts[3])
+    return width, height, parts[0][:1] == b"+", parts[2][:1] == b"-", end + 1
+
+# RGBE bytes as uint8 array (height, width, 4)
+# Errors are raised before a NumPy view of data exists, it would keep the map from closing
+def decode_pixels(data, offset: int, width: int, height: int) -> np.ndarray:
+    # scanlines of RLE files start with 2, 2 and the width, others are flat
+    if width < 8 or width > 0x7fff or not is_rle_scanline(data, offset, width):
+        size = width * height * 4
+        if len(data) < offset + size:
+            raise ValueError("Truncated Radiance pixel data")
+        return np.frombuffer(data, dtype=np.uint8, count=size, offset=offset).reshape(height, width, 4).copy()
+
+    rgbe = np.empty((height, width, 4), dtype=np.uint8)
+    pos = offset
+    try:
+        for band in range(0, height, BAND_ROWS):
+            pos = decode_band(data, pos, width, band, min(BAND_ROWS, height - band), rgbe)
+    except IndexError:
+        raise ValueError("Truncated Radiance pixel data")
+    return rgbe
+
+# Decode rows scanlines starting at pos into rgbe[band:band + rows], returns the position after them
+def decode_band(data, pos: int, width: int, band: int, rows: int, rgbe: np.ndarray) -> int:
+    sources, lengths, steps = [], [], []
+    for y in range(band, band + rows):
+        if not is_rle_scanline(data, pos, width):
+            raise ValueError(f"Broken RLE scanline {y}")
+        pos += 4
+        # the four components of a scanline one after another, each in runs of
+        # 128 + n: the next byte n times, n <= 128: n literal bytes
+        for _ in range(4):
+            filled = 0
+            while filled < width:
+                count = data[pos]
+                if count > 128:
+                    count -= 128
+                    sources.append(pos + 1)
+                    steps.append(0)
+                    pos += 2
+                else:
+                    sources.append(pos + 1)
+                    steps.append(1)
+                    pos += 1 + count
+                if count == 0 or filled + count > width:
+                    raise ValueError(f"Broken RLE run in scanline {y}")
+                lengths.append(count)
+                filled += count
+    if pos > len(data):
+        raise ValueError("Truncated Radiance pixel data")
+    buf = np.frombuffer(data, dtype=np.uint8)
+    lengths = np.array(lengths, dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    offsets = np.arange(rows * 4 * width, dtype=np.int64) - np.repeat(starts, lengths)
+    index = np.repeat(np.array(sources, dtype=np.int64), lengths) \
+        + offsets * np.repeat(np.array(steps, dtype=np.int64), lengths)
+    planar = buf[index].reshape(rows, 4, width)
+    rgbe[band:band + rows] = planar.transpose(0, 2, 1)
+    return pos
+
+def is_rle_scanline(data, pos: int, width: int) -> bool:
+    return pos + 4 <= len(data) and data[pos] == 2 and data[pos + 1] == 2 \
+        and (data[pos + 2] << 8 | data[pos + 3]) == width
+
+# value = (byte + 0.5) * 2^(exponent - 136), exponent 0 is black
+def rgbe_to_float(rgbe: np.ndarray) -> np.ndarray:
+    exponent = rgbe[..., 3].astype(np.int32)
+    scale = np.where(exponent > 0, np.ldexp(np.float32(1), exponent - 136), 0).astype(np.float32)
+    return (rgbe[..., :3].astype(np.float32) + 0.5) * scale[..., None]
+
+# Average blocks of factor x factor pixels, the edges which don't fill a block are dropped
+def downsample(rgb: np.ndarray, factor: int) -> np.ndarray:
+    if factor <= 1:
+        return rgb
+    height, width = rgb.shape[0] // factor, rgb.shape[1] // factor
+    blocks = rgb[:height * factor, :width * factor].reshape(height, factor, width, factor, 3)
+    return blocks.mean(axis=(1, 3))
+
+# Global Reinhard operator, the log average luminance is mapped to key, then sRGB encoded
+# Returns uint8 array (height, width, 3)
+def tone_map(rgb: np.ndarray, key: float = 0.18) -> np.ndarray:
+    luminance = rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+    log_average = float(np.exp(np.mean(np.log(1e-6 + luminance))))
+    scaled = rgb * (key / log_average)
+    mapped = scaled / (1 + scaled)
+    srgb = np.where(mapped <= 0.0031308, 12.92 * mapped, 1.055 * np.power(mapped, 1 / 2.4) - 0.055)
+    return (np.clip(srgb, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+# Tone mapped image of the HDRI at most max_width pixels wide
+def preview_image(path: str, max_width: int = 512) -> Image.Image:
+    rgb = read_hdr(path)
+    rgb = downsample(rgb, rgb.shape[1] // max_width)
+    image = Image.fromarray(tone_map(rgb), "RGB")
+    if image.width > max_width:
+        image = image.resize((max_width, max(1, round(image.height * max_width / image.width))), Image.LANCZOS)
+    return image
+
+# Square gallery thumbnail, the same part of the panorama utils.generate_hdri_thumbnail shows
+def hdri_thumbnail(path: str, size: int = 256) -> Image.Image:
+    image = preview_image(path, 4 * size)
+    h = image.height
+    crop_factor = h / 5
+    cropped = image.crop((0, crop_factor, h - 2 * crop_factor, h - crop_factor))
+    return ImageOps.fit(cropped, (size, size), Image.LANCZOS)
+
+def save_thumbnail(path: str, output: str, size: int = 256) -> None:
+    hdri_thumbnail(path, size).save(output, "PNG")
@@ -1,12 +1,13 @@
 import bpy
+from image_cache import cache
 
-#import the Texture image
+#import the Texture image, images loaded before are taken from the image cache
 def load_texture(texture_path: str, material: bpy.types.Material):
   if material.node_tree.nodes.get("Image Texture") is None:
     texImage = material.node_tree.nodes.new(type = "ShaderNodeTexImage")
   else:
     texImage = material.node_tree.nodes.get("Image Texture")
-  texImage.image = bpy.data.images.load(bpy.path.relpath(texture_path))
+  texImage.image = cache.get(texture_path)
   
   #disp is path of Base color
   disp=material.node_tree.nodes["Principled BSDF"].inputs["Base Color"]
@@ -0,0 +1,125 @@
+# created on: 17/10/2026
+
+# description:
+# Renders every model of a directory with the same scene spec. The scene is set up
+# once and only the mesh is swapped per model, either in this process or in a fixed
+# pool of warm worker processes (engine/worker.py). Results are reported as soon as
+# each model is finished, a csv timing report can be written at the end.
+
+from dataclasses import dataclass, asdict
+import typing as t
+import copy
+import csv
+import os
+import queue
+import threading
+import time
+
+from batch.spec import SceneSpec
+
+MODEL_EXTENSIONS = (".ply", ".stl", ".obj")
+
+@dataclass
+class ModelResult:
+    name: str
+    output: str
+    setup: float = 0    # seconds to swap the model and apply the spec
+    render: float = 0   # seconds rendering
+    total: float = 0    # seconds from starting the model until its result arrived
+    worker: str = ""
+    error: str = ""
+
+def find_models(directory: str) -> t.List[str]:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(MODEL_EXTENSIONS))
+
+# One spec per model, template decides everything else, outputs are named after the models
+def catalog_specs(template: SceneSpec, models: t.List[str], out_dir: str) -> t.List[SceneSpec]:
+    if template.views is not None:
+        extension = ""   # a directory per model
+    elif template.is_animation():
+        extension = ".avi"
+    else:
+        extension = ".png"
+    specs = []
+    for model in models:
+        name = os.path.splitext(os.path.basename(model))[0]
+        spec = copy.deepcopy(template)
+        spec.model = model
+        spec.name = name
+        spec.output.path = os.path.join(out_dir, name + extension)
+        specs.append(spec)
+    return specs
+
+# Render all specs in a single warm scene of this process
+def render_in_session(specs: t.List[SceneSpec], on_result) -> t.List[ModelResult]:
+    from batch.scene import BatchScene
+    scene = BatchScene()
+    results = []
+    for spec in specs:
+        result = ModelResult(spec.name, spec.output.path, worker="main")
+        start = time.monotonic()
+        try:
+            result.__dict__.update(scene.render(spec))
+        except Exception as e:
+            result.error = str(e)
+        result.total = time.monotonic() - start
+        results.append(result)
+        on_result(result)
+    return results
+
+# Render the specs with a fixed number of warm worker processes, each takes the next
+# spec when it is done. on_result is called on the calling thread in order of completion
+def render_in_pool(specs: t.List[SceneSpec], workers: int, on_result) -> t.List[ModelResult]:
+    from engine.client import RenderEngine
+    todo = queue.Queue()
+    for spec in specs:
+        todo.put(spec)
+    done = queue.Queue()
+
+    def work(engine: RenderEngine):
+        while True:
+            try:
+                spec = todo.get_nowait()
+            except queue.Empty:
+                return
+            result = ModelResult(spec.name, spec.output.path, worker=engine.name)
+            start = time.monotonic()
+            try:
+                result.__dict__.update(engine.call("batch", spec=asdict(spec)))
+            except Exception as e:
+                result.error = str(e).strip().splitlines()[-1]
+            result.total = time.monotonic() - start
+            done.put(result)
+
+    engines = [RenderEngine(f"batch {i + 1}") for i in range(workers)]
+    threads = [threading.Thread(target=work, args=(engine,), daemon=True) for engine in engines]
+    try:
+        for thread in threads:
+            thread.start()
+        results = []
+        while len(results) < len(specs):
+            result = done.get()
+            results.append(result)
+            on_result(result)
+    finally:
+        for engine in engines:
+            engine.shutdown()
+    return results
+
+def write_report(path: str, results: t.List[ModelResult]) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(asdict(results[0]).keys()) if results else ["name"])
+        writer.writeheader()
+        for result in results:
+            writer.writerow(asdict(result))
+
+def summarize(results: t.List[ModelResult], wall_seconds: float) -> str:
+    ok = [r for r in results if not r.error]
+    if not ok:
+        return f"No model rendered successfully ({len(results)} failed)"
+    setup  = sum(r.setup for r in ok) / len(ok)
+    render = sum(r.render for r in ok) / len(ok)
+    return (f"Rendered {len(ok)} of {len(results)} models in {wall_seconds:.1f} s, "
+            f"per model: {setup:.2f} s setup, {render:.2f} s render, "
+            f"{wall_seconds / len(results):.2f} s wall time")
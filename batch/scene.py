@@ -0,0 +1,233 @@
+# created on: 17/10/2026
+
+# description:
+# Builds and renders the scene described by a SceneSpec without any GUI, using the
+# same building blocks as the program (OrbitCam, Renderer, MaterialController,
+# lights, HDRI). The scene is set up once, every spec then only changes what differs.
+
+import os
+import time
+import bpy
+
+import utils
+import HDRI.hdri as hdri
+from camera_animation import camera_animation_module as cammod
+from materials.materials import MaterialController
+from Texture import load_texture, delete_texture
+from Vertex import load_vertex, delete_vertex
+from Lightning.light_functions import day_light, night_light, lantern_light, create_default_light
+from Lightning.light_functions import day_night_cycle, delete_all_lights, lights_enabled
+from batch.spec import SceneSpec
+from image_cache import cache as image_cache
+
+# Same constants as the lighting panel
+TIME_TO_ANGLE_CONSTANT = 15
+HIGH_OF_LATERN_LIGHT = 2
+STARTING_TIME_OF_DAY = 6
+
+class BatchScene:
+    def __init__(self):
+        utils.clear_scene()
+        self.camera = utils.OrbitCam()
+        self.renderer = utils.Renderer(self.camera.camera, 0, (16, 9))
+        hdri.initialize_world_texture()
+        self.material = MaterialController()
+        self.animation_camera = None
+        self.model = None
+        self.model_path = None
+        self.hdri_path = None
+        self.warm_models = {}   # path -> hidden object, see preload
+
+    # Load models and HDRIs ahead, specs using them later only switch to them
+    # The models stay in the scene, hidden from the render while they are not used,
+    # the HDRIs are decoded and pinned in the image cache
+    def preload(self, models: list = (), hdris: list = ()) -> None:
+        for path in map(os.path.abspath, models):
+            if path not in self.warm_models:
+                obj = utils.import_mesh(path)
+                obj.hide_render = True
+                self.warm_models[path] = obj
+        for path in map(os.path.abspath, hdris):
+            image_cache.load(path, pin=True)
+
+    # Change the scene to match spec
+    def apply(self, spec: SceneSpec) -> None:
+        self.set_model(spec.model)
+        self.set_material(spec)
+        self.set_background(spec)
+        self.set_light(spec)
+        self.set_camera(spec)
+        self.set_frames(spec)
+        self.set_output(spec)
+
+    # Import the model, kept if the same one is used again
+    def set_model(self, path: str) -> None:
+        path = os.path.abspath(path)
+        if path == self.model_path:
+            return
+        if self.model is not None:
+            if self.model_path in self.warm_models:
+                self.model.hide_render = True
+            else:
+                # the mesh data would pile up over thousands of models
+                mesh = self.model.data
+                utils.remove_object(self.model)
+                if mesh.users == 0:
+                    bpy.data.meshes.remove(mesh)
+            self.model = None
+            self.model_path = None
+            # the solidify modifier belonged to the previous object
+            self.material.solidify = None
+        if path in self.warm_models:
+            self.model = self.warm_models[path]
+            self.model.hide_render = False
+            self.material.solidify = self.model.modifiers.get("Solidify")
+        else:
+            self.model = utils.import_mesh(path)
+        self.model_path = path
+        self.material.apply_material(self.model)
+        self.renderer.invalidate_geometry()
+
+    def set_material(self, spec: SceneSpec) -> None:
+        m = spec.material
+        was_solidified = self.material.is_solidified()
+        self.material.set_solidified(self.model, False)
+        match m.preset:
+            case "glass":
+                self.material.glass_material()
+            case "thick glass":
+                self.material.thick_glass(self.model)
+            case "stone":
+                self.material.stone_material()
+            case "emissive":
+                self.material.emissive_material()
+            case "water":
+                self.material.water_material()
+            case "gold":
+                self.material.gold_material()
+            case _:
+                self.material.default_material()
+        if m.color is not None:
+            self.material.set_color(tuple(m.color) if len(m.color) == 4 else (*m.color, 1))
+        overrides = {key: getattr(m, key) for key in ("metallic", "roughness", "transmission",
+                                                       "emissive", "strength", "glow")
+                     if getattr(m, key) is not None}
+        if overrides:
+            overrides["bump"] = self.material.noise.is_enabled
+            self.material.material_preset(**overrides)
+        if self.material.is_solidified() != was_solidified:
+            self.renderer.invalidate_geometry()
+
+        # texture and vertex colors both drive the base color, like in the program
+        delete_vertex(self.material.material)
+        if self.material.bsdf.inputs["Base Color"].links:
+            delete_texture(self.material.material)
+        if spec.texture is not None:
+            load_texture(spec.texture, self.material.material)
+        elif spec.vertex_colors:
+            load_vertex(self.model, self.material.material)
+            self.renderer.invalidate_geometry()
+
+    def set_background(self, spec: SceneSpec) -> None:
+        b = spec.background
+        path = None if b.hdri is None else os.path.abspath(b.hdri)
+        if path != self.hdri_path:
+            if self.hdri_path is not None:
+                hdri.remove_background_image(keep_image=True)
+            if path is not None:
+                hdri.set_background_image(path)
+            self.hdri_path = path
+        hdri.set_background_brightness(b.strength)
+        mapping = bpy.data.worlds["World"].node_tree.nodes["Mapping"]
+        mapping.inputs["Rotation"].default_value[2] = 0
+        hdri.pan_background_horizontal(b.pan)
+
+    def set_light(self, spec: SceneSpec) -> None:
+        light = spec.light
+        angle = light.time * TIME_TO_ANGLE_CONSTANT
+        if light.preset == "off":
+            lights_enabled(False)
+            return
+        lights_enabled(True)
+        delete_all_lights()
+        match light.preset:
+            case "day":
+                day_light(light.brightness, angle, False, self.camera)
+            case "night":
+                night_light(light.brightness, angle, True, self.camera)
+            case "lantern":
+                lantern_light(light.brightness, HIGH_OF_LATERN_LIGHT, True, self.camera)
+            case "day_night":
+                day_night_cycle(light.time + STARTING_TIME_OF_DAY, light.brightness, True, self.camera, 3)
+            case _:
+                create_default_light()
+
+    def set_camera(self, spec: SceneSpec) -> None:
+        c = spec.camera
+        self.camera.reset_position()
+        self.camera.rotate_z(c.orbit[0])
+        self.camera.rotate_x(c.orbit[1])
+        if c.distance is not None:
+            self.camera.set_distance(c.distance)
+
+        if c.animation is None:
+            self.renderer.set_camera(self.camera.camera)
+            return
+        if self.animation_camera is None:
+            self.animation_camera = cammod.Camera("cam1", 5, 0, 0)
+        self.animation_camera.remove_keyframes()
+        getattr(self.animation_camera, c.animation.replace("preset", "preset_"))(self.animation_length(spec))
+        self.animation_camera.set_handles("AUTO")
+        self.animation_camera.set_mode("track" if c.track else "free", self.model)
+        self.renderer.set_camera(self.animation_camera.cam)
+
+    # Frames of the active animations, like utils.FrameControl
+    def animation_length(self, spec: SceneSpec) -> int:
+        if spec.animation is not None and spec.animation.frame_end is not None:
+            return spec.animation.frame_end
+        lengths = [utils.Animation.DEFAULT.value]
+        if spec.light.preset == "day_night":
+            lengths.append(utils.Animation.DAYNIGHT.value)
+        return max(lengths)
+
+    def set_frames(self, spec: SceneSpec) -> None:
+        scene = self.renderer.scene
+        if spec.animation is not None:
+            scene.frame_start = spec.animation.frame_start
+            scene.frame_end = self.animation_length(spec)
+        scene.frame_set(scene.frame_start)
+
+    def set_output(self, spec: SceneSpec) -> None:
+        o = spec.output
+        self.renderer.set_time_limit(o.time_limit)
+        self.renderer.aspect = tuple(o.aspect)
+        if o.quality == "preview":
+            self.renderer.set_preview_render(file_path=o.path, use_transparent_bg=o.transparent,
+                                             num_samples=o.samples)
+            self.renderer.scene.render.filepath = o.path
+        else:
+            self.renderer.set_final_render(o.path, o.transparent, o.samples or 64)
+            self.renderer.scene.cycles.time_limit = o.time_limit
+        self.renderer.set_resolution(o.aspect[0], o.aspect[1], o.width)
+
+    # Apply spec and render it to its output path
+    # Returns the seconds spent on changing the scene ("setup") and on rendering ("render")
+    def render(self, spec: SceneSpec) -> dict:
+        start = time.monotonic()
+        self.apply(spec)
+        os.makedirs(os.path.dirname(os.path.abspath(spec.output.path)), exist_ok=True)
+        setup = time.monotonic() - start
+        if spec.views is not None:
+            self.render_views(spec)
+        else:
+            self.renderer.render(animation=spec.is_animation())
+        return {"setup": setup, "render": time.monotonic() - start - setup}
+
+    # Turntable: all views in one go, written to the output directory
+    def render_views(self, spec: SceneSpec) -> list:
+        v = spec.views
+        poses = utils.turntable_poses(v.count, v.elevations, v.start)
+        files = self.renderer.render_views(self.camera.get_controller(), poses, spec.output.path)
+        if v.contact_sheet:
+            utils.make_contact_sheet(files, os.path.join(spec.output.path, "contact_sheet.png"), v.columns)
+        return files
@@ -0,0 +1,385 @@
+# created on: 17/10/2026
+
+# description:
+# Render service, other programs send scene specs (see batch/spec.py) over HTTP and
+# get the rendered image or video back. Requests are queued and rendered by a fixed
+# pool of warm worker processes (engine/worker.py), each keeps a BatchScene with the
+# models of PATH_MODELS and the HDRIs of PATH_HDRI loaded. A request equal to one which
+# is still queued or rendering (same spec, format and input files) gets that job
+# instead of a new one.
+#
+#   POST   /renders               {"spec": {...}, "format": "png"} -> job, ?wait=SECONDS returns the result
+#   GET    /renders               all jobs
+#   GET    /renders/<id>          job
+#   GET    /renders/<id>/result   the image/video once the job is done
+#   DELETE /renders/<id>          cancel the job
+#   GET    /health                workers and queue length
+#
+# Model, texture and HDRI may be given by name, e.g. {"model": "monkey"}, they are
+# looked up in the asset directories then.
+
+from dataclasses import dataclass, field, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import typing as t
+import collections
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from PIL import Image
+
+from batch.spec import SceneSpec, SpecError
+from batch.catalog import find_models
+from engine.client import RenderEngine, EngineError, EngineCrashed
+from engine.jobs import JobStatus
+from gui.properties import PATH_MODELS, PATH_TEXTURES, PATH_HDRI
+
+HDRI_EXTENSIONS = (".hdr", ".exr")
+# format -> (content type, which specs can be rendered to it)
+FORMATS = {"png":  ("image/png", "image"),
+           "jpeg": ("image/jpeg", "image"),
+           "avi":  ("video/x-msvideo", "animation"),
+           "zip":  ("application/zip", "views")}
+
+@dataclass
+class ServiceJob:
+    spec: dict
+    format: str
+    key: str              # identifies equal requests
+    status: JobStatus = JobStatus.QUEUED
+    output: str = ""
+    error: str = ""
+    requests: int = 1     # how many requests were answered with this job
+    worker: str = ""
+    setup: float = 0
+    render: float = 0
+    created: float = field(default_factory=time.time)
+    started: float = 0
+    finished: float = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def to_dict(self):
+        dic = asdict(self)
+        dic["status"] = self.status.value
+        del dic["key"], dic["output"]
+        if self.status == JobStatus.DONE:
+            dic["result"] = f"/renders/{self.id}/result"
+        return dic
+
+# Asset given by name -> path in directory, paths are kept as they are
+def resolve_asset(value: str, directory: str, extensions: tuple) -> str:
+    if value is None or os.path.exists(value) or os.sep in value or "/" in value:
+        return value
+    for name in [value] + [value + ext for ext in extensions]:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return value
+
+def files_in(directory: str, extensions: tuple) -> t.List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(extensions))
+
+class RenderService:
+    MAX_QUEUED = 100        # further requests are refused until the queue got shorter
+    FINISHED_KEPT = 500     # finished jobs (and their results) kept for GET
+
+    # warm: load the models and HDRIs of the asset directories into every worker
+    def __init__(self, workers: int, out_dir: str, warm: bool = True):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self.warm_models = find_models(PATH_MODELS) if warm else []
+        self.warm_hdris = files_in(PATH_HDRI, HDRI_EXTENSIONS) if warm else []
+        self.engines = [RenderEngine(f"service {i + 1}") for i in range(max(1, workers))]
+        self.jobs = collections.OrderedDict()   # id -> ServiceJob, oldest first
+        self.queued = collections.deque()
+        self.in_flight = {}                     # key -> job which is queued or rendering
+        self.running = {}                       # job id -> engine
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.threads = [threading.Thread(target=self.__work, args=(engine,), daemon=True)
+                        for engine in self.engines]
+        for thread in self.threads:
+            thread.start()
+
+    # Queue a render, returns the job and whether it is shared with an earlier request
+    # Raises SpecError for an invalid request, OverflowError when the queue is full
+    def submit(self, spec: dict, format: str = "png") -> t.Tuple[ServiceJob, bool]:
+        spec = self.__normalize(spec, format)
+        key = self.__key(spec, format)
+        with self.condition:
+            job = self.in_flight.get(key)
+            if job is not None:
+                job.requests += 1
+                return job, True
+            if len(self.queued) >= self.MAX_QUEUED:
+                raise OverflowError(f"{len(self.queued)} renders are queued already")
+            job = ServiceJob(spec, format, key)
+            job.output = os.path.join(self.out_dir, f"{job.id}.{format}")
+            self.jobs[job.id] = job
+            self.in_flight[key] = job
+            self.queued.append(job)
+            self.__forget_old()
+            self.condition.notify_all()
+        return job, False
+
+    def get(self, job_id: str) -> ServiceJob:
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> t.List[ServiceJob]:
+        with self.condition:
+            return list(self.jobs.values())
+
+    # Wait until the job is finished or timeout seconds passed
+    def wait(self, job_id: str, timeout: float) -> ServiceJob:
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            job = self.jobs.get(job_id)
+            while job is not None and not job.is_finished() and time.monotonic() < deadline:
+                self.condition.wait(deadline - time.monotonic())
+            return job
+
+    # Cancelling a shared job cancels it for every request
+    def cancel(self, job_id: str) -> None:
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.is_finished():
+                return
+            if job in self.queued:
+                self.queued.remove(job)
+            self.__finish(job, JobStatus.CANCELLED)
+            engine = self.running.get(job_id)
+        if engine is not None:
+            engine.kill()
+
+    def health(self) -> dict:
+        with self.condition:
+            return {"workers": len(self.engines),
+                    "busy": len(self.running),
+                    "queued": len(self.queued),
+                    "warm_models": len(self.warm_models),
+                    "warm_hdris": len(self.warm_hdris)}
+
+    def shutdown(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        for engine in self.engines:
+            engine.kill()
+
+    # Validated spec as dictionary, with the asset paths resolved and the output set by the service
+    def __normalize(self, spec: dict, format: str) -> dict:
+        if format not in FORMATS:
+            raise SpecError(f"format: '{format}' is not one of {', '.join(FORMATS)}")
+        if not isinstance(spec, dict):
+            raise SpecError("spec: expected a mapping")
+        spec = json.loads(json.dumps(spec))   # private copy
+        if not spec.get("model"):
+            raise SpecError("model is missing")
+        spec["model"] = resolve_asset(spec["model"], PATH_MODELS, (".obj", ".ply", ".stl"))
+        spec["texture"] = resolve_asset(spec.get("texture"), PATH_TEXTURES, (".png", ".jpg"))
+        background = spec.get("background")
+        if isinstance(background, dict):
+            background["hdri"] = resolve_asset(background.get("hdri"), PATH_HDRI, HDRI_EXTENSIONS)
+        output = spec.setdefault("output", {})
+        if not isinstance(output, dict):
+            raise SpecError("output: expected a mapping")
+        output["path"] = "service"   # replaced per job, see __render
+        parsed = SceneSpec.from_dict(spec, "request")
+        kind = "views" if parsed.views is not None else "animation" if parsed.is_animation() else "image"
+        if FORMATS[format][1] != kind:
+            raise SpecError(f"format: {format} can't be used for a render of type {kind}")
+        return asdict(parsed)
+
+    # Equal specs of equal input files give equal results
+    def __key(self, spec: dict, format: str) -> str:
+        stamps = []
+        for path in (spec["model"], spec["texture"], spec["background"]["hdri"]):
+            if path is not None:
+                stat = os.stat(path)
+                stamps.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        data = json.dumps([spec, format, stamps], sort_keys=True)
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    # Must be called with the condition held
+    def __finish(self, job: ServiceJob, status: JobStatus, error: str = "") -> None:
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        if self.in_flight.get(job.key) is job:
+            del self.in_flight[job.key]
+        self.condition.notify_all()
+
+    # Must be called with the condition held
+    def __forget_old(self) -> None:
+        finished = [job for job in self.jobs.values() if job.is_finished()]
+        for job in finished[:max(0, len(finished) - self.FINISHED_KEPT)]:
+            del self.jobs[job.id]
+            if os.path.exists(job.output):
+                os.remove(job.output)
+
+    def __work(self, engine: RenderEngine) -> None:
+        # warm up right away instead of with the first request
+        try:
+            self.__warm(engine)
+        except EngineError as e:
+            print(f"Could not set up {engine.name} worker: {str(e).strip().splitlines()[-1]}")
+        while True:
+            with self.condition:
+                while not self.stopped and not self.queued:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                job = self.queued.popleft()
+                job.status = JobStatus.RUNNING
+                job.started = time.time()
+                job.worker = engine.name
+                self.running[job.id] = engine
+
+            status, error = JobStatus.DONE, ""
+            try:
+                if not engine.is_running():
+                    # crashed or killed by a cancel, the restarted worker is set up again
+                    self.__warm(engine)
+                self.__render(engine, job)
+            except EngineCrashed as e:
+                status, error = JobStatus.FAILED, str(e)
+            except EngineError as e:
+                status, error = JobStatus.FAILED, str(e).strip().splitlines()[-1]
+            except Exception as e:
+                status, error = JobStatus.FAILED, str(e)
+
+            with self.condition:
+                del self.running[job.id]
+                if job.status == JobStatus.RUNNING:
+                    self.__finish(job, status, error)
+
+    def __warm(self, engine: RenderEngine) -> None:
+        result = engine.call("warm", models=self.warm_models, hdris=self.warm_hdris)
+        print(f"{engine.name} worker is ready ({result['seconds']:.1f} s)")
+
+    def __render(self, engine: RenderEngine, job: ServiceJob) -> None:
+        spec = dict(job.spec, name=job.id)
+        base = os.path.splitext(job.output)[0]
+        if job.format in ("png", "jpeg"):
+            path = base + ".render.png"
+        elif job.format == "zip":
+            path = base + "_views"
+        else:
+            path = job.output
+        spec["output"] = dict(spec["output"], path=os.path.abspath(path))
+        timings = engine.call("batch", spec=spec)
+        job.setup, job.render = timings["setup"], timings["render"]
+
+        if job.format == "png":
+            os.replace(path, job.output)
+        elif job.format == "jpeg":
+            with Image.open(path) as image:
+                image.convert("RGB").save(job.output, quality=92)
+            os.remove(path)
+        elif job.format == "zip":
+            shutil.make_archive(base, "zip", path)
+            shutil.rmtree(path, ignore_errors=True)
+
+# HTTP front end of a RenderService, see the description at the top
+class ServiceHandler(BaseHTTPRequestHandler):
+    MAX_WAIT = 600   # seconds a request may wait for its result
+
+    @property
+    def service(self) -> RenderService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, value) -> None:
+        data = json.dumps(value).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_result(self, job: ServiceJob) -> None:
+        with open(job.output, "rb") as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", FORMATS[job.format][0])
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Render-Job", job.id)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def path_parts(self) -> t.Tuple[t.List[str], dict]:
+        path, _, query = self.path.partition("?")
+        params = dict(part.partition("=")[::2] for part in query.split("&") if part)
+        return [part for part in path.split("/") if part], params
+
+    def do_GET(self):
+        parts, _ = self.path_parts()
+        if parts == ["health"]:
+            self.send_json(200, self.service.health())
+        elif parts == ["renders"]:
+            self.send_json(200, [job.to_dict() for job in self.service.list_jobs()])
+        elif len(parts) in (2, 3) and parts[0] == "renders":
+            job = self.service.get(parts[1])
+            if job is None:
+                self.send_json(404, {"error": "unknown job"})
+            elif len(parts) == 2:
+                self.send_json(200, job.to_dict())
+            elif parts[2] != "result":
+                self.send_json(404, {"error": "not found"})
+            elif job.status != JobStatus.DONE:
+                self.send_json(409, job.to_dict())
+            else:
+                self.send_result(job)
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parts, params = self.path_parts()
+        if parts != ["renders"]:
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            wait = min(float(params.get("wait") or 0), self.MAX_WAIT)
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            job, shared = self.service.submit(request.get("spec"), request.get("format", "png"))
+        except (ValueError, AttributeError, OSError) as e:
+            # SpecError and json errors are ValueErrors as well
+            self.send_json(400, {"error": str(e)})
+            return
+        except OverflowError as e:
+            self.send_json(503, {"error": str(e)})
+            return
+        if wait > 0:
+            job = self.service.wait(job.id, wait)
+            if job.status == JobStatus.DONE:
+                self.send_result(job)
+                return
+        self.send_json(200 if job.is_finished() else 202, dict(job.to_dict(), shared=shared))
+
+    def do_DELETE(self):
+        parts, _ = self.path_parts()
+        if len(parts) != 2 or parts[0] != "renders" or self.service.get(parts[1]) is None:
+            self.send_json(404, {"error": "unknown job"})
+            return
+        self.service.cancel(parts[1])
+        self.send_json(200, self.service.get(parts[1]).to_dict())
+
+def make_server(service: RenderService, host: str, port: int, verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
@@ -0,0 +1,199 @@
+# created on: 17/10/2026
+
+# description:
+# Scene description for headless renders (see render_batch.py), read from yaml or json.
+# Everything except the model and the output path is optional, e.g.:
+#
+#   model: assets/models/monkey.obj
+#   material: {preset: gold, roughness: 0.2}
+#   texture: assets/textures/bricks.png
+#   vertex_colors: false
+#   light: {preset: day, brightness: 4, time: 3}
+#   background: {hdri: assets/hdris/old_depot_2k.hdr, strength: 1.5}
+#   camera: {orbit: [45, -30], distance: 5}      # or {animation: preset1}
+#   output: {path: renders/monkey.png, quality: final, samples: 64, width: 1280}
+#   animation: {frame_start: 1, frame_end: 120}  # renders a video instead of an image
+#   views: {count: 36, elevations: [15, 45]}     # turntable, output.path is a directory then
+
+from dataclasses import dataclass, field, fields
+import typing as t
+import json
+import os
+import yaml
+
+MATERIAL_PRESETS = ("default", "glass", "thick glass", "stone", "emissive", "water", "gold")
+LIGHT_PRESETS    = ("default", "day", "night", "lantern", "day_night", "off")
+CAMERA_ANIMATIONS = ("preset1", "preset2", "preset3")
+QUALITIES = ("final", "preview")
+
+class SpecError(ValueError):
+    """The scene spec is missing values or contains invalid ones"""
+
+# Create cls from a dictionary, unknown keys are reported instead of being ignored
+def from_dict(cls, dic, where: str):
+    if dic is None:
+        return cls()
+    if not isinstance(dic, dict):
+        raise SpecError(f"{where}: expected a mapping, got {dic!r}")
+    names = {f.name for f in fields(cls)}
+    unknown = set(dic) - names
+    if unknown:
+        raise SpecError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+    try:
+        return cls(**dic)
+    except TypeError as e:
+        raise SpecError(f"{where}: {e}")
+
+def check_choice(value, choices, where: str):
+    if value not in choices:
+        raise SpecError(f"{where}: '{value}' is not one of {', '.join(choices)}")
+
+@dataclass
+class MaterialSpec:
+    preset: str = "default"
+    # the following override the preset if set
+    color: t.Optional[t.List[float]] = None   # rgb or rgba, 0..1
+    metallic: t.Optional[float] = None
+    roughness: t.Optional[float] = None
+    transmission: t.Optional[float] = None
+    emissive: t.Optional[bool] = None
+    strength: t.Optional[float] = None
+    glow: t.Optional[bool] = None
+
+    def validate(self):
+        check_choice(self.preset, MATERIAL_PRESETS, "material.preset")
+        if self.color is not None and len(self.color) not in (3, 4):
+            raise SpecError("material.color: expected 3 or 4 values")
+
+@dataclass
+class LightSpec:
+    preset: str = "default"
+    brightness: float = 4
+    time: int = 0   # hours after the start of day/night, like the time slider
+
+    def validate(self):
+        check_choice(self.preset, LIGHT_PRESETS, "light.preset")
+
+@dataclass
+class BackgroundSpec:
+    hdri: t.Optional[str] = None
+    strength: float = 1
+    pan: float = 0   # degrees
+
+    def validate(self):
+        if self.strength < 0:
+            raise SpecError("background.strength must not be negative")
+
+@dataclass
+class CameraSpec:
+    orbit: t.List[float] = field(default_factory=lambda: [0, 0])   # degrees around z and x, from the default view
+    distance: t.Optional[float] = None
+    animation: t.Optional[str] = None   # camera animation preset, replaces the orbit camera
+    track: bool = False                 # animation camera keeps looking at the model
+
+    def validate(self):
+        if len(self.orbit) != 2:
+            raise SpecError("camera.orbit: expected [z, x] in degrees")
+        if self.animation is not None:
+            check_choice(self.animation, CAMERA_ANIMATIONS, "camera.animation")
+
+@dataclass
+class AnimationSpec:
+    frame_start: int = 1
+    frame_end: t.Optional[int] = None   # default: length of the active animations
+
+    def validate(self):
+        if self.frame_end is not None and self.frame_end < self.frame_start:
+            raise SpecError("animation.frame_end is before frame_start")
+
+@dataclass
+class ViewsSpec:
+    count: int = 8                  # views around the model per elevation
+    elevations: t.List[float] = field(default_factory=lambda: [30])
+    start: float = 45               # yaw of the first view, degrees
+    contact_sheet: bool = True
+    columns: int = 0                # of the contact sheet, 0 = about square
+
+    def validate(self):
+        if self.count < 1 or not self.elevations:
+            raise SpecError("views: count must be positive and elevations must not be empty")
+
+@dataclass
+class OutputSpec:
+    path: str = ""
+    quality: str = "final"
+    samples: t.Optional[int] = None
+    width: int = 1280
+    aspect: t.List[int] = field(default_factory=lambda: [16, 9])
+    transparent: bool = False
+    time_limit: float = 0   # seconds per frame, 0 = no limit
+
+    def validate(self):
+        if not self.path:
+            raise SpecError("output.path is missing")
+        check_choice(self.quality, QUALITIES, "output.quality")
+        if len(self.aspect) != 2 or min(self.aspect) <= 0:
+            raise SpecError("output.aspect: expected [width, height]")
+
+@dataclass
+class SceneSpec:
+    model: str
+    output: OutputSpec
+    material: MaterialSpec = field(default_factory=MaterialSpec)
+    texture: t.Optional[str] = None
+    vertex_colors: bool = False
+    light: LightSpec = field(default_factory=LightSpec)
+    background: BackgroundSpec = field(default_factory=BackgroundSpec)
+    camera: CameraSpec = field(default_factory=CameraSpec)
+    animation: t.Optional[AnimationSpec] = None   # None renders a still image
+    views: t.Optional[ViewsSpec] = None           # None renders a single view
+    name: str = ""
+
+    @classmethod
+    def from_dict(cls: t.Type["SceneSpec"], dic: dict, name: str = ""):
+        if not isinstance(dic, dict):
+            raise SpecError("expected a mapping at the top level")
+        dic = dict(dic)
+        if "model" not in dic:
+            raise SpecError("model is missing")
+        parts = {"output": OutputSpec, "material": MaterialSpec, "light": LightSpec,
+                 "background": BackgroundSpec, "camera": CameraSpec}
+        for key, part in parts.items():
+            dic[key] = from_dict(part, dic.get(key), key)
+        if dic.get("animation") is not None:
+            dic["animation"] = from_dict(AnimationSpec, dic["animation"], "animation")
+        if dic.get("views") is not None:
+            dic["views"] = from_dict(ViewsSpec, dic["views"], "views")
+        dic.setdefault("name", name)
+        spec = from_dict(cls, dic, "spec")
+        spec.validate()
+        return spec
+
+    def validate(self):
+        for part in (self.output, self.material, self.light, self.background, self.camera):
+            part.validate()
+        if self.animation is not None:
+            self.animation.validate()
+        if self.views is not None:
+            self.views.validate()
+            if self.animation is not None or self.camera.animation is not None:
+                raise SpecError("views can't be combined with an animation")
+        for path in (self.model, self.texture, self.background.hdri):
+            if path is not None and not os.path.exists(path):
+                raise SpecError(f"file not found: {path}")
+
+    def is_animation(self) -> bool:
+        return self.animation is not None
+
+# Load one spec, or a list of specs, from a .yaml/.yml/.json file
+# Relative paths in the spec are taken relative to the working directory
+def load_specs(path: str) -> t.List[SceneSpec]:
+    with open(path, "r") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+        else:
+            data = yaml.safe_load(f)
+    name = os.path.splitext(os.path.basename(path))[0]
+    if isinstance(data, list):
+        return [SceneSpec.from_dict(entry, f"{name}[{i}]") for i, entry in enumerate(data)]
+    return [SceneSpec.from_dict(data, name)]
@@ -0,0 +1,319 @@
+# created on: 17/10/2026
+
+# description:
+# Watch folder ingest: renders every model which appears (or changes) in a directory
+# with the look of a template spec (see batch/spec.py), a quick preview image first and
+# the final render after it, into an output tree mirroring the watched directory:
+#   incoming/shoes/boot.ply -> out/shoes/boot/preview.png, out/shoes/boot/final.png
+# The directory is polled. A file is only picked up after its size and modification
+# time stayed the same for the debounce time, so files still being copied are skipped.
+# At most max_pending files are queued for the warm worker processes at a time, the
+# others wait in the folder until the workers catch up.
+# Files already rendered with the same size and modification time are remembered in
+# ingest_state.yaml. Failed files (a crashed worker, a copy which paused longer than the
+# debounce time ...) are tried again after RETRY_DELAY seconds, doubled on every failure,
+# at most MAX_RETRIES times until the file changes. Per file timings go to ingest_metrics.csv and a summary with
+# latency and throughput to ingest_metrics.json, both in the output directory.
+
+from dataclasses import dataclass, asdict
+import typing as t
+import copy
+import csv
+import json
+import os
+import queue
+import threading
+import time
+import yaml
+
+from batch.spec import SceneSpec
+from batch.catalog import MODEL_EXTENSIONS
+from engine.client import RenderEngine, EngineError
+
+@dataclass
+class IngestItem:
+    path: str
+    rel: str              # path relative to the watched directory
+    stamp: t.Tuple[int, int]   # size, modification time (ns)
+    detected: float       # first seen with this stamp (time.time)
+    queued: float = 0     # stable and handed to the workers
+    started: float = 0
+    preview: float = 0    # preview image written
+    finished: float = 0
+    worker: str = ""
+    error: str = ""
+
+    def latency(self) -> float:
+        return self.finished - self.detected
+
+# Load the template of the look, everything of a spec except model and output path
+def load_template(path: str) -> dict:
+    with open(path, "r") as f:
+        dic = yaml.safe_load(f) or {}   # json is valid yaml as well
+    # the spec file stands in for the model to check the rest
+    SceneSpec.from_dict(dict(dic, model=path, output=dict(dic.get("output") or {}, path="check")), "template")
+    return dic
+
+# Reports files of directory whose size and modification time stayed the same for debounce seconds
+class FolderWatcher:
+    def __init__(self, directory: str, debounce: float, extensions: tuple = MODEL_EXTENSIONS):
+        self.directory = directory
+        self.debounce = debounce
+        self.extensions = extensions
+        self.seen = {}   # path -> (stamp, first seen with it)
+
+    def scan(self) -> t.List[t.Tuple[str, tuple, float]]:
+        now = time.time()
+        stable = []
+        present = set()
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.startswith(".") or not name.lower().endswith(self.extensions):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue   # removed meanwhile
+                stamp = (stat.st_size, stat.st_mtime_ns)
+                present.add(path)
+                known = self.seen.get(path)
+                if known is None or known[0] != stamp:
+                    self.seen[path] = (stamp, now)
+                elif now - known[1] >= self.debounce and stamp[0] > 0:
+                    stable.append((path, stamp, known[1]))
+        for path in set(self.seen) - present:
+            del self.seen[path]
+        return stable
+
+# Per file timings and a summary of the last WINDOW seconds
+class IngestMetrics:
+    WINDOW = 600
+
+    def __init__(self, out_dir: str):
+        self.csv_path = os.path.join(out_dir, "ingest_metrics.csv")
+        self.json_path = os.path.join(out_dir, "ingest_metrics.json")
+        self.items = []
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def add(self, item: IngestItem) -> None:
+        with self.lock:
+            self.items.append(item)
+            row = {"file": item.rel,
+                   "error": item.error,
+                   "latency": round(item.latency(), 3),
+                   "debounce_wait": round(item.queued - item.detected, 3),
+                   "queue_wait": round(item.started - item.queued, 3),
+                   "preview": round(item.preview - item.started, 3) if item.preview else "",
+                   "render": round(item.finished - item.started, 3),
+                   "worker": item.worker}
+            new = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                if new:
+                    writer.writeheader()
+                writer.writerow(row)
+
+    def summary(self, pending: int) -> dict:
+        now = time.time()
+        with self.lock:
+            ok = [item for item in self.items if not item.error]
+            recent = [item for item in ok if now - item.finished <= self.WINDOW]
+            latencies = sorted(item.latency() for item in recent)
+            window = min(self.WINDOW, now - self.started)
+            return {"files": len(ok),
+                    "failed": len(self.items) - len(ok),
+                    "pending": pending,
+                    "files_per_minute": 60 * len(recent) / window if window > 0 else 0,
+                    "latency_mean": sum(latencies) / len(latencies) if latencies else 0,
+                    "latency_p50": percentile(latencies, 0.5),
+                    "latency_p95": percentile(latencies, 0.95),
+                    "render_mean": sum(i.finished - i.started for i in recent) / len(recent) if recent else 0}
+
+    def write_summary(self, pending: int) -> dict:
+        summary = self.summary(pending)
+        temp = self.json_path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(summary, f, indent=2)
+        os.replace(temp, self.json_path)
+        return summary
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class IngestPipeline:
+    STATE_FILE = "ingest_state.yaml"
+    RETRY_DELAY = 10   # seconds before the first retry of a failed file
+    MAX_RETRIES = 5
+
+    # template: see load_template, preview_width: width of the preview image
+    def __init__(self, directory: str, template: dict, out_dir: str, workers: int = 1,
+                 debounce: float = 5, max_pending: int = 4, preview_width: int = 480, interval: float = 1):
+        self.directory = directory
+        self.template = template
+        self.out_dir = out_dir
+        self.max_pending = max(1, max_pending)
+        self.preview_width = preview_width
+        self.interval = interval
+        os.makedirs(out_dir, exist_ok=True)
+        self.watcher = FolderWatcher(directory, debounce)
+        self.metrics = IngestMetrics(out_dir)
+        self.state_path = os.path.join(out_dir, self.STATE_FILE)
+        self.done = self.__load_state()   # rel -> stamp of the last render
+        self.failed = {}                  # rel -> {"stamp", "attempts", "retry_at"} of failed files
+        self.queue = queue.Queue()
+        self.pending = {}                 # rel -> item queued or rendering
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.interrupted = False
+        self.engines = [RenderEngine(f"ingest {i + 1}") for i in range(max(1, workers))]
+
+    # Watch until stop() is called, or until nothing is left to do with once
+    def run(self, once: bool = False) -> None:
+        threads = [threading.Thread(target=self.__work, args=(engine,), daemon=True) for engine in self.engines]
+        for thread in threads:
+            thread.start()
+        print(f"Watching {self.directory} for models, results go to {self.out_dir}")
+        try:
+            while not self.stopped.is_set():
+                self.__admit(self.watcher.scan())
+                if once and not self.pending and not self.__waiting():
+                    break
+                self.stopped.wait(self.interval)
+        except KeyboardInterrupt:
+            # renders which are aborted now are not recorded, they start over next time
+            self.interrupted = True
+            for engine in self.engines:
+                engine.kill()
+            raise
+        finally:
+            self.stopped.set()
+            for _ in threads:
+                self.queue.put(None)
+            for thread in threads:
+                thread.join()
+            for engine in self.engines:
+                engine.shutdown()
+            self.metrics.write_summary(0)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    # Files which are known but not stable yet, not rendered or waiting for a retry
+    def __waiting(self) -> bool:
+        for path, (stamp, _) in self.watcher.seen.items():
+            rel = self.__rel(path)
+            if stamp[0] > 0 and self.done.get(rel) != list(stamp) and not self.__gave_up(rel, stamp):
+                return True
+        return False
+
+    # True if the file failed MAX_RETRIES times and did not change since
+    def __gave_up(self, rel: str, stamp: tuple) -> bool:
+        failure = self.failed.get(rel)
+        return failure is not None and failure["stamp"] == list(stamp) \
+            and failure["attempts"] > self.MAX_RETRIES
+
+    def __rel(self, path: str) -> str:
+        return os.path.relpath(path, self.directory).replace(os.sep, "/")
+
+    # Hand stable new or changed files to the workers, as long as fewer than max_pending wait
+    def __admit(self, stable: list) -> None:
+        for path, stamp, detected in sorted(stable, key=lambda entry: entry[2]):
+            rel = self.__rel(path)
+            with self.lock:
+                if len(self.pending) >= self.max_pending:
+                    return   # backpressure, the rest stays in the folder for the next scan
+                if rel in self.pending or self.done.get(rel) == list(stamp):
+                    continue
+                failure = self.failed.get(rel)
+                if failure is not None and failure["stamp"] == list(stamp) \
+                        and (self.__gave_up(rel, stamp) or time.time() < failure["retry_at"]):
+                    continue
+                item = IngestItem(path, rel, stamp, detected, queued=time.time())
+                self.pending[rel] = item
+            self.queue.put(item)
+
+    def specs(self, item: IngestItem) -> t.Tuple[SceneSpec, SceneSpec]:
+        target = os.path.join(self.out_dir, os.path.splitext(item.rel)[0])
+        final = SceneSpec.from_dict(dict(copy.deepcopy(self.template), model=item.path,
+                                         output=dict(self.template.get("output") or {}, path="pending")),
+                                    item.rel)
+        if final.views is not None:
+            final.output.path = os.path.join(target, "final")
+        else:
+            final.output.path = os.path.join(target, "final.avi" if final.is_animation() else "final.png")
+        preview = copy.deepcopy(final)
+        preview.animation = None
+        preview.views = None
+        preview.camera.animation = None
+        preview.output.quality = "preview"
+        preview.output.width = self.preview_width
+        preview.output.path = os.path.join(target, "preview.png")
+        return preview, final
+
+    def __work(self, engine: RenderEngine) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            item.started = time.time()
+            item.worker = engine.name
+            try:
+                preview, final = self.specs(item)
+                engine.call("batch", spec=asdict(preview))
+                item.preview = time.time()
+                engine.call("batch", spec=asdict(final))
+            except EngineError as e:
+                item.error = str(e).strip().splitlines()[-1]
+            except Exception as e:
+                item.error = str(e)
+            item.finished = time.time()
+            if self.interrupted:
+                return
+            self.__finished(item)
+
+    def __finished(self, item: IngestItem) -> None:
+        with self.lock:
+            del self.pending[item.rel]
+            if item.error:
+                failure = self.failed.get(item.rel)
+                attempts = failure["attempts"] + 1 if failure is not None and failure["stamp"] == list(item.stamp) else 1
+                delay = self.RETRY_DELAY * 2 ** (attempts - 1)
+                self.failed[item.rel] = {"stamp": list(item.stamp), "attempts": attempts,
+                                         "retry_at": time.time() + delay}
+            else:
+                self.failed.pop(item.rel, None)
+                self.done[item.rel] = list(item.stamp)
+                self.__save_state()
+            pending = len(self.pending)
+        self.metrics.add(item)
+        summary = self.metrics.write_summary(pending)
+        if item.error:
+            if attempts > self.MAX_RETRIES:
+                print(f"{item.rel}: failed ({item.error}), not tried again until it changes", flush=True)
+            else:
+                print(f"{item.rel}: failed ({item.error}), trying again in {delay} s", flush=True)
+        else:
+            print(f"{item.rel}: done {item.latency():.1f} s after it appeared "
+                  f"({summary['files_per_minute']:.1f} files/min, {pending} pending)", flush=True)
+
+    def __load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r") as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            print("Ignoring broken ingest state: " + str(e))
+            return {}
+
+    # Must be called with the lock held
+    def __save_state(self) -> None:
+        temp = self.state_path + ".tmp"
+        with open(temp, "w") as f:
+            yaml.safe_dump(self.done, f)
+        os.replace(temp, self.state_path)
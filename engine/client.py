@@ -0,0 +1,123 @@
+# created on: 17/10/2026
+
+# description:
+# GUI side of the render worker (engine/worker.py). Starts the worker process,
+# sends commands and waits for their results. The worker is started on the first
+# command and again after it crashed or was killed.
+
+import os
+import sys
+import subprocess
+import threading
+from multiprocessing.connection import Listener
+from PIL import Image
+
+from engine.worker import AUTHKEY_ENV
+
+class EngineError(Exception):
+    """The worker raised an exception while running a command"""
+
+class EngineCrashed(EngineError):
+    """The worker process died or was killed while running a command"""
+
+# Command line which starts a worker connecting to address
+# Frozen builds (pyinstaller) have no interpreter, main.py handles --render-worker there
+def worker_command(address: str) -> list:
+    if getattr(sys, "frozen", False):
+        return [sys.executable, "--render-worker", address]
+    return [sys.executable, "-m", "engine.worker", address]
+
+# Decode an image sent with engine.worker.image_message
+def image_from_message(message) -> Image.Image:
+    if message is None:
+        return None
+    mode, size, data = message
+    return Image.frombytes(mode, tuple(size), data)
+
+class RenderEngine:
+    START_TIMEOUT = 60   # seconds until a started worker must have connected
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, name: str = "render"):
+        self.name = name
+        self.process = None
+        self.conn = None
+        # only one command at a time, the worker answers them in order
+        self.lock = threading.Lock()
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        self.close_connection()
+        authkey = os.urandom(16)
+        listener = Listener(("localhost", 0), authkey=authkey)
+        host, port = listener.address
+        env = dict(os.environ)
+        env[AUTHKEY_ENV] = authkey.hex()
+        # the worker resolves "assets/..." relative to the working directory
+        self.process = subprocess.Popen(worker_command(f"{host}:{port}"), env=env, cwd=os.getcwd())
+
+        accepted = []
+        acceptor = threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True)
+        acceptor.start()
+        acceptor.join(self.START_TIMEOUT)
+        listener.close()
+        if not accepted:
+            self.kill()
+            raise EngineCrashed(f"{self.name} worker did not start")
+        self.conn = accepted[0]
+        print(f"Started {self.name} worker (pid {self.process.pid})")
+
+    # Run a command in the worker and return its result, blocks until it is finished
+    # on_progress(event): called for progress events sent while the command runs
+    # cancelled(): polled while waiting, the worker is asked to stop once it returns True
+    def call(self, command: str, on_progress=None, cancelled=None, **args):
+        with self.lock:
+            if not self.is_running():
+                self.start()
+            try:
+                self.conn.send((command, args))
+                cancel_sent = False
+                while True:
+                    if not self.conn.poll(self.POLL_INTERVAL):
+                        if not self.is_running():
+                            raise EOFError
+                        if cancelled is not None and not cancel_sent and cancelled():
+                            self.conn.send(("cancel", {}))
+                            cancel_sent = True
+                        continue
+                    status, value = self.conn.recv()
+                    if status == "progress":
+                        if on_progress is not None:
+                            on_progress(value)
+                    elif status == "ok":
+                        return value
+                    else:
+                        raise EngineError(value)
+            except (EOFError, OSError):
+                self.kill()
+                self.close_connection()
+                raise EngineCrashed(f"{self.name} worker stopped while running '{command}'")
+
+    # Stop the worker immediately, e.g. to abort a render. May be called from any thread,
+    # running calls raise EngineCrashed, the next call starts a new worker
+    def kill(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def close_connection(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # Close the connection and let the worker exit
+    def shutdown(self) -> None:
+        self.close_connection()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
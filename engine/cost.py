@@ -0,0 +1,142 @@
+# created on: 17/10/2026
+
+# description:
+# Predicts how long a final render takes from features of the scene (see
+# utils.scene_features). The time per frame is modelled as
+#   overhead + pixel samples * (base + faces + transmission + emission + bounces + lights + instances)
+# with one weight per term. The weights start at rough defaults and are fitted to the
+# renders logged by the render queue (ridge regression towards the defaults, so a few
+# logged renders can't produce nonsense). A probe render of the actual scene (see
+# Renderer.probe) gives a better estimate than the model where one was made.
+# While a job renders, the estimate is replaced by the measured time per frame.
+
+import os
+import threading
+import time
+import numpy as np
+import yaml
+
+from engine.jobs import JobStatus
+
+# (feature, scale) multiplied with the pixel samples, see design_row
+TERMS = (("faces", 1e-6),        # per million faces
+         ("transmission", 1),    # largest transmission of a material, 0..1
+         ("emission", 1),        # 1 if a material emits light
+         ("bounces", 1),
+         ("lights", 1),
+         ("instances", 1e-3))    # per thousand instances (point clouds)
+# seconds for the overhead, per 1e9 pixel samples, then per term and 1e9 pixel samples
+DEFAULT_WEIGHTS = np.array([2.0, 40.0, 10.0, 40.0, 5.0, 3.0, 2.0, 5.0])
+RIDGE = 0.001
+
+def pixel_samples(features: dict) -> float:
+    return features["pixels"] * features["samples"] / 1e9
+
+def design_row(features: dict) -> np.ndarray:
+    ps = pixel_samples(features)
+    return np.array([1, ps] + [ps * features[name] * scale for name, scale in TERMS])
+
+# Logged renders as yaml list of {"features", "seconds"}, seconds per frame
+class RenderLog:
+    MAX_ENTRIES = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.version = 0
+        self.entries = self.__load()
+
+    def add(self, features: dict, seconds: float) -> None:
+        with self.lock:
+            self.entries.append({"features": dict(features), "seconds": float(seconds), "time": time.time()})
+            del self.entries[:-self.MAX_ENTRIES]
+            self.version += 1
+            try:
+                self.__save()
+            except OSError as e:
+                print("Could not save render log: " + str(e))
+
+    def samples(self) -> list:
+        with self.lock:
+            return list(self.entries)
+
+    def __load(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r") as f:
+                return yaml.safe_load(f) or []
+        except Exception as e:
+            print("Ignoring broken render log: " + str(e))
+            return []
+
+    def __save(self) -> None:
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            yaml.safe_dump(self.entries, f)
+        os.replace(temp, self.path)
+
+class CostModel:
+    def __init__(self, log: RenderLog):
+        self.log = log
+        self.weights = DEFAULT_WEIGHTS
+        self.fitted_version = -1
+
+    # Seconds one frame with these features takes to render
+    def predict(self, features: dict) -> float:
+        self.__fit()
+        seconds = max(0.5, float(design_row(features) @ self.weights))
+        if features.get("time_limit", 0) > 0:
+            seconds = min(seconds, features["time_limit"] + self.weights[0])
+        return seconds
+
+    # Refit when renders were logged since the last fit
+    def __fit(self) -> None:
+        if self.fitted_version == self.log.version:
+            return
+        self.fitted_version = self.log.version
+        # renders stopped by the time limit say nothing about the weights
+        samples = [entry for entry in self.log.samples()
+                   if not entry["features"].get("time_limit", 0)]
+        if not samples:
+            self.weights = DEFAULT_WEIGHTS
+            return
+        x = np.array([design_row(entry["features"]) for entry in samples])
+        y = np.array([entry["seconds"] for entry in samples])
+        # minimize |x w - y|^2 + RIDGE |w - default|^2
+        a = x.T @ x + RIDGE * np.eye(len(DEFAULT_WEIGHTS))
+        b = x.T @ y + RIDGE * DEFAULT_WEIGHTS
+        weights = np.linalg.solve(a, b)
+        # a negative cost makes no sense, fall back to the default for those
+        self.weights = np.where(weights < 0, DEFAULT_WEIGHTS * 0.1, weights)
+
+# Seconds per frame from a probe (see Renderer.probe) for the full settings in features
+def probe_seconds(probe: dict, features: dict) -> float:
+    seconds = probe["overhead"] + probe["per_sample"] * features["pixels"] * features["samples"]
+    if features.get("time_limit", 0) > 0:
+        seconds = min(seconds, probe["overhead"] + features["time_limit"])
+    return max(0.1, seconds)
+
+# Seconds until job is finished. Once frames are done, their measured time takes over
+# from the estimate, the more frames the more
+def remaining_seconds(job, now: float = None) -> float:
+    now = time.time() if now is None else now
+    if job.status == JobStatus.QUEUED:
+        return job.estimate
+    if job.status != JobStatus.RUNNING:
+        return 0
+    elapsed = now - job.started
+    if job.frames_total > 1 and job.frames_done > 0:
+        measured = elapsed / job.frames_done
+        predicted = job.estimate / job.frames_total if job.estimate > 0 else measured
+        weight = min(1, job.frames_done / max(3, 0.2 * job.frames_total))
+        per_frame = weight * measured + (1 - weight) * predicted
+        return per_frame * (job.frames_total - job.frames_done)
+    return max(0, job.estimate - elapsed)
+
+def format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{max(1, round(seconds))} s"
+    if seconds < 3600:
+        return f"{round(seconds / 60)} min"
+    return f"{int(seconds // 3600)} h {round(seconds % 3600 / 60)} min"
@@ -0,0 +1,544 @@
+# created on: 17/10/2026
+
+# description:
+# Render farm, renders the frames of an animation on several machines. The coordinator
+# owns the job: render nodes connect to it over TCP, get the .blend and the files it
+# uses (HDRIs, textures) shipped, and render chunks of frames. Files are cached on the
+# nodes by their sha1, so they are only sent once. Finished frames come back as png
+# and are written to the frame directory of the coordinator (with a manifest, see
+# engine/parallel.py, so an interrupted job continues), which encodes the video at the end.
+# Frames of a node which disconnects or stops answering are handed out again. When
+# nothing is left to hand out, the frames of a node which takes much longer than the
+# others are duplicated to an idle node, whichever finishes first wins.
+# Every node renders with a local worker process (engine/worker.py), the coordinator
+# and node processes themselves don't need bpy.
+#
+# Messages are (kind, value) tuples over multiprocessing connections, which pickle
+# them, so both sides must authenticate with the same key. Unpickling runs code, the key
+# is all that keeps others from running code on the coordinator and the nodes, so it
+# must be secret and the coordinator should only listen on networks the nodes are on.
+#   node -> coordinator: ("hello", info), ("need", [sha1]), ("ready", info), ("alive", {}),
+#                        ("frame", {"frame", "seconds", "data"}), ("chunk_done", {}), ("error", message)
+#   coordinator -> node: ("job", job), ("file", {"sha1", "data"}), ("frames", [frame]), ("cancel", {})
+
+from dataclasses import dataclass, field
+import hashlib
+import os
+import socket
+import threading
+import time
+import traceback
+from multiprocessing.connection import Listener, Client, AuthenticationError
+
+from engine.client import RenderEngine, EngineError
+from engine.parallel import FrameManifest, file_signature
+from engine.worker import parse_address, frame_file
+
+FARM_KEY_ENV = "RENDER_FARM_KEY"
+
+@dataclass
+class Assignment:
+    frames: list
+    last_progress: float = field(default_factory=time.monotonic)
+    duplicated: bool = False   # the unfinished frames were given to another node as well
+
+# Hands out chunks of frames to named nodes, like engine.parallel.FrameScheduler, but
+# knows which node renders which frames, so they can be taken back
+class FarmScheduler:
+    CHUNK_SECONDS = 60      # a chunk should take about this long with the measured frame time
+    SLOW_FACTOR = 4         # a node is slow when it needs this many average frame times for a frame
+    MIN_SLOW_SECONDS = 30
+
+    def __init__(self, frames: list):
+        self.pending = sorted(frames)
+        self.total = len(self.pending)
+        self.finished = set()
+        self.nodes = set()
+        self.assigned = {}    # node -> Assignment
+        self.reassigned = 0   # frames handed out again because of a lost or slow node
+        self.frame_seconds = None
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+    def is_complete(self) -> bool:
+        return len(self.finished) >= self.total
+
+    def join(self, node: str) -> None:
+        with self.condition:
+            self.nodes.add(node)
+
+    # The node is gone, its unfinished frames are handed out again
+    def leave(self, node: str) -> None:
+        with self.condition:
+            self.nodes.discard(node)
+            self.__release(node)
+
+    # Take the next chunk for node, an empty list once all frames are rendered
+    def next_chunk(self, node: str) -> list:
+        with self.condition:
+            while not self.cancelled and not self.is_complete():
+                if self.pending:
+                    if self.frame_seconds is None:
+                        size = 1   # nothing measured yet
+                    else:
+                        by_cost  = int(self.CHUNK_SECONDS / max(self.frame_seconds, 1e-3))
+                        by_share = len(self.pending) // (2 * max(1, len(self.nodes)))
+                        size = max(1, min(by_cost, by_share))
+                    chunk = self.pending[:size]
+                    del self.pending[:size]
+                    self.assigned[node] = Assignment(chunk)
+                    return chunk
+                chunk = self.__take_from_slow_node(node)
+                if chunk:
+                    return chunk
+                # rendering nodes may still drop out or turn out to be slow
+                self.condition.wait(1)
+            return []
+
+    def chunk_done(self, node: str) -> None:
+        with self.condition:
+            self.__release(node)
+
+    # A frame of node arrived, frames which were rendered twice count once
+    def frame_done(self, node: str, frame: int, seconds: float) -> None:
+        with self.condition:
+            assignment = self.assigned.get(node)
+            if assignment is not None:
+                assignment.last_progress = time.monotonic()
+            if frame in self.finished:
+                return
+            self.finished.add(frame)
+            if self.frame_seconds is None:
+                self.frame_seconds = seconds
+            else:
+                self.frame_seconds = 0.8 * self.frame_seconds + 0.2 * seconds
+            self.condition.notify_all()
+
+    # All frames of the node's chunk were rendered by others, it can stop
+    def is_obsolete(self, node: str) -> bool:
+        with self.condition:
+            assignment = self.assigned.get(node)
+            return assignment is not None and all(frame in self.finished for frame in assignment.frames)
+
+    def cancel(self) -> None:
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+
+    # Must be called with the condition held
+    def __release(self, node: str) -> None:
+        assignment = self.assigned.pop(node, None)
+        if assignment is None:
+            return
+        for frame in assignment.frames:
+            if frame in self.finished or frame in self.pending:
+                continue
+            holders = [a for a in self.assigned.values() if frame in a.frames]
+            if holders:
+                # still rendered by another node, which may be rescued again if it is slow
+                for holder in holders:
+                    holder.duplicated = False
+            else:
+                self.pending.append(frame)
+                self.reassigned += 1
+        self.pending.sort()
+        self.condition.notify_all()
+
+    # Must be called with the condition held
+    def __take_from_slow_node(self, node: str) -> list:
+        if self.frame_seconds is None:
+            return []
+        limit = max(self.MIN_SLOW_SECONDS, self.SLOW_FACTOR * self.frame_seconds)
+        now = time.monotonic()
+        for other, assignment in self.assigned.items():
+            if other == node or assignment.duplicated or now - assignment.last_progress < limit:
+                continue
+            frames = [frame for frame in assignment.frames if frame not in self.finished]
+            if frames:
+                print(f"Node {other} is slow, {len(frames)} of its frames go to {node} as well")
+                assignment.duplicated = True
+                self.assigned[node] = Assignment(frames, duplicated=True)
+                self.reassigned += len(frames)
+                return frames
+        return []
+
+# Renders the animation of a .blend file with all nodes which connect to address
+class FarmCoordinator:
+    NODE_TIMEOUT = 60         # seconds without any message until a node counts as lost
+    NO_NODES_TIMEOUT = 300    # gives up when no node is connected for this long
+
+    # directory: where the frames are collected, frames: all frames of the scene if None
+    # on_frame(frame, seconds): called on a node thread for every new frame
+    def __init__(self, snapshot: str, output: str, directory: str, address: str, authkey: bytes,
+                 base_dir: str, aspect: tuple, time_limit: float, frames: list = None, on_frame=None):
+        self.snapshot = snapshot
+        self.output = output
+        self.directory = directory
+        self.address = address
+        self.authkey = authkey
+        self.base_dir = base_dir
+        self.aspect = aspect
+        self.time_limit = time_limit
+        self.frames = frames
+        self.on_frame = on_frame
+        self.engine = RenderEngine("farm")
+        self.manifest = None
+        self.scheduler = None
+        self.job = None
+        self.files = {}        # sha1 -> local path of every file shipped to the nodes
+        self.stats = {}        # node -> {"frames", "seconds", "sent"}
+        self.threads = []
+        self.frame_lock = threading.Lock()
+        self.stopping = False
+        self.cancelled = False
+
+    # Render all frames and encode them, returns a dictionary with timings
+    def run(self) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.monotonic()
+        try:
+            info = self.engine.call("load", path=self.snapshot, base_dir=self.base_dir,
+                                    aspect=self.aspect, time_limit=self.time_limit)
+            self.job = self.__package(self.engine.call("assets"))
+            # the nodes render, no need to keep a scene in memory meanwhile
+            self.engine.shutdown()
+
+            frames = self.frames or list(range(info["frame_start"], info["frame_end"] + 1))
+            self.manifest = FrameManifest(self.directory, self.job["id"])
+            self.manifest.load()
+            todo = [frame for frame in frames if frame not in self.manifest.frames]
+            resumed = len(frames) - len(todo)
+            if resumed > 0:
+                print(f"Resuming farm render, {resumed} of {len(frames)} frames are already done")
+            self.scheduler = FarmScheduler(todo)
+            self.__serve()
+            if self.cancelled:
+                raise InterruptedError("Render cancelled")
+            missing = [frame for frame in frames if frame not in self.manifest.frames]
+            if missing:
+                raise RuntimeError(f"{len(missing)} frames were not rendered")
+            render_seconds = time.monotonic() - start
+
+            self.engine.call("encode", files=[frame_file(self.directory, frame) for frame in frames],
+                             output=self.output, fps=info["fps"])
+        finally:
+            self.engine.kill()
+            self.engine.close_connection()
+        return self.report(len(todo), resumed, render_seconds, time.monotonic() - start)
+
+    def report(self, frames: int, resumed: int, render_seconds: float, total_seconds: float) -> dict:
+        serial = sum(node["seconds"] for node in self.stats.values())
+        stats = {"frames": frames,
+                 "resumed": resumed,
+                 "nodes": len(self.stats),
+                 "reassigned": self.scheduler.reassigned,
+                 "render_seconds": render_seconds,
+                 "total_seconds": total_seconds,
+                 "serial_seconds": serial,
+                 "speedup": serial / render_seconds if render_seconds > 0 else 1}
+        print("Rendered {frames} frames ({resumed} resumed, {reassigned} reassigned) on {nodes} nodes "
+              "in {render_seconds:.1f} s, one node needs about {serial_seconds:.1f} s "
+              "(speedup {speedup:.2f}x)".format(**stats))
+        for name, node in self.stats.items():
+            print(f"  {name}: {node['frames']} frames, {node['seconds']:.1f} s rendering, "
+                  f"{node['sent'] / 2**20:.1f} MB shipped")
+        return stats
+
+    # Stop waiting for frames, may be called from any thread
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+        self.engine.kill()
+
+    # Everything a node needs: the snapshot and the external files, identified by sha1
+    def __package(self, assets: list) -> dict:
+        def entry(path):
+            sha1 = file_signature(path)
+            self.files[sha1] = path
+            return {"name": os.path.basename(path), "sha1": sha1}
+
+        snapshot = entry(self.snapshot)
+        return {"id": snapshot["sha1"],
+                "snapshot": snapshot,
+                "assets": [dict(entry(path), filepath=filepath) for filepath, path in assets],
+                "aspect": list(self.aspect),
+                "time_limit": self.time_limit}
+
+    # Accept nodes until all frames are there
+    def __serve(self) -> None:
+        listener = Listener(parse_address(self.address), authkey=self.authkey)
+        print(f"Render farm coordinator listening on {self.address}")
+        acceptor = threading.Thread(target=self.__accept, args=(listener,), daemon=True)
+        acceptor.start()
+        scheduler = self.scheduler
+        try:
+            with scheduler.condition:
+                alone_since = time.monotonic()
+                while not scheduler.is_complete() and not scheduler.cancelled:
+                    if scheduler.nodes:
+                        alone_since = time.monotonic()
+                    elif time.monotonic() - alone_since > self.NO_NODES_TIMEOUT:
+                        raise RuntimeError(f"No render node connected for {self.NO_NODES_TIMEOUT} s")
+                    scheduler.condition.wait(1)
+        finally:
+            self.__stop_accepting(listener)
+            # nodes finish their chunk or notice it is obsolete, a stuck one is left behind
+            deadline = time.monotonic() + 1
+            for thread in self.threads:
+                thread.join(max(0, deadline - time.monotonic()))
+
+    def __accept(self, listener: Listener) -> None:
+        while True:
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                print("Rejected a render node with a wrong key")
+                continue
+            except OSError:
+                return
+            if self.stopping:
+                conn.close()
+                return
+            thread = threading.Thread(target=self.__node, args=(conn,), daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    # accept() doesn't return when the listener is closed, so connect once more to wake it up
+    def __stop_accepting(self, listener: Listener) -> None:
+        self.stopping = True
+        host, port = listener.address
+        try:
+            Client(("localhost" if host in ("0.0.0.0", "") else host, port), authkey=self.authkey).close()
+        except Exception:
+            pass
+        listener.close()
+
+    # Talks to one node until all frames are rendered or the node is lost
+    def __node(self, conn) -> None:
+        name = None
+        try:
+            hello = self.__expect(conn, "hello")
+            with self.frame_lock:
+                name = hello["name"]
+                if name in self.stats:
+                    name += f" ({len(self.stats) + 1})"
+                self.stats[name] = {"frames": 0, "seconds": 0, "sent": 0}
+            print(f"Render node {name} connected ({hello['cpus']} cpus)")
+            self.scheduler.join(name)
+            self.__ship(conn, name)
+            while True:
+                chunk = self.scheduler.next_chunk(name)
+                if not chunk:
+                    return
+                conn.send(("frames", chunk))
+                self.__collect(conn, name)
+                self.scheduler.chunk_done(name)
+        except Exception as e:
+            print(f"Render node {name or 'unknown'} lost: {e}")
+        finally:
+            if name is not None:
+                self.scheduler.leave(name)
+            conn.close()
+
+    def __receive(self, conn):
+        if not conn.poll(self.NODE_TIMEOUT):
+            raise TimeoutError(f"no message for {self.NODE_TIMEOUT} s")
+        kind, value = conn.recv()
+        if kind == "error":
+            raise EngineError(value.strip().splitlines()[-1])
+        return kind, value
+
+    # Wait for a message of kind, skipping heartbeats
+    def __expect(self, conn, expected: str):
+        while True:
+            kind, value = self.__receive(conn)
+            if kind == expected:
+                return value
+            if kind != "alive":
+                raise RuntimeError(f"expected '{expected}', got '{kind}'")
+
+    # Send the job and the files the node does not have yet, wait until it loaded the scene
+    def __ship(self, conn, name: str) -> None:
+        conn.send(("job", self.job))
+        for sha1 in self.__expect(conn, "need"):
+            with open(self.files[sha1], "rb") as f:
+                data = f.read()
+            conn.send(("file", {"sha1": sha1, "data": data}))
+            self.stats[name]["sent"] += len(data)
+        self.__expect(conn, "ready")
+
+    # Store the frames of the current chunk until the node finished it
+    def __collect(self, conn, name: str) -> None:
+        cancel_sent = False
+        deadline = time.monotonic() + self.NODE_TIMEOUT
+        while True:
+            if not cancel_sent and (self.cancelled or self.scheduler.is_obsolete(name)):
+                conn.send(("cancel", {}))
+                cancel_sent = True
+            # check for obsolete frames every second
+            if not conn.poll(1):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"no message for {self.NODE_TIMEOUT} s")
+                continue
+            deadline = time.monotonic() + self.NODE_TIMEOUT
+            kind, value = self.__receive(conn)
+            if kind == "chunk_done":
+                return
+            if kind == "frame":
+                self.__store_frame(name, value)
+
+    def __store_frame(self, name: str, value: dict) -> None:
+        frame, seconds = value["frame"], value["seconds"]
+        file = frame_file(self.directory, frame)
+        temp = f"{file}.{threading.get_ident()}.part"
+        with open(temp, "wb") as f:
+            f.write(value["data"])
+        with self.frame_lock:
+            new = frame not in self.manifest.frames
+            if new:
+                os.replace(temp, file)
+                self.manifest.add(frame, seconds)
+                self.stats[name]["frames"] += 1
+            else:
+                os.remove(temp)
+            self.stats[name]["seconds"] += seconds
+        self.scheduler.frame_done(name, frame, seconds)
+        if new and self.on_frame is not None:
+            self.on_frame(frame, seconds)
+
+# Render node, connects to a coordinator and renders the frames it is given
+class FarmNode:
+    HEARTBEAT = 5           # seconds between "alive" messages
+    CONNECT_TIMEOUT = 300   # the coordinator may still be loading the scene
+
+    # cache_dir: shipped files and rendered frames, kept between jobs
+    # threads: cycles threads, so several nodes can share a machine (0 = all)
+    def __init__(self, address: str, authkey: bytes, cache_dir: str, threads: int = 0, name: str = None):
+        self.address = address
+        self.authkey = authkey
+        self.cache_dir = cache_dir
+        self.threads = threads
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.engine = RenderEngine("node")
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.cancel_requested = False
+        self.render_thread = None
+        self.frames_dir = None
+
+    # Serve one coordinator, or one after the other with keep_running
+    def serve(self, keep_running: bool = False) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            while True:
+                conn = self.__connect(keep_running)
+                print(f"Connected to render farm coordinator {self.address}")
+                try:
+                    self.__session(conn)
+                except (EOFError, OSError):
+                    print("Coordinator closed the connection")
+                finally:
+                    self.cancel_requested = True
+                    if self.render_thread is not None:
+                        self.render_thread.join()
+                    self.conn = None
+                    conn.close()
+                if not keep_running:
+                    return
+        finally:
+            self.engine.shutdown()
+
+    def __connect(self, keep_running: bool):
+        start = time.monotonic()
+        while True:
+            try:
+                return Client(parse_address(self.address), authkey=self.authkey)
+            except (ConnectionRefusedError, ConnectionResetError):
+                if not keep_running and time.monotonic() - start > self.CONNECT_TIMEOUT:
+                    raise
+                time.sleep(1)
+
+    def __send(self, kind: str, value) -> None:
+        with self.send_lock:
+            self.conn.send((kind, value))
+
+    def __heartbeat(self, conn) -> None:
+        while self.conn is conn:
+            time.sleep(self.HEARTBEAT)
+            try:
+                self.__send("alive", {})
+            except (OSError, AttributeError):
+                return
+
+    def __session(self, conn) -> None:
+        self.conn = conn
+        self.__send("hello", {"name": self.name, "cpus": os.cpu_count()})
+        threading.Thread(target=self.__heartbeat, args=(conn,), daemon=True).start()
+        while True:
+            kind, value = conn.recv()
+            if kind == "job":
+                try:
+                    self.__prepare(conn, value)
+                except Exception:
+                    self.__send("error", traceback.format_exc())
+                    return
+            elif kind == "frames":
+                if self.render_thread is not None:
+                    self.render_thread.join()
+                self.cancel_requested = False
+                self.render_thread = threading.Thread(target=self.__render, args=(value,), daemon=True)
+                self.render_thread.start()
+            elif kind == "cancel":
+                self.cancel_requested = True
+
+    def __cached(self, entry: dict) -> str:
+        return os.path.join(self.cache_dir, entry["sha1"], entry["name"])
+
+    # Receive the files which are not cached yet and load the scene
+    def __prepare(self, conn, job: dict) -> None:
+        entries = {entry["sha1"]: entry for entry in [job["snapshot"]] + job["assets"]}
+        needed = [sha1 for sha1, entry in entries.items() if not os.path.exists(self.__cached(entry))]
+        self.__send("need", needed)
+        for _ in needed:
+            kind, value = conn.recv()
+            if kind != "file" or value["sha1"] not in entries:
+                raise RuntimeError(f"unexpected message '{kind}' while receiving files")
+            if hashlib.sha1(value["data"]).hexdigest() != value["sha1"]:
+                raise RuntimeError("received a damaged file")
+            path = self.__cached(entries[value["sha1"]])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".part", "wb") as f:
+                f.write(value["data"])
+            os.replace(path + ".part", path)
+        if needed:
+            print(f"Received {len(needed)} files for job {job['id'][:8]}")
+
+        self.frames_dir = os.path.join(self.cache_dir, "frames", job["id"])
+        os.makedirs(self.frames_dir, exist_ok=True)
+        remap = {asset["filepath"]: self.__cached(asset) for asset in job["assets"]}
+        info = self.engine.call("load", path=self.__cached(job["snapshot"]), base_dir=self.cache_dir,
+                                aspect=tuple(job["aspect"]), time_limit=job["time_limit"], remap=remap)
+        self.__send("ready", info)
+
+    # Runs on its own thread, so "cancel" can arrive meanwhile
+    def __render(self, frames: list) -> None:
+        def on_progress(event):
+            if "stage" in event:
+                return   # live render events stay on the node
+            with open(event["file"], "rb") as f:
+                data = f.read()
+            os.remove(event["file"])
+            self.__send("frame", {"frame": event["frame"], "seconds": event["seconds"], "data": data})
+
+        try:
+            self.engine.call("render_frames", on_progress=on_progress, cancelled=lambda: self.cancel_requested,
+                             directory=self.frames_dir, frames=frames, threads=self.threads)
+            self.__send("chunk_done", {})
+        except EngineError as e:
+            try:
+                self.__send("error", str(e))
+            except (OSError, AttributeError):
+                pass
+        except (OSError, AttributeError):
+            pass   # the coordinator is gone
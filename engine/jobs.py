@@ -0,0 +1,392 @@
+# created on: 17/10/2026
+
+# description:
+# Queue of final renders which run in the background while the scene is edited.
+# Every job renders a .blend snapshot of the scene taken when it was submitted,
+# jobs are kept in a yaml file so the queue survives restarts of the program.
+# Snapshots are kept while a retry may render them again (queued, failed, cancelled),
+# finished jobs delete theirs.
+
+from dataclasses import dataclass, field, asdict
+import typing as t
+import enum
+import os
+import re
+import shutil
+import threading
+import time
+import traceback
+import uuid
+import yaml
+
+from engine.client import RenderEngine, EngineError, EngineCrashed
+from engine.parallel import ParallelAnimationRender
+from engine.progress import ProgressChannel
+
+class JobStatus(enum.Enum):
+    QUEUED    = "queued"
+    RUNNING   = "running"
+    DONE      = "done"
+    FAILED    = "failed"
+    CANCELLED = "cancelled"
+
+@dataclass
+class RenderJob:
+    name: str
+    snapshot: str          # .blend file rendered by the job
+    output: str            # image or video file written by the job
+    animation: bool
+    aspect: t.Tuple[int, int]
+    time_limit: float
+    priority: int = 0      # higher priorities run first
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 2  # a crashed render is retried automatically until this is reached
+    error: str = ""
+    frames_done: int = 0
+    frames_total: int = 1
+    workers: int = 1       # processes rendering an animation in parallel
+    speedup: float = 0     # measured speedup of a parallel render
+    views: t.Optional[t.List[t.List[float]]] = None   # turntable poses (yaw, elevation), output is a directory
+    features: t.Optional[dict] = None   # scene features of the render, see utils.scene_features
+    estimate: float = 0    # predicted seconds for the whole job, see engine/cost.py
+    created: float = field(default_factory=time.time)
+    started: float = 0
+    finished: float = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+    @classmethod
+    def from_dict(cls: t.Type["RenderJob"], dic: dict):
+        dic = dict(dic)
+        dic["status"] = JobStatus(dic["status"])
+        dic["aspect"] = tuple(dic["aspect"])
+        return cls(**dic)
+
+    def to_dict(self):
+        dic = asdict(self)
+        dic["status"] = self.status.value
+        dic["aspect"] = list(self.aspect)
+        return dic
+
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def describe_progress(self) -> str:
+        if self.status == JobStatus.RUNNING and self.animation:
+            return f"{self.frames_done} / {self.frames_total} frames"
+        if self.status == JobStatus.RUNNING and self.views:
+            return f"{self.frames_done} / {self.frames_total} views"
+        if self.status == JobStatus.DONE and self.speedup > 0:
+            return f"{self.finished - self.started:.1f} s ({self.speedup:.1f}x)"
+        if self.status == JobStatus.DONE:
+            return f"{self.finished - self.started:.1f} s"
+        return ""
+
+# Loads and saves the jobs as a list in a yaml file
+class JobStore:
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> t.List[RenderJob]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r") as f:
+                entries = yaml.safe_load(f) or []
+            return [RenderJob.from_dict(entry) for entry in entries]
+        except Exception as e:
+            print("Could not load render queue from " + self.path + ": " + str(e))
+            return []
+
+    # Written to a temporary file first, so a crash never leaves a half written queue
+    def save(self, jobs: t.List[RenderJob]) -> None:
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            yaml.safe_dump([job.to_dict() for job in jobs], f)
+        os.replace(temp, self.path)
+
+class RenderQueue:
+    # log: engine.cost.RenderLog, finished renders are added to it
+    def __init__(self, store: JobStore, base_dir: str, log=None):
+        self.store = store
+        self.base_dir = base_dir
+        self.log = log
+        self.engine = RenderEngine("queue")
+        self.condition = threading.Condition()
+        self.running = True
+        self.current = None   # job rendering right now
+        self.parallel = None  # parallel render of the current job
+        self.version = 0      # increased on every change, polled by the GUI
+        self.channels = {}    # job id -> [ProgressChannel] of the windows following the job
+        self.keep_frames = True   # choice of cancel() for the current job
+
+        self.jobs = self.store.load()
+        # Jobs which were rendering when the program was closed start over
+        for job in self.jobs:
+            if job.status == JobStatus.RUNNING:
+                job.status = JobStatus.QUEUED
+            elif job.status == JobStatus.DONE:
+                remove_files(job)   # left behind by earlier versions
+        with self.condition:
+            self.__changed()
+
+        self.thread = threading.Thread(target=self.__run, name="render-queue", daemon=True)
+        self.thread.start()
+
+    # Returns copies, so the GUI never sees a job while it is changed
+    def list_jobs(self) -> t.List[RenderJob]:
+        with self.condition:
+            return [RenderJob.from_dict(job.to_dict()) for job in self.jobs]
+
+    def get(self, job_id: str) -> RenderJob:
+        with self.condition:
+            job = self.__find(job_id)
+            return None if job is None else RenderJob.from_dict(job.to_dict())
+
+    def submit(self, job: RenderJob) -> RenderJob:
+        with self.condition:
+            self.jobs.append(job)
+            self.__changed()
+        return job
+
+    # Live render events of a job (see engine/progress.py) are put into the returned channel
+    # until unsubscribe is called
+    def subscribe(self, job_id: str) -> ProgressChannel:
+        channel = ProgressChannel()
+        with self.condition:
+            self.channels.setdefault(job_id, []).append(channel)
+        return channel
+
+    def unsubscribe(self, job_id: str, channel: ProgressChannel) -> None:
+        with self.condition:
+            channels = self.channels.get(job_id, [])
+            if channel in channels:
+                channels.remove(channel)
+            if not channels:
+                self.channels.pop(job_id, None)
+
+    # Called on the thread receiving the event from the worker
+    def __publish(self, job: RenderJob, event: dict) -> None:
+        with self.condition:
+            channels = list(self.channels.get(job.id, ()))
+        for channel in channels:
+            channel.put(event)
+
+    # Cancel a queued job or abort it while it renders. The render worker is killed, which
+    # stops Cycles right away. Partly written outputs are deleted, the finished frames of an
+    # animation (a retry continues with them) or views of a turntable only if not keep_frames
+    def cancel(self, job_id: str, keep_frames: bool = True) -> None:
+        with self.condition:
+            job = self.__find(job_id)
+            if job is None or job.is_finished():
+                return
+            job.status = JobStatus.CANCELLED
+            job.finished = time.time()
+            is_current = job is self.current
+            if is_current:
+                self.keep_frames = keep_frames
+            self.__changed()
+        if is_current:
+            # cleaned up by the queue thread once the workers stopped
+            self.engine.kill()
+            parallel = self.parallel
+            if parallel is not None:
+                parallel.cancel()
+        else:
+            clean_up(job, keep_frames)
+
+    # Run a failed or cancelled job again, animations continue with their missing frames
+    def retry(self, job_id: str) -> None:
+        with self.condition:
+            job = self.__find(job_id)
+            if job is None or job.status not in (JobStatus.FAILED, JobStatus.CANCELLED):
+                return
+            job.status = JobStatus.QUEUED
+            job.attempts = 0
+            job.error = ""
+            job.frames_done = 0
+            self.__changed()
+
+    def set_priority(self, job_id: str, priority: int) -> None:
+        with self.condition:
+            job = self.__find(job_id)
+            if job is not None:
+                job.priority = priority
+                self.__changed()
+
+    # Remove a job which is not rendering, together with its snapshot
+    def remove(self, job_id: str) -> None:
+        with self.condition:
+            job = self.__find(job_id)
+            if job is None or job is self.current:
+                return
+            self.jobs.remove(job)
+            self.__changed()
+        remove_files(job)
+
+    def shutdown(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.engine.kill()
+        if self.parallel is not None:
+            self.parallel.cancel()
+
+    def __find(self, job_id: str) -> RenderJob:
+        for job in self.jobs:
+            if job.id == job_id:
+                return job
+        return None
+
+    # Must be called with the condition held
+    def __changed(self) -> None:
+        self.version += 1
+        try:
+            self.store.save(self.jobs)
+        except OSError as e:
+            print("Could not save render queue: " + str(e))
+        self.condition.notify()
+
+    # Highest priority first, oldest first among equal priorities
+    def __next_job(self) -> RenderJob:
+        queued = [job for job in self.jobs if job.status == JobStatus.QUEUED]
+        if not queued:
+            return None
+        return min(queued, key=lambda job: (-job.priority, job.created))
+
+    def __run(self):
+        while True:
+            with self.condition:
+                while self.running and self.__next_job() is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                job = self.__next_job()
+                job.status = JobStatus.RUNNING
+                job.attempts += 1
+                job.started = time.time()
+                job.frames_done = 0
+                self.current = job
+                self.__changed()
+
+            error = None
+            frame_seconds = None
+            try:
+                frame_seconds = self.__render(job)
+            except EngineCrashed as e:
+                error = str(e)
+            except EngineError as e:
+                error = str(e).strip().splitlines()[-1]
+            except Exception:
+                error = traceback.format_exc().strip().splitlines()[-1]
+
+            with self.condition:
+                self.current = None
+                # a render which finished before the cancel arrived keeps its output
+                aborted = job.status == JobStatus.CANCELLED and error is not None
+                keep_frames, self.keep_frames = self.keep_frames, True
+                if job.status == JobStatus.RUNNING:
+                    job.finished = time.time()
+                    if error is None:
+                        job.status = JobStatus.DONE
+                        if self.log is not None and job.features and frame_seconds:
+                            self.log.add(job.features, frame_seconds)
+                    elif job.attempts < job.max_attempts:
+                        print(f"Render job {job.name} failed ({error}), retrying")
+                        job.status = JobStatus.QUEUED
+                    else:
+                        job.status = JobStatus.FAILED
+                        job.error = error
+                self.__changed()
+            if aborted:
+                clean_up(job, keep_frames)
+            elif job.status == JobStatus.DONE:
+                remove_files(job)
+
+    # Returns the seconds one frame (or view) took to render, None if unknown
+    def __render(self, job: RenderJob) -> float:
+        if job.animation:
+            return self.__render_frames(job)
+        self.engine.call("load", path=job.snapshot, base_dir=self.base_dir,
+                         aspect=job.aspect, time_limit=job.time_limit)
+        # a cancel between the calls finds no worker to kill, the next one would render
+        check_cancelled(job)
+        start = time.monotonic()
+        publish = lambda event: self.__publish(job, event)
+        if job.views:
+            def on_view(event):
+                if "stage" in event:
+                    publish(event)
+                    return
+                with self.condition:
+                    job.frames_done += 1
+                    self.version += 1
+            self.engine.call("render_views", on_progress=on_view, directory=job.output, poses=job.views)
+            return (time.monotonic() - start) / len(job.views)
+        self.engine.call("render", on_progress=publish, filepath=job.output, animation=False)
+        return time.monotonic() - start
+
+    # Animations are rendered into an image sequence (with job.workers processes) and
+    # encoded at the end. The frames are kept until the video is written, so a retried or
+    # restarted job continues where it stopped
+    def __render_frames(self, job: RenderJob) -> float:
+        def on_frame(frame, seconds):
+            with self.condition:
+                job.frames_done = parallel.resumed + len(parallel.frame_times)
+                self.version += 1
+
+        directory = frames_directory(job)
+        parallel = ParallelAnimationRender(job.snapshot, job.output, directory, job.workers,
+                                           self.base_dir, job.aspect, job.time_limit, on_frame,
+                                           on_event=lambda event: self.__publish(job, event))
+        self.parallel = parallel
+        try:
+            check_cancelled(job)   # cancelled while it was set up, before there was something to stop
+            stats = parallel.run()
+        finally:
+            self.parallel = None
+        if job.workers > 1:
+            job.speedup = stats["speedup"]
+        shutil.rmtree(directory, ignore_errors=True)
+        if stats["frames"] > 0:
+            return stats["serial_seconds"] / stats["frames"]
+        return None
+
+def check_cancelled(job: RenderJob) -> None:
+    if job.status == JobStatus.CANCELLED:
+        raise InterruptedError("Render cancelled")
+
+# Directory of the image sequence of an animation job
+def frames_directory(job: RenderJob) -> str:
+    return os.path.splitext(job.snapshot)[0] + "_frames"
+
+# Delete the snapshot of a job and the frames of an animation, which is encoded by then
+def remove_files(job: RenderJob) -> None:
+    try:
+        if os.path.exists(job.snapshot):
+            os.remove(job.snapshot)
+    except OSError as e:
+        print(f"Could not remove the snapshot of render job {job.name}: {e}")
+    shutil.rmtree(frames_directory(job), ignore_errors=True)
+
+# Remove what a cancelled job wrote since it started: always the output, unless it is the
+# directory of a turntable, and the frames or views if not keep_frames
+def clean_up(job: RenderJob, keep_frames: bool) -> None:
+    if job.started == 0:
+        return   # never rendered
+    def written(path: str) -> bool:
+        return os.path.isfile(path) and os.path.getmtime(path) >= job.started
+    try:
+        if not job.views and written(job.output):
+            os.remove(job.output)
+        if keep_frames:
+            return
+        if job.views and os.path.isdir(job.output):
+            for name in os.listdir(job.output):
+                path = os.path.join(job.output, name)
+                if re.fullmatch(r"view_\d+\.png|contact_sheet\.png", name) and written(path):
+                    os.remove(path)
+        elif job.animation:
+            shutil.rmtree(frames_directory(job), ignore_errors=True)
+    except OSError as e:
+        print(f"Could not clean up render job {job.name}: {e}")
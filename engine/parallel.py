@@ -0,0 +1,241 @@
+# created on: 17/10/2026
+
+# description:
+# Renders an animation with several worker processes at once. Every worker renders
+# frames into an image sequence, the frames are handed out in chunks sized by the
+# measured time per frame: large chunks while many frames are left (little overhead),
+# single frames near the end, so no worker idles while another one still has a long
+# chunk. Finally the frames are encoded into the video.
+# Finished frames are recorded in a manifest, an interrupted render continues with
+# the missing frames when it is started again.
+
+import os
+import threading
+import time
+import hashlib
+import yaml
+from PIL import Image
+
+from engine.client import RenderEngine
+from engine.worker import frame_file
+
+class FrameScheduler:
+    CHUNK_SECONDS = 20   # a chunk should take about this long with the measured frame time
+
+    def __init__(self, frames: list, workers: int):
+        self.pending = list(frames)
+        self.workers = workers
+        self.in_flight = 0   # chunks handed out and not finished yet
+        self.condition = threading.Condition()
+        self.frame_seconds = None   # moving average of the time per frame
+
+    # Take the next chunk of frames, an empty list once all frames are rendered
+    # Waits while other workers still render, they might give frames back
+    def next_chunk(self) -> list:
+        with self.condition:
+            while not self.pending and self.in_flight > 0:
+                self.condition.wait()
+            if self.frame_seconds is None:
+                size = 1   # nothing measured yet
+            else:
+                by_cost  = int(self.CHUNK_SECONDS / max(self.frame_seconds, 1e-3))
+                # guided: never more than half a fair share of what is left
+                by_share = len(self.pending) // (2 * self.workers)
+                size = max(1, min(by_cost, by_share))
+            chunk = self.pending[:size]
+            del self.pending[:size]
+            if chunk:
+                self.in_flight += 1
+            return chunk
+
+    # A chunk is finished, frames which were not rendered (e.g. crashed worker) are handed out again
+    def done(self, unfinished: list = ()) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            self.pending = sorted(set(self.pending) | set(unfinished))
+            self.condition.notify_all()
+
+    def measured(self, seconds: float) -> None:
+        with self.condition:
+            if self.frame_seconds is None:
+                self.frame_seconds = seconds
+            else:
+                self.frame_seconds = 0.8 * self.frame_seconds + 0.2 * seconds
+
+# Records which frames of an image sequence are finished
+# signature: identifies the scene and settings, frames of another signature are rendered again
+class FrameManifest:
+    FILENAME = "manifest.yaml"
+
+    def __init__(self, directory: str, signature: str):
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILENAME)
+        self.signature = signature
+        self.frames = {}   # frame -> {"size": bytes, "seconds": render time}
+        self.lock = threading.Lock()
+
+    # Read the manifest and keep the frames whose image is still complete
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                dic = yaml.safe_load(f) or {}
+        except Exception as e:
+            print("Ignoring broken frame manifest: " + str(e))
+            return
+        if dic.get("signature") != self.signature:
+            return
+        for frame, entry in (dic.get("frames") or {}).items():
+            if self.is_valid(int(frame), entry):
+                self.frames[int(frame)] = entry
+
+    def is_valid(self, frame: int, entry: dict) -> bool:
+        file = frame_file(self.directory, frame)
+        try:
+            if os.path.getsize(file) != entry["size"]:
+                return False
+            with Image.open(file) as image:
+                image.verify()
+            return True
+        except Exception:
+            return False
+
+    def add(self, frame: int, seconds: float) -> None:
+        with self.lock:
+            self.frames[frame] = {"size": os.path.getsize(frame_file(self.directory, frame)),
+                                  "seconds": seconds}
+            self.save()
+
+    # Written to a temporary file first, an interruption never breaks the manifest
+    def save(self) -> None:
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            yaml.safe_dump({"signature": self.signature, "frames": self.frames}, f)
+        os.replace(temp, self.path)
+
+# Signature of a snapshot file, used for its frame manifest
+def file_signature(path: str) -> str:
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+class ParallelAnimationRender:
+    # snapshot: .blend with the final render settings applied
+    # directory: where the frame images are written
+    # on_frame(frame, seconds): called on a worker thread after each frame
+    # on_event(event): live render events of the workers (see utils.RenderMonitor), with
+    # the name of the worker added as "worker"
+    def __init__(self, snapshot: str, output: str, directory: str, workers: int,
+                 base_dir: str, aspect: tuple, time_limit: float, on_frame=None, on_event=None):
+        self.snapshot = snapshot
+        self.output = output
+        self.directory = directory
+        self.base_dir = base_dir
+        self.aspect = aspect
+        self.time_limit = time_limit
+        self.on_frame = on_frame
+        self.on_event = on_event
+        self.engines = [RenderEngine(f"animation {i + 1}") for i in range(max(1, workers))]
+        self.cancelled = False
+        self.frame_times = {}   # frames rendered by this run
+        self.errors = []
+        self.manifest = FrameManifest(directory, file_signature(snapshot))
+        self.resumed = 0        # frames taken over from an earlier run
+
+    # Render all frames and encode them, returns a dictionary with timings
+    def run(self) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.monotonic()
+        info = self.__load(self.engines[0])
+        frames = list(range(info["frame_start"], info["frame_end"] + 1))
+        self.manifest.load()
+        todo = [frame for frame in frames if frame not in self.manifest.frames]
+        self.resumed = len(frames) - len(todo)
+        if self.resumed > 0:
+            print(f"Resuming animation render, {self.resumed} of {len(frames)} frames are already done")
+        scheduler = FrameScheduler(todo, len(self.engines))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // len(self.engines))
+
+        threads = [threading.Thread(target=self.__work, args=(engine, scheduler, threads_per_worker),
+                                    daemon=True)
+                   for engine in self.engines]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if self.cancelled:
+                raise InterruptedError("Render cancelled")
+            missing = [frame for frame in frames if frame not in self.manifest.frames]
+            if missing:
+                raise RuntimeError(f"{len(missing)} frames were not rendered: " + "; ".join(self.errors))
+            render_seconds = time.monotonic() - start
+
+            self.engines[0].call("encode", files=[frame_file(self.directory, frame) for frame in frames],
+                                 output=self.output, fps=info["fps"])
+        finally:
+            self.kill()
+        return self.report(render_seconds, time.monotonic() - start)
+
+    # Compare to a single process, which would need about the sum of all frame times
+    def report(self, render_seconds: float, total_seconds: float) -> dict:
+        serial = sum(self.frame_times.values())
+        stats = {"frames": len(self.frame_times),
+                 "resumed": self.resumed,
+                 "workers": len(self.engines),
+                 "render_seconds": render_seconds,
+                 "total_seconds": total_seconds,
+                 "serial_seconds": serial,
+                 "speedup": serial / render_seconds if render_seconds > 0 else 1}
+        print("Rendered {frames} frames ({resumed} resumed) with {workers} workers in {render_seconds:.1f} s, "
+              "one process needs about {serial_seconds:.1f} s (speedup {speedup:.2f}x)".format(**stats))
+        return stats
+
+    # Stop all workers, may be called from any thread
+    def kill(self) -> None:
+        for engine in self.engines:
+            engine.kill()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.kill()
+
+    def __load(self, engine: RenderEngine) -> dict:
+        return engine.call("load", path=self.snapshot, base_dir=self.base_dir,
+                           aspect=self.aspect, time_limit=self.time_limit)
+
+    def __work(self, engine: RenderEngine, scheduler: FrameScheduler, threads: int):
+        def on_progress(event):
+            if "stage" in event:
+                if self.on_event is not None:
+                    self.on_event(dict(event, worker=engine.name))
+                return
+            self.frame_times[event["frame"]] = event["seconds"]
+            self.manifest.add(event["frame"], event["seconds"])
+            scheduler.measured(event["seconds"])
+            if self.on_frame is not None:
+                self.on_frame(event["frame"], event["seconds"])
+
+        loaded = engine.is_running()
+        while not self.cancelled:
+            chunk = scheduler.next_chunk()
+            if not chunk:
+                return
+            if self.cancelled:
+                scheduler.done(chunk)
+                return
+            try:
+                if not loaded:
+                    self.__load(engine)
+                    loaded = True
+                engine.call("render_frames", on_progress=on_progress, cancelled=lambda: self.cancelled,
+                            directory=self.directory, frames=chunk, threads=threads)
+            except Exception as e:
+                # the other workers pick up the frames, this one stops
+                scheduler.done([frame for frame in chunk if frame not in self.frame_times])
+                self.errors.append(str(e).strip().splitlines()[-1])
+                return
+            scheduler.done([frame for frame in chunk if frame not in self.frame_times])
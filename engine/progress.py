@@ -0,0 +1,122 @@
+# created on: 17/10/2026
+
+# description:
+# Live progress of final renders. The render worker reports from Blender's render
+# handlers (see utils.RenderMonitor), the events arrive on the thread of the render
+# queue, which puts them into a ProgressChannel for every window following the job.
+# The windows drain their channel with after() on the Tk main loop, so Tk is only ever
+# touched from its own thread.
+# RenderProgress sums the events up: sample and frame progress, the time of every
+# frame, throughput and the time left.
+
+import queue
+import time
+
+class ProgressChannel:
+    MAX_EVENTS = 1000   # a window which stopped draining can't fill up the memory
+
+    def __init__(self):
+        self.events = queue.Queue(self.MAX_EVENTS)
+
+    # May be called from any thread, events are dropped while the channel is full
+    def put(self, event: dict) -> None:
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            pass
+
+    # All events which arrived since the last call
+    def drain(self) -> list:
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+class RenderProgress:
+    MIN_FRACTION = 0.05   # sample progress of a frame below this says little about its time
+
+    def __init__(self, frames_total: int = 1, frames_done: int = 0):
+        self.frames_total = max(1, frames_total)
+        self.frames_done = frames_done
+        self.frame_times = []   # seconds of the frames rendered while following the job
+        self.current = {}       # worker -> {"frame", "sample", "samples", "remaining", "started"}
+        self.first_start = None # the first frame started rendering (time.monotonic)
+
+    # Take over frame counts of engine.jobs.RenderJob, they include resumed frames
+    def update(self, job) -> None:
+        self.frames_total = max(1, job.frames_total)
+        self.frames_done = job.frames_done
+
+    def add(self, event: dict) -> None:
+        worker = event.get("worker", "")
+        stage = event["stage"]
+        now = time.monotonic()
+        if stage == "frame":
+            if self.first_start is None:
+                self.first_start = now
+            self.current[worker] = {"frame": event["frame"], "sample": 0, "samples": 0,
+                                    "remaining": None, "started": now}
+        elif stage == "sample" and worker in self.current:
+            self.current[worker].update(sample=event["sample"], samples=event["samples"],
+                                        remaining=event["remaining"])
+        elif stage == "rendered":
+            self.current.pop(worker, None)
+            self.frame_times.append(event["seconds"])
+
+    # Fraction of the current frame of worker which is sampled
+    def frame_fraction(self, worker: str = "") -> float:
+        state = self.current.get(worker)
+        if state is None or state["samples"] <= 0:
+            return 0
+        return min(1, state["sample"] / state["samples"])
+
+    # Fraction of the job which is done, frames being rendered count with their samples
+    def fraction(self) -> float:
+        partial = sum(self.frame_fraction(worker) for worker in self.current)
+        return min(1, (self.frames_done + partial) / self.frames_total)
+
+    def last_frame_seconds(self) -> float:
+        return self.frame_times[-1] if self.frame_times else None
+
+    def mean_frame_seconds(self) -> float:
+        return sum(self.frame_times) / len(self.frame_times) if self.frame_times else None
+
+    # Frames finished per minute of wall time, parallel workers included
+    def throughput(self) -> float:
+        if not self.frame_times or self.first_start is None:
+            return None
+        elapsed = time.monotonic() - self.first_start
+        return 60 * len(self.frame_times) / elapsed if elapsed > 0 else None
+
+    # Seconds the current frame of worker still needs, None without a guess
+    def frame_remaining(self, worker: str = "") -> float:
+        state = self.current.get(worker)
+        if state is None:
+            return None
+        if state["remaining"] is not None:
+            return state["remaining"]
+        fraction = self.frame_fraction(worker)
+        if fraction < self.MIN_FRACTION:
+            return None
+        elapsed = time.monotonic() - state["started"]
+        return elapsed * (1 - fraction) / fraction
+
+    # Seconds until the job is finished, None until there is something to go by
+    def remaining(self) -> float:
+        left = self.frames_total - self.frames_done - len(self.current)
+        throughput = self.throughput()
+        if throughput:
+            # frames being rendered count by their samples, at the pace of the finished ones
+            partial = sum(1 - self.frame_fraction(worker) for worker in self.current)
+            return max(0, (left + partial) * 60 / throughput)
+        # nothing finished yet, the frames being rendered show how long one takes
+        now = time.monotonic()
+        guesses = [(self.frame_remaining(worker), now - state["started"]) for worker, state in self.current.items()]
+        guesses = [(remaining, elapsed) for remaining, elapsed in guesses if remaining is not None]
+        if not guesses:
+            return None
+        frame_seconds = sum(remaining + elapsed for remaining, elapsed in guesses) / len(guesses)
+        current = max(remaining for remaining, _ in guesses)
+        return current + max(0, left) * frame_seconds / len(self.current)
@@ -0,0 +1,228 @@
+# created on: 17/10/2026
+
+# description:
+# Render worker, runs Blender in its own process so renders don't block the GUI
+# and a crashing or stuck render can be killed without losing the program.
+# The GUI (see engine/client.py) connects over a local socket and sends commands
+# as (command, arguments) tuples, the worker answers with
+#   ("progress", event)  any number of times while a command runs
+#   ("ok", result)       once the command finished
+#   ("error", message)   if the command raised an exception
+# Final renders report their progress with the events of utils.RenderMonitor, which carry
+# a "stage", besides the events of the command itself
+# Scenes are handed over as .blend snapshots, see utils.export_snapshot. A preview
+# snapshot stays loaded, previews send the state of the scene (utils.scene_state) along
+
+import os
+import sys
+import threading
+import traceback
+from multiprocessing.connection import Client
+
+AUTHKEY_ENV = "RENDER_WORKER_AUTHKEY"
+
+# "host:port" -> (host, port)
+def parse_address(address: str):
+    host, port = address.rsplit(":", 1)
+    return (host, int(port))
+
+# Image file of a frame rendered by render_frames
+def frame_file(directory: str, frame: int) -> str:
+    return os.path.join(directory, f"frame_{frame:05d}.png")
+
+# Encode a PIL image so it can be sent over the connection
+def image_message(image):
+    if image is None:
+        return None
+    return (image.mode, image.size, image.tobytes())
+
+class WorkerSession:
+    def __init__(self, conn):
+        self.conn = conn
+        self.renderer = None
+        self.batch_scene = None   # warm scene for batch renders, set up on first use
+        self.cancel_requested = False
+        # Blender's render handlers may send from a render thread
+        self.send_lock = threading.Lock()
+
+    def send(self, message: tuple):
+        with self.send_lock:
+            self.conn.send(message)
+
+    def send_progress(self, event: dict):
+        self.send(("progress", event))
+
+    # Polled between render passes, the client sends "cancel" when the result is outdated
+    def cancelled(self) -> bool:
+        while not self.cancel_requested and self.conn.poll():
+            command, _ = self.conn.recv()
+            if command == "cancel":
+                self.cancel_requested = True
+        return self.cancel_requested
+
+    def handle(self, command: str, args: dict):
+        handler = getattr(self, "cmd_" + command, None)
+        if handler is None:
+            raise ValueError("Unknown command: " + command)
+        self.cancel_requested = False
+        return handler(**args)
+
+    def cmd_ping(self):
+        return {"pid": os.getpid()}
+
+    # Load a scene snapshot and take over the render settings stored in it
+    # remap: see utils.load_snapshot
+    def cmd_load(self, path: str, base_dir: str, aspect: tuple, time_limit: float, remap: dict = None):
+        import bpy
+        import utils
+        utils.load_snapshot(path, base_dir, remap)
+        scene = bpy.context.scene
+        self.renderer = utils.Renderer(scene.camera, time_limit, tuple(aspect))
+        return {"objects": len(scene.objects),
+                "frame_start": scene.frame_start,
+                "frame_end": scene.frame_end,
+                "fps": scene.render.fps}
+
+    # Measure the render time of the loaded scene, see Renderer.probe
+    # The result includes the utils.scene_features of the scene
+    def cmd_probe(self, frames: list):
+        import utils
+        features = utils.scene_features(self.renderer.scene)
+        probe = self.renderer.probe(frames)
+        probe["features"] = features
+        return probe
+
+    # External files of the loaded scene, [(path as stored, absolute path)]
+    def cmd_assets(self):
+        import utils
+        return utils.scene_assets()
+
+    # mode: "full", "progressive" (intermediate passes are sent as progress) or "interactive"
+    # state: utils.scene_state of the scene in the GUI, applied to the loaded snapshot first
+    def cmd_preview(self, mode: str = "full", state: dict = None):
+        if state is not None:
+            import utils
+            scene = self.renderer.scene
+            utils.apply_scene_state(scene, state)
+            self.renderer.camera = scene.camera
+            self.renderer.preview_samples = scene.cycles.samples
+            self.renderer.time_limit = scene.cycles.time_limit
+        if mode == "interactive":
+            image = self.renderer.render_interactive()
+        elif mode == "progressive":
+            publish = lambda image: self.send_progress({"image": image_message(image)})
+            image = self.renderer.render_progressive(publish, self.cancelled)
+        else:
+            image = self.renderer.render_to_image()
+        return image_message(image)
+
+    # Render the loaded scene with its current settings to filepath
+    def cmd_render(self, filepath: str, animation: bool = False):
+        import bpy
+        import utils
+        scene = self.renderer.scene
+        scene.render.filepath = filepath
+        with utils.RenderMonitor(self.send_progress):
+            self.renderer.render(animation=animation)
+        return {"filepath": bpy.path.abspath(filepath)}
+
+    # Render single frames of the animation as png images into directory
+    # Sends {"frame", "seconds", "file"} after every frame, stops early when cancelled
+    # threads: cycles threads, so several workers can share the machine (0 = all)
+    def cmd_render_frames(self, directory: str, frames: list, threads: int = 0):
+        import time
+        import utils
+        scene = self.renderer.scene
+        if threads > 0:
+            scene.render.threads_mode = "FIXED"
+            scene.render.threads = threads
+        # Keep the synced scene between the frames, only transforms and lights change
+        scene.render.use_persistent_data = True
+        rendered = 0
+        with utils.RenderMonitor(self.send_progress):
+            for frame in frames:
+                if self.cancelled():
+                    break
+                start = time.monotonic()
+                scene.frame_set(frame)
+                scene.render.filepath = frame_file(directory, frame)
+                self.renderer.render(animation=False)
+                rendered += 1
+                self.send_progress({"frame": frame,
+                                    "seconds": time.monotonic() - start,
+                                    "file": scene.render.filepath})
+        return {"rendered": rendered}
+
+    # Render the loaded scene from several poses (yaw, elevation) of the orbit camera
+    # into directory, optionally combined into directory/contact_sheet.png
+    # Sends {"view", "seconds"} after every view
+    def cmd_render_views(self, directory: str, poses: list, contact_sheet: bool = True):
+        import utils
+        controller = self.renderer.camera.parent
+        if controller is None:
+            raise ValueError("The active camera is not an orbit camera")
+        on_view = lambda index, seconds: self.send_progress({"view": index, "seconds": seconds})
+        with utils.RenderMonitor(self.send_progress):
+            files = self.renderer.render_views(controller, poses, directory, on_view, self.cancelled)
+        if contact_sheet and files:
+            utils.make_contact_sheet(files, os.path.join(directory, "contact_sheet.png"))
+        return {"files": files}
+
+    # Make the gallery thumbnail of an HDRI, see utils.generate_hdri_thumbnail
+    def cmd_hdri_thumbnail(self, path: str, output: str):
+        import utils
+        utils.generate_hdri_thumbnail(path, output)
+        return {"output": output}
+
+    # Combine rendered frames into the video file output
+    def cmd_encode(self, files: list, output: str, fps: int):
+        import utils
+        utils.encode_image_sequence(files, output, fps)
+        return {"filepath": output}
+
+    # Render a scene spec (batch.spec.SceneSpec as dictionary) in a scene which stays
+    # set up between the calls, returns the timings of batch.scene.BatchScene.render
+    def cmd_batch(self, spec: dict):
+        from batch.spec import SceneSpec
+        return self.__batch_scene().render(SceneSpec.from_dict(spec, spec.get("name", "")))
+
+    # Set up the batch scene with models and HDRIs loaded ahead, see BatchScene.preload
+    def cmd_warm(self, models: list = (), hdris: list = ()):
+        import time
+        start = time.monotonic()
+        self.__batch_scene().preload(models, hdris)
+        return {"seconds": time.monotonic() - start}
+
+    def __batch_scene(self):
+        from batch.scene import BatchScene
+        if self.batch_scene is None:
+            self.batch_scene = BatchScene()
+        return self.batch_scene
+
+    # Answer commands until the client disconnects
+    def run(self):
+        while True:
+            try:
+                command, args = self.conn.recv()
+            except (EOFError, OSError):
+                return
+            if command == "cancel":
+                continue   # arrived after its render finished, nothing to answer
+            try:
+                result = self.handle(command, args)
+            except Exception:
+                self.send(("error", traceback.format_exc()))
+            else:
+                self.send(("ok", result))
+
+def serve(address: str, authkey: bytes = None):
+    if authkey is None:
+        authkey = bytes.fromhex(os.environ[AUTHKEY_ENV])
+    conn = Client(parse_address(address), authkey=authkey)
+    try:
+        WorkerSession(conn).run()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
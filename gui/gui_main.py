@@ -11,7 +11,7 @@ from tkinter import Frame, Toplevel, Label, Button, StringVar, BooleanVar, IntVa
 from tkinter import ttk
 from tkinter.colorchooser import askcolor
 from tkinter.messagebox import showinfo, showerror
-from tkinter import filedialog
+from tkinter import filedialog, simpledialog
 from PIL import ImageTk, Image
 
 from pointcloud.CreatePointcloudFromObject import convert_active_to_pointcloud,switch_random,switch_vertex,set_sphere,set_disk,set_cube,set_monkey,create_point_objects,set_size,add_plane,select_main_object,remove_geometry_mod
@@ -28,7 +28,7 @@ import random
 
 from gui.render_preview import RenderPreview
 from gui.gui_options import SettingsWindow
-from gui.gui_utils import widget_set_enabled, frame_set_enabled
+from gui.gui_utils import widget_set_enabled, frame_set_enabled, bind_live_preview
 from gui.panel_materials import MaterialWidgets
 from gui.settings import Control
 import gui.gui_utils as gui_utils
@@ -36,8 +36,10 @@ import gui.gui_utils as gui_utils
 from camera_animation import camera_animation_module as cammod
 
 from gui.loading_screen import VideoLoadingScreen, ImageLoadingScreen
+from gui.queue_window import RenderQueueWindow
 import gui.properties as props
 from gui.anim_window import PreviewWindow, PreviewContent
+from gui.hdri_thumbnails import HdriThumbnailCache, list_hdris
 from gui.properties import *
 from gui.settings import load_settings, save_settings
 
@@ -66,17 +68,15 @@ class ProgramGUI(tk.Frame):
         settings = load_settings()
         camera   = utils.OrbitCam()
         renderer = utils.Renderer(camera.camera, settings.timelimit, (settings.aspect.width, settings.aspect.height))
+        renderer.set_persistent_data(settings.persistent_data)
         renderer.set_preview_render()
         self.max_frame = IntVar()
         frames = utils.FrameControl(self.max_frame)
 
         hdri.initialize_world_texture()
 
-        #generate HDRI previews
-        hdri_dir = os.fsencode(PATH_HDRI)
-        for file in os.listdir(hdri_dir):
-            filename = os.fsdecode(file)
-            utils.generate_hdri_thumbnail(PATH_HDRI + filename)
+        # HDRI previews which are missing or outdated are made once the window is shown
+        self.thumbnails = HdriThumbnailCache()
         
         master.title("Render adjuster")
         master.minsize(107+1135+184,507)
@@ -100,7 +100,7 @@ class ProgramGUI(tk.Frame):
         self.right = RightPanel(self, self.control)
         
         camcontrols = CameraControls(mid, self.control)
-        background_ctrl = BackgroundControl(mid, self.control)
+        background_ctrl = BackgroundControl(mid, self.control, self.thumbnails)
         frm_frame = FrameWidgets(mid, self.control, self.max_frame)
         
         self.disable_model_widgets()
@@ -121,6 +121,8 @@ class ProgramGUI(tk.Frame):
         if props.DEBUG:
             self.left.import_model(PATH_MODELS + "cube.obj")
         self.control.re_render()
+        self.after_idle(background_ctrl.update_thumbnails)
+        self.after_idle(background_ctrl.prefetch_hdris)
     
     # Disables all frames that require an object
     def disable_model_widgets(self):
@@ -151,11 +153,15 @@ class LeftPanel(Frame):
         btn_export = Button(master=self, text="Export model", command=self.export_model)
         btn_render = Button(master=self, text="Save render", command=self.render_image)
         btn_video  = Button(master=self, text="Save video", command=self.render_video)
+        btn_turntable = Button(master=self, text="Save turntable", command=self.render_turntable)
+        btn_queue  = Button(master=self, text="Render queue", command=self.open_render_queue)
         lbl_fileop.pack(fill=tk.X)
         btn_import.pack(fill=tk.X)
         btn_export.pack(fill=tk.X)
         btn_render.pack(fill=tk.X)
         btn_video.pack(fill=tk.X)
+        btn_turntable.pack(fill=tk.X)
+        btn_queue.pack(fill=tk.X)
         
         sep = ttk.Separator(self,orient='horizontal')
         sep.pack(fill=tk.X)
@@ -206,6 +212,7 @@ class LeftPanel(Frame):
             utils.remove_object(self.control.model)
            
         self.control.model = utils.import_mesh(filename)
+        self.control.invalidate_geometry()
         self.control.material.apply_material(self.control.model)
         # recompute vertex colors if activated:
         if(self.control.vertc.get()):
@@ -237,21 +244,25 @@ class LeftPanel(Frame):
         if filename == "":
             return
         
-        self.loading_image = ImageLoadingScreen(self)
-        self.update_idletasks()
-        
-        def render_finished(scene):
-            self.loading_image.close_window()
-            utils.unregister_handler(render_finished, utils.Handler.FINISHED)
-        utils.register_handler(render_finished, utils.Handler.FINISHED)
-        
-        def render():
-            self.control.renderer.set_final_render(file_path=filename)
-            self.control.renderer.render(animation=False)
-            self.control.renderer.set_preview_render()
-        
-        renderthread = threading.Thread(target=render)
-        renderthread.start()
+        job = self.control.submit_render(filename, animation=False)
+        self.loading_image = ImageLoadingScreen(self, self.control, job.id)
+    
+    # Render views all around the model into a directory, with a contact sheet
+    def render_turntable(self):
+        if self.control.renderer.camera != self.control.camera.camera:
+            showinfo("Turntable", "Turntables are rendered with the orbit camera, please disable the animation preview")
+            return
+        views = simpledialog.askinteger("Turntable", "Number of views", initialvalue=8, minvalue=1, maxvalue=360)
+        if views is None:
+            return
+        directory = filedialog.askdirectory(title="Save views in")
+        if directory == "":
+            return
+        job = self.control.submit_turntable(directory, views)
+        self.loading_image = ImageLoadingScreen(self, self.control, job.id)
+    
+    def open_render_queue(self):
+        RenderQueueWindow(self.master, self.control)
     
     def render_video(self):
         filename = filedialog.asksaveasfilename(
@@ -605,6 +616,7 @@ class ColorMeshWidgets(Frame):
             self.control.re_render()
     
     def update_vertex_color(self, var, index, mode):
+        self.control.invalidate_geometry()
         if self.control.vertc.get():
             widget_set_enabled(self.lbl_color, False)
             widget_set_enabled(self.btn_picker, False)
@@ -645,6 +657,10 @@ class TextureWidgets(Frame):
         btn_import_texture.grid(row=1, column=0, columnspan=2, sticky="")
         lbl_sel_tex.grid(row=2, column=0, sticky="w")
         dropdown_textures.grid(row=2, column=1, sticky="we")
+        self.after_idle(self.prefetch_textures)
+    
+    def prefetch_textures(self):
+        self.control.prefetch_images([PATH_TEXTURES + tex.value + ".png" for tex in Textures if tex != Textures.NONE])
     
     def set_texture(self, *args):
         tex = Textures(self.control.tex_selected.get())
@@ -731,6 +747,9 @@ class LightingWidgets(Frame):
         self.slider_brightness.bind("<ButtonRelease-1>", lambda event : self.set_brightness(self.get_brightness(), True)) 
         self.slider_daytime.bind("<ButtonRelease-1>", lambda event : self.set_daytime(self.get_daytime(), True)) 
         slider_background.bind("<ButtonRelease-1>", lambda event : self.set_background_strength(self.get_background_strength(), True)) 
+        bind_live_preview(self.slider_brightness, self.control, lambda: self.fit_brightness_to_lights(rerender=False))
+        bind_live_preview(self.slider_daytime, self.control, lambda: self.fit_brightness_to_lights(rerender=False))
+        bind_live_preview(slider_background, self.control)
 
         # packing
         lbl_light.grid(row=0, column=0, columnspan=2)
@@ -811,29 +830,30 @@ class LightingWidgets(Frame):
             self.fit_brightness_to_lights()
         
     # recreate lights with new brightness
-    def fit_brightness_to_lights(self) -> None:
+    def fit_brightness_to_lights(self, rerender: bool = True) -> None:
         match self.use_light_type:
             case 1:
-                self.set_day()
+                self.set_day(rerender)
                 return
             case 2:
-                self.set_night()
+                self.set_night(rerender)
                 return
             case 3:
-                self.set_lantern()
+                self.set_lantern(rerender)
                 return
             case _:
-                self.set_default_light()
+                self.set_default_light(rerender)
 
     # returns the brightness
     def get_brightness(self) -> float:
         return self.brightness
         
     # set default light
-    def set_default_light(self) -> None:
+    def set_default_light(self, rerender: bool = True) -> None:
         self.standard_light_settings(0)
         self.light_objects = create_default_light()
-        self.control.re_render()
+        if rerender:
+            self.control.re_render()
         
     # some setting that should be made before creating new lights
     def standard_light_settings(self, use_light_type: int) -> None:
@@ -851,22 +871,25 @@ class LightingWidgets(Frame):
         delete_all_lights()
 
     # set day light
-    def set_day(self) -> None:
+    def set_day(self, rerender: bool = True) -> None:
         self.standard_light_settings(1)
         self.light_objects = day_light(self.get_brightness(), self.get_daytime() * self.TIME_TO_ANGLE_CONSTANT, False, self.control.camera)
-        self.control.re_render()
+        if rerender:
+            self.control.re_render()
     
     # set night light
-    def set_night(self) -> None:
+    def set_night(self, rerender: bool = True) -> None:
         self.standard_light_settings(2)
         self.light_objects = night_light(self.get_brightness(), self.get_daytime() * self.TIME_TO_ANGLE_CONSTANT, True, self.control.camera)
-        self.control.re_render()
+        if rerender:
+            self.control.re_render()
         
     # set lantern light
-    def set_lantern(self) -> None:
+    def set_lantern(self, rerender: bool = True) -> None:
         self.standard_light_settings(3)
         self.light_objects = lantern_light(self.get_brightness(), self.HIGH_OF_LATERN_LIGHT, True, self.control.camera)
-        self.control.re_render()
+        if rerender:
+            self.control.re_render()
     
     # creates a day night circle if "self.is_day_night" = true
     # deletes the animations if "self.is_day_night" = false
@@ -886,7 +909,13 @@ class LightingWidgets(Frame):
     
     
 class BackgroundControl(Frame):
-    def __init__(self, master, control):
+    THUMBNAIL_POLL_MS = 200
+    # (label, file in PATH_HDRI) of the gallery
+    HDRIS = (("Green Park", "green_point_park_2k.hdr"),
+             ("Old Depot", "old_depot_2k.hdr"),
+             ("Desert", "syferfontein_6d_clear_2k.hdr"))
+    
+    def __init__(self, master, control, thumbnails: HdriThumbnailCache):
         Frame.__init__(self, master, borderwidth=2, relief="groove")
         
         self.rowconfigure(0, weight=1)
@@ -899,6 +928,7 @@ class BackgroundControl(Frame):
         self.columnconfigure(3, weight=1)
         self.columnconfigure(4, weight=1)
         self.control = control
+        self.thumbnails = thumbnails
         lbl_controls = Label(master=self, text="Background", font=FONT_TITLE)
         lbl_controls.grid(row=0, column=0, columnspan=5)
 
@@ -908,27 +938,51 @@ class BackgroundControl(Frame):
         empty_bg_btn = Button(master=self, image=self.empty_bg, command=self.remove_background)
         empty_bg_btn.grid(row=2, column=0)
 
-        bg1_lbl = Label(master=self, text="Green Park", font=FONT_TITLE)
-        bg1_lbl.grid(row=1, column=1)
-        self.bg1 = PhotoImage(file = "assets/hdri_thumbs/green_point_park_2k.hdr.png").subsample(2,2)
-        bg1_btn = Button(master=self, image=self.bg1, command=lambda: self.load_hdri("assets/hdris/green_point_park_2k.hdr"))
-        bg1_btn.grid(row=2, column=1)
-
-        bg2_lbl = Label(master=self, text="Old Depot", font=FONT_TITLE)
-        bg2_lbl.grid(row=1, column=2)
-        self.bg2 = PhotoImage(file = "assets/hdri_thumbs/old_depot_2k.hdr.png").subsample(2,2)
-        bg2_btn = Button(master=self, image=self.bg2, command=lambda: self.load_hdri("assets/hdris/old_depot_2k.hdr"))
-        bg2_btn.grid(row=2, column=2)
-
-        bg3_lbl = Label(master=self, text="Desert", font=FONT_TITLE)
-        bg3_lbl.grid(row=1, column=3)
-        self.bg3 = PhotoImage(file = "assets/hdri_thumbs/syferfontein_6d_clear_2k.hdr.png").subsample(2,2)
-        bg3_btn = Button(master=self, image=self.bg3, command=lambda: self.load_hdri("assets/hdris/syferfontein_6d_clear_2k.hdr"))
-        bg3_btn.grid(row=2, column=3)
+        # thumbnails from an earlier run are shown right away, missing ones are blank until made
+        self.hdri_buttons = {}   # HDRI path -> button
+        self.hdri_images = {}    # HDRI path -> PhotoImage, Tk needs a reference to keep it
+        for column, (name, filename) in enumerate(self.HDRIS, start=1):
+            path = PATH_HDRI + filename
+            lbl = Label(master=self, text=name, font=FONT_TITLE)
+            lbl.grid(row=1, column=column)
+            btn = Button(master=self, command=lambda path=path: self.load_hdri(path))
+            btn.grid(row=2, column=column)
+            self.hdri_buttons[path] = btn
+            self.set_thumbnail(path, self.thumbnails.thumbnail_path(path))
 
         btn_import_hdri = Button(master=self, text="Import custom HDRI", command=self.import_hdri)
         btn_import_hdri.grid(row=2, column=4)
 
+    # Show the thumbnail file on the button of the HDRI at path, a blank one if it is missing
+    def set_thumbnail(self, path: str, thumbnail: str):
+        if path not in self.hdri_buttons:
+            return
+        if thumbnail is not None and os.path.exists(thumbnail):
+            image = PhotoImage(file=thumbnail).subsample(2,2)
+        else:
+            image = PhotoImage(width=128, height=128)
+        self.hdri_images[path] = image
+        self.hdri_buttons[path]["image"] = image
+    
+    # Make missing or outdated thumbnails of all HDRIs in the background,
+    # the buttons are filled in as they are finished
+    def update_thumbnails(self):
+        if self.thumbnails.update(list_hdris()):
+            self.poll_thumbnails()
+    
+    def poll_thumbnails(self):
+        if not self.winfo_exists():
+            return
+        for path, thumbnail in self.thumbnails.ready():
+            if thumbnail is not None:
+                self.set_thumbnail(path, thumbnail)
+        if self.thumbnails.is_busy():
+            self.after(self.THUMBNAIL_POLL_MS, self.poll_thumbnails)
+    
+    # The gallery HDRIs are decoded in the background, switching between them is instant
+    def prefetch_hdris(self):
+        self.control.prefetch_images([PATH_HDRI + filename for _, filename in self.HDRIS])
+    
     def load_hdri(self, path: str):
         hdri.set_background_image(path)
         self.control.re_render()
@@ -943,8 +997,9 @@ class BackgroundControl(Frame):
         hdri.set_background_image(filename)
         self.control.re_render()
     
+    # the image stays in the image cache, picking it again doesn't load it again
     def remove_background(self):
-        hdri.remove_background_image()
+        hdri.remove_background_image(keep_image=True)
         self.control.re_render()
 
 class FrameWidgets(Frame):
@@ -965,6 +1020,7 @@ class FrameWidgets(Frame):
         lbl_frame_setting = Label(master=self, text="Frame", font=FONT_TITLE)
         self.slider_frame_setting = Scale(master=self, from_= 0, to=self.max_frame.get(), orient="horizontal", command=lambda val: self.set_frame(val, False))
         self.slider_frame_setting.bind("<ButtonRelease-1>", lambda event : self.set_frame(self.get_frame(), True)) 
+        bind_live_preview(self.slider_frame_setting, self.control, lambda: self.control.frames.set_current_frame(int(self.get_frame())))
         
         # packing
         lbl_frame_setting.grid(row=0)
@@ -1033,6 +1089,7 @@ class PointCloudWidgets(Frame):
         slider_size = Scale(master=self, to = 2, orient="horizontal",
                                   resolution = 0.05, showvalue=False, command=lambda val: self.set_size(val, False))
         slider_size.bind("<ButtonRelease-1>", lambda event : self.set_size(self.get_size(), True)) 
+        bind_live_preview(slider_size, self.control)
         slider_size.set(self.get_size())  
 
 
@@ -1058,6 +1115,7 @@ class PointCloudWidgets(Frame):
         elif tex == PointCloudObjects.MONKEY:
             set_monkey(self)
         
+        self.control.invalidate_geometry()
         self.select_main_object()
         self.control.re_render()
 
@@ -1067,6 +1125,7 @@ class PointCloudWidgets(Frame):
    
     # resets the pointcloud and settings when importing a new object
     def reset(self):
+        self.control.invalidate_geometry()
         remove_geometry_mod()
         self.hasconverted = False
         self.pointcloud.set(False)
@@ -1084,6 +1143,7 @@ class PointCloudWidgets(Frame):
         if(self.control.model != None):
             self.size = float(value)
             set_size(self,value)
+            self.control.invalidate_geometry()
             if is_released:
                 self.control.re_render()
 
@@ -1093,6 +1153,7 @@ class PointCloudWidgets(Frame):
         if self.random.get():
             if(self.hasconverted):
                 switch_random(self)
+                self.control.invalidate_geometry()
             self.vertices.set(False)
         else:
             self.vertices.set(True)
@@ -1104,6 +1165,7 @@ class PointCloudWidgets(Frame):
         if self.vertices.get():
             if(self.hasconverted):
                 switch_vertex(self)
+                self.control.invalidate_geometry()
             self.random.set(False)
         else:
             self.random.set(True)
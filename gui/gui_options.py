@@ -6,10 +6,11 @@
 # GUI element: A seperate window for settings/options
 
 import tkinter as tk
-from tkinter import Frame, Toplevel, Label, Button, Entry
+from tkinter import Frame, Toplevel, Label, Button, Entry, Checkbutton, BooleanVar
 from gui.properties import *
 from gui.gui_utils import validate_integer, validate_float
 from gui.settings import save_settings
+from image_cache import cache as image_cache
 
 class SettingsWindow(Toplevel):
         def __init__(self, master, control):
@@ -48,6 +49,32 @@ class SettingsContent(Frame):
         lbl_limit = Label(master=self, text="Time limit for preview render")
         self.ent_limit = Entry(master=self, fg="gray", width=10, validate="key", validatecommand=(self.register(validate_float), '%P'))
         
+        self.progressive = BooleanVar(self, value=self.control.settings.progressive)
+        check_progressive = Checkbutton(master=self, text="Progressive preview (fast first pass, then refine)", variable=self.progressive, anchor="w")
+        
+        lbl_scale = Label(master=self, text="Preview resolution scale")
+        self.ent_scale = Entry(master=self, fg="gray", width=10, validate="key", validatecommand=(self.register(validate_float), '%P'))
+        
+        self.persistent = BooleanVar(self, value=self.control.settings.persistent_data)
+        check_persistent = Checkbutton(master=self, text="Keep scene data between previews (faster, uses more memory)", variable=self.persistent, anchor="w")
+        self.process = BooleanVar(self, value=self.control.settings.render_process)
+        check_process = Checkbutton(master=self, text="Render in a separate process (keeps the program responsive)", variable=self.process, anchor="w")
+        
+        self.adaptive = BooleanVar(self, value=self.control.settings.adaptive_quality)
+        check_adaptive = Checkbutton(master=self, text="Adapt preview quality to a target time (s)", variable=self.adaptive, anchor="w")
+        self.ent_target = Entry(master=self, fg="gray", width=10, validate="key", validatecommand=(self.register(validate_float), '%P'))
+        
+        lbl_cache = Label(master=self, text="Preview cache size (MB)")
+        self.ent_cache = Entry(master=self, fg="gray", width=10, validate="key", validatecommand=(validate_int, '%P'))
+        lbl_cache_stats = Label(master=self, text=self.control.cache.stats(), fg="gray")
+        
+        lbl_images = Label(master=self, text="Image cache size (MB)")
+        self.ent_images = Entry(master=self, fg="gray", width=10, validate="key", validatecommand=(validate_int, '%P'))
+        lbl_images_stats = Label(master=self, text=image_cache.stats(), fg="gray")
+        
+        lbl_workers = Label(master=self, text="Processes rendering a video in parallel")
+        self.ent_workers = Entry(master=self, fg="gray", width=10, validate="key", validatecommand=(validate_int, '%P'))
+        
         lbl_settings = Label(master=self, text="Settings", font="Arial 10 bold")
         btn_ok = Button(master=self, text="Ok", command=self.accept)
         btn_cancel = Button(master=self, text="Cancel", command=self.cancel)
@@ -56,13 +83,28 @@ class SettingsContent(Frame):
         self.ent_width.insert(tk.END, str(self.control.settings.aspect.width))
         self.ent_height.insert(tk.END, str(self.control.settings.aspect.height))
         self.ent_limit.insert(tk.END, "{:.2f}".format(self.control.settings.timelimit))
+        self.ent_cache.insert(tk.END, str(int(self.control.settings.preview_cache_mb)))
+        self.ent_images.insert(tk.END, str(int(self.control.settings.image_cache_mb)))
+        self.ent_scale.insert(tk.END, "{:.2f}".format(self.control.settings.resolution_scale))
+        self.ent_target.insert(tk.END, "{:.2f}".format(self.control.settings.latency_target))
+        self.ent_workers.insert(tk.END, str(self.control.settings.animation_workers))
         
         self.ent_width.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
         self.ent_height.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
         self.ent_limit.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
+        self.ent_cache.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
+        self.ent_images.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
+        self.ent_scale.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
+        self.ent_target.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
+        self.ent_workers.bind("<FocusIn>", lambda event: event.widget.config(fg="black"))
         self.ent_width.bind("<FocusOut>", lambda event: self.on_entry_leave(event, self.control.settings.aspect.width))
         self.ent_height.bind("<FocusOut>", lambda event: self.on_entry_leave(event, self.control.settings.aspect.height))
         self.ent_limit.bind("<FocusOut>", lambda event: self.on_entry_leave(event, self.control.settings.timelimit))
+        self.ent_cache.bind("<FocusOut>", lambda event: self.on_entry_leave(event, int(self.control.settings.preview_cache_mb)))
+        self.ent_images.bind("<FocusOut>", lambda event: self.on_entry_leave(event, int(self.control.settings.image_cache_mb)))
+        self.ent_scale.bind("<FocusOut>", lambda event: self.on_entry_leave(event, self.control.settings.resolution_scale))
+        self.ent_target.bind("<FocusOut>", lambda event: self.on_entry_leave(event, self.control.settings.latency_target))
+        self.ent_workers.bind("<FocusOut>", lambda event: self.on_entry_leave(event, self.control.settings.animation_workers))
         
         self.columnconfigure(1, weight=1)
         lbl_settings.grid(row=0, column=0, columnspan=2)
@@ -70,8 +112,23 @@ class SettingsContent(Frame):
         frm_aspect.grid(row=1, column=1, pady=5, padx=5)
         lbl_limit.grid(row=2, column=0, sticky="w")
         self.ent_limit.grid(row=2, column=1, sticky="we", pady=5, padx=5)
-        btn_cancel.grid(row=3, column=0)
-        btn_ok.grid(row=3, column=1)
+        lbl_scale.grid(row=3, column=0, sticky="w")
+        self.ent_scale.grid(row=3, column=1, sticky="we", pady=5, padx=5)
+        check_progressive.grid(row=4, column=0, columnspan=2, sticky="w")
+        check_persistent.grid(row=5, column=0, columnspan=2, sticky="w")
+        check_process.grid(row=6, column=0, columnspan=2, sticky="w")
+        check_adaptive.grid(row=7, column=0, sticky="w")
+        self.ent_target.grid(row=7, column=1, sticky="we", pady=5, padx=5)
+        lbl_cache.grid(row=8, column=0, sticky="w")
+        self.ent_cache.grid(row=8, column=1, sticky="we", pady=5, padx=5)
+        lbl_cache_stats.grid(row=9, column=0, columnspan=2, sticky="w")
+        lbl_images.grid(row=10, column=0, sticky="w")
+        self.ent_images.grid(row=10, column=1, sticky="we", pady=5, padx=5)
+        lbl_images_stats.grid(row=11, column=0, columnspan=2, sticky="w")
+        lbl_workers.grid(row=12, column=0, sticky="w")
+        self.ent_workers.grid(row=12, column=1, sticky="we", pady=5, padx=5)
+        btn_cancel.grid(row=13, column=0)
+        btn_ok.grid(row=13, column=1)
     
     def on_entry_leave(self, event, default):
         if event.widget.get() == "" :
@@ -96,6 +153,25 @@ class SettingsContent(Frame):
             limit = float(self.ent_limit.get().replace(",", "."))
             self.control.set_time_limit(limit)
         
+        scale = float(self.ent_scale.get().replace(",", ".")) if self.ent_scale.get() != "" else 0
+        if scale > 0:
+            self.control.set_resolution_scale(scale)
+        
+        target = float(self.ent_target.get().replace(",", ".")) if self.ent_target.get() != "" else 0
+        if target > 0:
+            self.control.set_adaptive_quality(self.adaptive.get(), target)
+        
+        self.control.settings.progressive = self.progressive.get()
+        if self.persistent.get() != self.control.settings.persistent_data:
+            self.control.set_persistent_data(self.persistent.get())
+        if self.process.get() != self.control.settings.render_process:
+            self.control.set_render_process(self.process.get())
+        if self.ent_cache.get() != "":
+            self.control.set_cache_size(int(self.ent_cache.get()))
+        if self.ent_images.get() != "":
+            self.control.set_image_cache_size(int(self.ent_images.get()))
+        if self.ent_workers.get() != "" and int(self.ent_workers.get()) >= 1:
+            self.control.set_animation_workers(int(self.ent_workers.get()))
         save_settings(self.control.settings)
         self.control.re_render()
         self.close_window()
@@ -1,5 +1,6 @@
 from tkinter import Entry, OptionMenu, Frame
 from tkinter.ttk import Progressbar, Separator
+import threading
 
 # Enable/disable frame, recursively applied to all widgets contained in the frame
 def frame_set_enabled(frame, is_enabled: bool):
@@ -23,6 +24,37 @@ def widget_set_enabled(widget, is_enabled: bool):
     else:
         widget.configure(state=state)
 
+# Render low resolution previews while the slider is dragged, the full preview
+# is still requested by the slider's release binding
+# apply: optional function pushing the slider value into the scene
+def bind_live_preview(slider, control, apply=None):
+    def on_drag(event):
+        if str(slider["state"]) != "disabled":
+            control.re_render_interactive(apply)
+    slider.bind("<B1-Motion>", on_drag, add="+")
+
+# Run work() on a background thread, on_done(result, error) is called on the Tk main thread
+# once it returned, error is the last line of its exception or None. The thread is polled
+# with after(), Tk must not be used from other threads. Nothing is called if widget is gone
+def run_in_background(widget, work, on_done, poll_ms: int = 100):
+    outcome = {}
+    def run():
+        try:
+            outcome["result"] = work()
+        except Exception as e:
+            outcome["error"] = (str(e).strip().splitlines() or [type(e).__name__])[-1]
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    
+    def poll():
+        if not widget.winfo_exists():
+            return
+        if thread.is_alive():
+            widget.after(poll_ms, poll)
+            return
+        on_done(outcome.get("result"), outcome.get("error"))
+    widget.after(poll_ms, poll)
+
 def validate_integer(input: str):
         # TODO This prevents deleting e.g. '5', because field can't be empty
         # Implement that it sets it to 0 automatically if last digit is deleted
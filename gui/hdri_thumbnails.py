@@ -0,0 +1,167 @@
+# created on: 17/10/2026
+
+# description:
+# Thumbnails of the HDRIs for the background gallery. They stay in PATH_THUMB between
+# runs, with an index of the HDRI file each was made from (size and modification time).
+# At startup only missing or outdated thumbnails are made again, in the background once
+# the window is shown: Radiance .hdr files in a pool of processes with the
+# NumPy reader of HDRI/radiance.py, other formats by render workers, which need Blender.
+# Finished thumbnails are put into a queue the GUI drains on the Tk main loop, see ready()
+
+import os
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+
+from engine.client import RenderEngine, EngineError
+from gui.properties import PATH_HDRI, PATH_THUMB
+from HDRI.radiance import save_thumbnail
+
+HDRI_EXTENSIONS = (".hdr", ".exr")
+
+# Index entry of the file at path
+def file_stamp(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+# Runs in the process pool: writes the thumbnail of the .hdr file at path to output
+# The stamp is taken first, a file changed meanwhile is outdated next time
+def make_thumbnail(path: str, output: str) -> dict:
+    stamp = file_stamp(path)
+    save_thumbnail(path, output)
+    return stamp
+
+# HDRIs of directory, sorted by name
+def list_hdris(directory: str = PATH_HDRI) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.lower().endswith(HDRI_EXTENSIONS)]
+
+class HdriThumbnailCache:
+    INDEX_FILE = "index.yaml"
+    WORKERS = 2   # render workers for formats other than .hdr, every one runs its own Blender
+    PROCESSES = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+    def __init__(self, directory: str = PATH_THUMB, workers: int = WORKERS):
+        self.directory = directory
+        self.index_path = os.path.join(directory, self.INDEX_FILE)
+        self.workers = max(1, workers)
+        self.lock = threading.Lock()
+        self.index = self.__load_index()   # normalized HDRI path -> {"size", "mtime"}
+        self.results = queue.Queue()       # (HDRI path, thumbnail file or None if it failed)
+        self.pending = 0
+
+    def thumbnail_path(self, path: str) -> str:
+        return os.path.join(self.directory, os.path.basename(path) + ".png")
+
+    # True if the thumbnail of path exists and was made from the file as it is now
+    # Called on the Tk thread at startup, so only the size and modification time are compared,
+    # hashing the HDRIs would read hundreds of MB. A file which was only touched is made again
+    def is_current(self, path: str) -> bool:
+        entry = self.index.get(os.path.normpath(path))
+        if entry is None or not os.path.exists(self.thumbnail_path(path)):
+            return False
+        stat = os.stat(path)
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime"]
+
+    # Make the missing and outdated thumbnails of paths in the background
+    # Returns the paths whose thumbnails are being made, see ready() for the results
+    def update(self, paths: list) -> list:
+        stale = [path for path in paths if not self.is_current(path)]
+        if not stale:
+            return []
+        with self.lock:
+            self.pending += len(stale)
+        os.makedirs(self.directory, exist_ok=True)
+        radiance = [path for path in stale if path.lower().endswith(".hdr")]
+        if radiance:
+            # spawned, forking would copy Blender and Tk of the GUI process
+            pool = ProcessPoolExecutor(min(self.PROCESSES, len(radiance)),
+                                       mp_context=multiprocessing.get_context("spawn"))
+            for path in radiance:
+                future = pool.submit(make_thumbnail, path, self.thumbnail_path(path))
+                future.add_done_callback(lambda future, path=path: self.__pooled(path, future))
+            pool.shutdown(wait=False)   # the submitted thumbnails are still made
+        todo = queue.Queue()
+        for path in stale:
+            if path not in radiance:
+                todo.put(path)
+        for i in range(min(self.workers, todo.qsize())):
+            threading.Thread(target=self.__work, args=(todo, RenderEngine(f"thumbnails {i + 1}")),
+                             name="hdri-thumbnails", daemon=True).start()
+        print(f"Making {len(stale)} HDRI thumbnails in the background")
+        return stale
+
+    # Thumbnails finished since the last call, [(HDRI path, thumbnail file or None)]
+    # Safe to poll from the Tk main loop
+    def ready(self) -> list:
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def is_busy(self) -> bool:
+        with self.lock:
+            return self.pending > 0 or not self.results.empty()
+
+    # Called on a thread of the pool once the thumbnail of path is written or failed
+    def __pooled(self, path: str, future) -> None:
+        try:
+            stamp = future.result()
+        except Exception as e:
+            print(f"Could not make the thumbnail of {path}: {e}")
+            self.__finished(path, None, None)
+        else:
+            self.__finished(path, self.thumbnail_path(path), stamp)
+
+    def __finished(self, path: str, output: str, stamp: dict) -> None:
+        with self.lock:
+            if stamp is not None:
+                self.index[os.path.normpath(path)] = stamp
+                self.__save_index()
+            self.results.put((path, output))
+            self.pending -= 1
+
+    def __work(self, todo: queue.Queue, engine: RenderEngine) -> None:
+        try:
+            while True:
+                try:
+                    path = todo.get_nowait()
+                except queue.Empty:
+                    return
+                output = self.thumbnail_path(path)
+                try:
+                    stamp = file_stamp(path)
+                    engine.call("hdri_thumbnail", path=path, output=output)
+                except (EngineError, OSError) as e:
+                    print(f"Could not make the thumbnail of {path}: " + str(e).strip().splitlines()[-1])
+                    self.__finished(path, None, None)
+                else:
+                    self.__finished(path, output, stamp)
+        finally:
+            engine.shutdown()
+
+    def __load_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r") as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            print("Ignoring broken thumbnail index: " + str(e))
+            return {}
+
+    # Must be called with the lock held
+    def __save_index(self) -> None:
+        try:
+            temp = self.index_path + ".tmp"
+            with open(temp, "w") as f:
+                yaml.safe_dump(self.index, f)
+            os.replace(temp, self.index_path)
+        except OSError as e:
+            print("Could not save thumbnail index: " + str(e))
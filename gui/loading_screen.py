@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter.ttk import Progressbar
 from tkinter import Frame, Toplevel, Label, Button, Entry, Checkbutton, BooleanVar
-from gui.gui_utils import frame_set_enabled
+from tkinter.messagebox import showerror, askyesnocancel, askyesno
+from gui.gui_utils import frame_set_enabled, run_in_background
+from engine.jobs import JobStatus
+from engine.cost import remaining_seconds, format_duration
+from engine.progress import RenderProgress
 import utils
 
 import threading
@@ -27,8 +31,17 @@ class VideoLoadingScreen(tk.Toplevel):
             self.content = Frame(self)
             lbl_title = Label(master=self.content, text="Video render progress", font="Arial 15 bold")
             self.btn_start = Button(master=self.content, text="Start rendering", command=self.start_render)
+            self.btn_cancel = Button(master=self.content, text="Cancel render", command=self.cancel_render)
+            self.job_id = None
+            self.estimate_count = 0   # results of older estimates are dropped
             self.previewrender = BooleanVar()
-            check_preview = Checkbutton(master=self.content, variable = self.previewrender, text="Only render preview (low quality, but faster)")
+            check_preview = Checkbutton(master=self.content, variable = self.previewrender, text="Only render preview (low quality, but faster)",
+                                        command=self.update_estimate)
+            frm_estimate = Frame(master=self.content)
+            self.lbl_estimate = Label(master=frm_estimate, text="")
+            self.btn_measure = Button(master=frm_estimate, text="Measure", command=self.measure)
+            self.lbl_estimate.pack(side=tk.LEFT, padx=5)
+            self.btn_measure.pack(side=tk.LEFT)
             self.pg = Progressbar(
                 master=self.content,
                 orient=tk.HORIZONTAL,
@@ -36,55 +49,101 @@ class VideoLoadingScreen(tk.Toplevel):
                 length=self.LENGTH,
                 maximum=self.FRAME_MAX)
             self.lbl_current_frame = Label(master=self.content, text="Rendering frame 0 / " + str(self.FRAME_MAX))
+            self.lbl_stats = Label(master=self.content, text="")
         
             lbl_title.grid(row=0, column=0, pady=10)
             check_preview.grid(row=1, column=0, pady=5)
-            self.btn_start.grid(row=2, column=0, pady=5)
-            self.lbl_current_frame.grid(row=3, column=0, pady=5)
-            self.pg.grid(row=4, column=0, pady=5, padx=5)
+            frm_estimate.grid(row=2, column=0, pady=5)
+            self.btn_start.grid(row=3, column=0, pady=5)
+            self.lbl_current_frame.grid(row=4, column=0, pady=5)
+            self.pg.grid(row=5, column=0, pady=5, padx=5)
+            self.lbl_stats.grid(row=6, column=0, pady=5)
+            self.btn_cancel.grid(row=7, column=0, pady=5)
+            self.btn_cancel.grid_remove()
             self.content.grid(row=0, column=0, padx=5, pady=5)
             
+            self.update_estimate()
             self.focus_set()
             self.grab_set()
             center(self)
             self.update()
     
+    # The video is rendered by the render queue, the window only shows its progress
+    # and may be closed while it is rendering
     def start_render(self):
         frame_set_enabled(self.content, False)
-        self.current_frame = 1
-        self.finished = False
-        
-        def render_per_frame(scene):
-            self.set_frame(self.current_frame)
-            self.update_idletasks()
-            self.current_frame = self.current_frame + 1
-        
-        def render_finished(scene):
-            self.finished = True
-            utils.unregister_handler(render_per_frame, utils.Handler.PER_FRAME)
-            utils.unregister_handler(render_finished,  utils.Handler.FINISHED)
-            frame_set_enabled(self.content, True)
-            self.close_window()
-        
-        utils.register_handler(render_per_frame, utils.Handler.PER_FRAME)
-        utils.register_handler(render_finished, utils.Handler.FINISHED)
-        
-        def render_anim():
-            if self.previewrender.get():
-                self.control.renderer.set_preview_render(file_path=self.filepath)
+        self.grab_release()
+        job = self.control.submit_render(self.filepath, animation=True,
+                                         preview_quality=self.previewrender.get())
+        self.finished = True
+        self.job_id = job.id
+        self.btn_cancel.grid()
+        self.btn_cancel["state"] = "normal"
+        follow_job(self, self.control.queue, job.id, self.show_progress, self.close_window)
+    
+    def cancel_render(self):
+        if ask_cancel(self, self.control.queue.get(self.job_id), self.control.queue):
+            self.lbl_current_frame["text"] = "Cancelling..."
+    
+    # Predicted render time with the chosen quality, from the cost model
+    # The scene is read here, the model is fitted in the background
+    def update_estimate(self):
+        self.estimate_count += 1
+        count = self.estimate_count
+        preview = self.previewrender.get()
+        self.lbl_estimate["text"] = "Estimating render time..."
+        try:
+            estimate = self.control.prepare_estimate(animation=True, preview_quality=preview)
+        except Exception as e:
+            self.lbl_estimate["text"] = "No estimate: " + str(e)
+            return
+        def on_done(seconds, error):
+            if count != self.estimate_count:
+                return
+            if error is not None:
+                self.lbl_estimate["text"] = "No estimate: " + error
             else:
-                self.control.renderer.set_final_render(self.filepath)
-            self.control.renderer.render(animation=True)
-            self.control.renderer.set_preview_render()
-        
-        renderthread = threading.Thread(target=render_anim)
-        renderthread.start()
+                self.lbl_estimate["text"] = f"Estimated time: about {format_duration(seconds)}"
+        run_in_background(self, lambda: self.control.estimate_render(**estimate), on_done)
+    
+    # Better estimate from a probe render of the scene, it takes a few seconds
+    def measure(self):
+        self.estimate_count += 1   # an estimate still running must not replace the measurement
+        self.btn_measure["state"] = "disabled"
+        self.lbl_estimate["text"] = "Measuring render time..."
+        probe = self.control.prepare_probe(animation=True, preview_quality=self.previewrender.get())
+        def on_done(seconds, error):
+            self.btn_measure["state"] = "normal"
+            if error is not None:
+                self.lbl_estimate["text"] = "Measuring failed: " + error
+            else:
+                self.lbl_estimate["text"] = f"Measured time: about {format_duration(seconds)}"
+        run_in_background(self, lambda: self.control.probe_render(**probe), on_done, poll_ms=200)
     
-    def set_frame(self, frame):
+    # The bar moves with the samples of the frames being rendered
+    def show_progress(self, job, progress):
+        if job.status == JobStatus.QUEUED:
+            self.lbl_current_frame["text"] = "Waiting in the render queue"
+            return
+        self.set_frame(job.frames_done, progress.fraction() * self.FRAME_MAX)
+        if job.status != JobStatus.RUNNING:
+            return
+        remaining = progress.remaining()
+        if remaining is None:
+            remaining = remaining_seconds(job)
+        self.lbl_current_frame["text"] += f", about {format_duration(remaining)} left"
+        stats = []
+        if progress.last_frame_seconds() is not None:
+            stats.append(f"last frame {progress.last_frame_seconds():.1f} s, "
+                         f"average {progress.mean_frame_seconds():.1f} s")
+        if progress.throughput() is not None:
+            stats.append(f"{progress.throughput():.1f} frames/min")
+        self.lbl_stats["text"] = ", ".join(stats)
+    
+    def set_frame(self, frame, value=None):
         #print("Setting loading screen frame to " + str(frame))
         self.lbl_current_frame["text"] = f"Rendering frame {frame} / {self.FRAME_MAX}"
-        self.pg["value"] = frame
-        self.update()
+        self.pg["value"] = frame if value is None else value
     
     def prevent_close(self):
         if self.finished:
@@ -94,43 +153,125 @@ class VideoLoadingScreen(tk.Toplevel):
         self.master.focus_set()
         self.destroy()
 
+# Shows a queued image render, the window may be closed while it is rendering
 class ImageLoadingScreen(tk.Toplevel):
-    def __init__(self, master):
+    def __init__(self, master, control, job_id: str):
         Toplevel.__init__(self)
         self.master = master
         self.title("Rendering image")
         self.resizable(width=False, height=False)
-        self.finished = False
-        self.protocol("WM_DELETE_WINDOW", self.prevent_close)
         
         content = Frame(master=self)
         self.initial_focus = content
         lbl_title = Label(master=content, text="Rendering image...", font="Arial 15 bold")
-        pg = Progressbar(
+        lbl_info = Label(master=content, text="Rendered in the background, you can keep editing")
+        self.lbl_time = Label(master=content, text="")
+        self.control = control
+        self.job_id = job_id
+        btn_cancel = Button(master=content, text="Cancel render", command=self.cancel_render)
+        # indeterminate until the first samples are reported
+        self.pg = Progressbar(
             master=content,
             orient=tk.HORIZONTAL,
             mode="indeterminate",
             length=200,
             maximum=1000)
-        pg.start(1)
+        self.pg.start(1)
         
         lbl_title.grid(row=0, column=0, pady=10)
-        pg.grid(row=1, column=0)
+        lbl_info.grid(row=1, column=0, pady=5)
+        self.pg.grid(row=2, column=0)
+        self.lbl_time.grid(row=3, column=0, pady=5)
+        btn_cancel.grid(row=4, column=0, pady=5)
         content.grid(row=0, column=0, padx=5, pady=5)
         
-        self.focus_set()
-        self.grab_set()
         center(self)
         self.update()
-        
-    def prevent_close(self):
-        if self.finished:
-            self.close_window()
+        follow_job(self, control.queue, job_id, self.show_time, self.close_window)
+    
+    # Estimate while queued, samples and the time left while rendering
+    def show_time(self, job, progress):
+        if job.status == JobStatus.QUEUED:
+            self.lbl_time["text"] = f"Waiting in the render queue, estimated time: about {format_duration(job.estimate)}"
+            return
+        if job.status != JobStatus.RUNNING:
+            return
+        fraction = progress.fraction()
+        if fraction > 0 and self.pg["mode"] != "determinate":
+            self.pg.stop()
+            self.pg["mode"] = "determinate"
+        if self.pg["mode"] == "determinate":
+            self.pg["value"] = fraction * 1000
+        remaining = progress.remaining()
+        if remaining is None:
+            remaining = remaining_seconds(job)
+        text = f"About {format_duration(remaining)} left" if remaining > 0 else "Almost done"
+        state = progress.current.get("")
+        if job.frames_total == 1 and state is not None and state["samples"] > 0:
+            text = f"Sample {state['sample']} / {state['samples']}, " + text[0].lower() + text[1:]
+        elif job.frames_total > 1:
+            text = f"View {job.frames_done + 1} / {job.frames_total}, " + text[0].lower() + text[1:]
+        self.lbl_time["text"] = text
+    
+    def cancel_render(self):
+        if ask_cancel(self, self.control.queue.get(self.job_id), self.control.queue):
+            self.lbl_time["text"] = "Cancelling..."
     
     def close_window(self):
         self.master.focus_set()
         self.destroy()
 
+# Ask whether job should be cancelled and, if it has finished frames or views, whether
+# they are kept. Cancels it in queue, returns False if the user changed their mind
+def ask_cancel(window, job, queue) -> bool:
+    if job is None or job.is_finished():
+        return False
+    if job.status == JobStatus.RUNNING and (job.animation or job.views) and job.frames_done > 0:
+        what = "frames" if job.animation else "views"
+        keep = askyesnocancel("Cancel render",
+                              f"Keep the {job.frames_done} {what} rendered so far?",
+                              detail="Kept frames are used when the render is retried from the render queue."
+                                     if job.animation else "",
+                              parent=window)
+        if keep is None:
+            return False
+    else:
+        if not askyesno("Cancel render", "Cancel the render of " + job.name + "?", parent=window):
+            return False
+        keep = True   # nothing new to discard, frames kept by an earlier cancel stay
+    queue.cancel(job.id, keep_frames=keep)
+    return True
+
+# Poll a job of the render queue while window exists
+# on_update(job, progress) is called with the current state and the live progress
+# (engine.progress.RenderProgress), on_done() once the job finished.
+# The render events are drained from a channel of the queue here, on the Tk main loop.
+# Failed jobs are reported, they can be retried from the render queue window
+def follow_job(window, queue, job_id: str, on_update, on_done, poll_ms: int = 200):
+    channel = queue.subscribe(job_id)
+    progress = RenderProgress()
+    def poll():
+        if not window.winfo_exists():
+            queue.unsubscribe(job_id, channel)
+            return
+        job = queue.get(job_id)
+        if job is None:
+            queue.unsubscribe(job_id, channel)
+            on_done()
+            return
+        for event in channel.drain():
+            progress.add(event)
+        progress.update(job)
+        on_update(job, progress)
+        if job.status == JobStatus.FAILED:
+            showerror("Render failed", job.error, parent=window)
+        if job.is_finished():
+            queue.unsubscribe(job_id, channel)
+            on_done()
+        else:
+            window.after(poll_ms, poll)
+    poll()
+
 
 # Centering is not as easy as you might think,
 # thanks for the code from https://stackoverflow.com/a/10018670h
@@ -3,7 +3,7 @@ import tkinter as tk
 from tkinter.ttk import Separator
 import enum
 import utils
-from gui.gui_utils import frame_set_enabled, widget_set_enabled
+from gui.gui_utils import frame_set_enabled, widget_set_enabled, bind_live_preview
 
 class MaterialWidgets(Frame):
     def __init__(self, master, control):
@@ -47,6 +47,8 @@ class MaterialWidgets(Frame):
         self.slider_roughness.bind("<ButtonRelease-1>", lambda event: self.set_roughness(self.slider_roughness.get(), True))
         self.slider_transmiss.bind("<ButtonRelease-1>", lambda event: self.set_transmission(self.slider_transmiss.get(), True)) 
         self.slider_emissive.bind("<ButtonRelease-1>", lambda event: self.set_emissive(True)) 
+        for slider in (self.slider_metallic, self.slider_roughness, self.slider_transmiss, self.slider_emissive):
+            bind_live_preview(slider, self.control)
         
         lbl_sel_mat   = Label(master=self, text="Select:")
         materials = ("default", Materials.GOLD.value, Materials.GLASS.value, Materials.WATER.value, Materials.STONE.value, Materials.EMISSIVE.value, Materials.THICK_GLASS.value)
@@ -69,6 +71,8 @@ class MaterialWidgets(Frame):
         self.slider_scale.grid(row=1, column=0)
         self.slider_detail.grid(row=1, column=1)
         self.slider_distortion.grid(row=1, column=2)
+        for slider in (self.slider_scale, self.slider_detail, self.slider_distortion):
+            bind_live_preview(slider, self.control)
         
         self.bump = BooleanVar()
         check_bump = Checkbutton(master=self, text="Enable bumpiness", variable=self.bump, command=lambda: self.toogle_bumpiness(rerender=True))
@@ -123,6 +127,7 @@ class MaterialWidgets(Frame):
             return False
     
     def set_material(self, *args):
+        was_solidified = self.control.material.is_solidified()
         if self.control.model is not None:
             self.control.material.set_solidified(self.control.model, False)
         
@@ -143,6 +148,8 @@ class MaterialWidgets(Frame):
                 
             case _:
                 self.default_values()
+        if self.control.material.is_solidified() != was_solidified:
+            self.control.invalidate_geometry()
         self.adjust_sliders()
         self.control.re_render()
     
@@ -0,0 +1,57 @@
+# created on: 17/10/2026
+
+# description:
+# Keeps recently rendered previews in memory, keyed on utils.scene_fingerprint,
+# so going back to a scene state that was already rendered shows it instantly
+
+from collections import OrderedDict
+from PIL import Image
+
+class PreviewCache:
+    def __init__(self, max_megabytes: float):
+        self.max_bytes = int(max_megabytes * 1024 * 1024)
+        self.images = OrderedDict()   # fingerprint -> image, least recently used first
+        self.size   = 0
+        self.hits   = 0
+        self.misses = 0
+    
+    # Returns the cached image or None, counts as a use of the entry
+    def get(self, key: str) -> Image.Image:
+        image = self.images.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.images.move_to_end(key)
+        return image
+    
+    def put(self, key: str, image: Image.Image) -> None:
+        if key in self.images:
+            self.size -= image_bytes(self.images.pop(key))
+        self.images[key] = image
+        self.size += image_bytes(image)
+        self.__evict()
+    
+    def clear(self) -> None:
+        self.images.clear()
+        self.size = 0
+    
+    def set_limit(self, max_megabytes: float) -> None:
+        self.max_bytes = int(max_megabytes * 1024 * 1024)
+        self.__evict()
+    
+    # Evict least recently used images until the memory limit is respected
+    def __evict(self) -> None:
+        while self.size > self.max_bytes and self.images:
+            _, evicted = self.images.popitem(last=False)
+            self.size -= image_bytes(evicted)
+    
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return (f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), "
+                f"{len(self.images)} images, {self.size / (1024 * 1024):.1f} MB")
+
+# Memory used by the pixel data of an image
+def image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
@@ -20,5 +20,9 @@ PATH_TEXTURES = "assets/textures/"
 PATH_PREVIEW  = "assets/gui/preview.png"
 PATH_PREVIEW_UNAVAILABLE = "assets/gui/preview_unavailable.png"
 PATH_ANIM = "assets/animation_presets"
+PATH_SNAPSHOTS = "assets/temp/"
+PATH_JOBS      = "assets/jobs/"
+PATH_JOB_STORE = "assets/render_queue.yaml"
+PATH_RENDER_LOG = "assets/render_log.yaml"
 
 FONT_TITLE = "Arial 10 bold"
\ No newline at end of file
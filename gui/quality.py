@@ -0,0 +1,78 @@
+# created on: 17/10/2026
+
+# description:
+# Feedback controller choosing the preview quality: measures how long previews
+# take from request to display and steps through quality levels to stay
+# within the configured latency target
+
+from dataclasses import dataclass
+
+# Settings of preview renders which trade quality for speed, see utils.Renderer
+@dataclass
+class PreviewQuality:
+    scale: float = 1.0     # factor on the preview resolution
+    samples: int = 8
+    max_bounces: int = 4
+    denoise: bool = False
+    
+    def describe(self) -> str:
+        return (f"{int(self.scale * 100)}% res, {self.samples} samples, {self.max_bounces} bounces, "
+                f"denoise {'on' if self.denoise else 'off'}")
+
+class QualityController:
+    # Quality levels, best first. The default preview settings are LEVELS[DEFAULT_LEVEL]
+    LEVELS = (
+        PreviewQuality(scale=1.0,  samples=16, max_bounces=8, denoise=True),
+        PreviewQuality(scale=1.0,  samples=8,  max_bounces=4, denoise=True),
+        PreviewQuality(scale=1.0,  samples=8,  max_bounces=4, denoise=False),
+        PreviewQuality(scale=0.75, samples=8,  max_bounces=3, denoise=False),
+        PreviewQuality(scale=0.75, samples=4,  max_bounces=2, denoise=False),
+        PreviewQuality(scale=0.5,  samples=4,  max_bounces=2, denoise=False),
+        PreviewQuality(scale=0.5,  samples=2,  max_bounces=1, denoise=False),
+        PreviewQuality(scale=0.35, samples=1,  max_bounces=1, denoise=False),
+    )
+    DEFAULT_LEVEL = 2
+    # Latency below target * UPGRADE_MARGIN for UPGRADE_AFTER previews in a row raises the quality
+    UPGRADE_MARGIN = 0.5
+    UPGRADE_AFTER  = 3
+    # Latency above target * DOWNGRADE_MARGIN lowers the quality right away
+    DOWNGRADE_MARGIN = 1.1
+    
+    def __init__(self, target: float):
+        self.target  = target
+        self.level   = self.DEFAULT_LEVEL
+        self.fast_in_row = 0
+        self.last_latency = None
+    
+    def quality(self) -> PreviewQuality:
+        return self.LEVELS[self.level]
+    
+    # Feed the latency (seconds) of a finished preview
+    # Returns True if the quality for the next preview changed
+    def update(self, latency: float) -> bool:
+        self.last_latency = latency
+        level = self.level
+        if latency > self.target * self.DOWNGRADE_MARGIN:
+            self.fast_in_row = 0
+            # step down further the more the target was missed
+            steps = 1 if latency < 2 * self.target else 2
+            level = min(level + steps, len(self.LEVELS) - 1)
+        elif latency < self.target * self.UPGRADE_MARGIN:
+            self.fast_in_row += 1
+            if self.fast_in_row >= self.UPGRADE_AFTER:
+                self.fast_in_row = 0
+                level = max(level - 1, 0)
+        else:
+            self.fast_in_row = 0
+        
+        changed = level != self.level
+        self.level = level
+        return changed
+    
+    def reset(self) -> None:
+        self.level = self.DEFAULT_LEVEL
+        self.fast_in_row = 0
+    
+    def describe(self) -> str:
+        latency = "-" if self.last_latency is None else "{:.2f} s".format(self.last_latency)
+        return f"Preview {latency} (target {self.target:.2f} s): {self.quality().describe()}"
@@ -0,0 +1,117 @@
+# created on: 17/10/2026
+
+# description:
+# GUI element: A seperate window listing the jobs of the render queue
+
+import tkinter as tk
+from tkinter import Frame, Toplevel, Label, Button
+from tkinter import ttk
+import time
+from engine.cost import remaining_seconds, format_duration
+from gui.loading_screen import ask_cancel
+from gui.properties import *
+
+class RenderQueueWindow(Toplevel):
+        POLL_MS = 500
+        COLUMNS = (("name", "Output", 180), ("type", "Type", 60), ("status", "Status", 80),
+                   ("priority", "Priority", 60), ("progress", "Progress", 110),
+                   ("eta", "Time left", 70), ("attempts", "Attempts", 60), ("created", "Added", 70))
+
+        def __init__(self, master, control):
+            Toplevel.__init__(self)
+            self.master = master
+            self.control = control
+            self.queue = control.queue
+            self.title("Render queue")
+            self.version = None
+
+            self.content = Frame(self)
+            lbl_title = Label(master=self.content, text="Render queue", font="Arial 15 bold")
+            self.tree = ttk.Treeview(self.content, columns=[c[0] for c in self.COLUMNS],
+                                     show="headings", selectmode="browse", height=10)
+            for column, text, width in self.COLUMNS:
+                self.tree.heading(column, text=text)
+                self.tree.column(column, width=width, anchor="w")
+            self.lbl_error = Label(master=self.content, text="", fg="red", anchor="w", justify="left")
+            self.tree.bind("<<TreeviewSelect>>", lambda event: self.show_error())
+
+            frm_buttons = Frame(self.content)
+            Button(master=frm_buttons, text="Priority +", command=lambda: self.change_priority(1)).pack(side=tk.LEFT)
+            Button(master=frm_buttons, text="Priority -", command=lambda: self.change_priority(-1)).pack(side=tk.LEFT)
+            Button(master=frm_buttons, text="Retry", command=self.retry).pack(side=tk.LEFT)
+            Button(master=frm_buttons, text="Cancel", command=self.cancel).pack(side=tk.LEFT)
+            Button(master=frm_buttons, text="Remove", command=self.remove).pack(side=tk.LEFT)
+            Button(master=frm_buttons, text="Remove finished", command=self.remove_finished).pack(side=tk.LEFT)
+
+            lbl_title.grid(row=0, column=0, pady=10)
+            self.tree.grid(row=1, column=0, sticky="news")
+            self.lbl_error.grid(row=2, column=0, sticky="we")
+            frm_buttons.grid(row=3, column=0, pady=5)
+            self.content.grid(row=0, column=0, padx=5, pady=5)
+
+            self.bind("<Escape>", lambda event: self.destroy())
+            self.refresh()
+
+        def selected(self):
+            selection = self.tree.selection()
+            return selection[0] if selection else None
+
+        # Rebuild the list whenever the queue changed
+        def refresh(self):
+            if not self.winfo_exists():
+                return
+            if self.version != self.queue.version:
+                self.version = self.queue.version
+                selected = self.selected()
+                self.jobs = {job.id: job for job in self.queue.list_jobs()}
+                self.tree.delete(*self.tree.get_children())
+                for job in self.jobs.values():
+                    self.tree.insert("", tk.END, iid=job.id, values=(
+                        job.name,
+                        "Video" if job.animation else "Image",
+                        job.status.value,
+                        job.priority,
+                        job.describe_progress(),
+                        self.time_left(job),
+                        job.attempts,
+                        time.strftime("%H:%M", time.localtime(job.created))))
+                if selected in self.jobs:
+                    self.tree.selection_set(selected)
+                self.show_error()
+            else:
+                # the time left changes without the queue changing
+                for job in self.jobs.values():
+                    if not job.is_finished():
+                        self.tree.set(job.id, "eta", self.time_left(job))
+            self.after(self.POLL_MS, self.refresh)
+        
+        def time_left(self, job) -> str:
+            if job.is_finished() or job.estimate <= 0:
+                return ""
+            return format_duration(remaining_seconds(job))
+
+        def show_error(self):
+            job = self.jobs.get(self.selected())
+            self.lbl_error["text"] = job.error if job is not None else ""
+
+        def change_priority(self, delta: int):
+            job = self.jobs.get(self.selected())
+            if job is not None:
+                self.queue.set_priority(job.id, job.priority + delta)
+
+        def retry(self):
+            if self.selected() is not None:
+                self.queue.retry(self.selected())
+
+        def cancel(self):
+            if self.selected() is not None:
+                ask_cancel(self, self.queue.get(self.selected()), self.queue)
+
+        def remove(self):
+            if self.selected() is not None:
+                self.queue.remove(self.selected())
+
+        def remove_finished(self):
+            for job in self.jobs.values():
+                if job.is_finished():
+                    self.queue.remove(job.id)
@@ -3,51 +3,127 @@
 # edited by:
 
 # description:
-# GUI element: Display the image "preview.png" or a placeholder in a viewport
+# GUI element: Display the rendered preview (in memory or "preview.png") or a placeholder in a viewport
 
 import tkinter as tk
 from tkinter import Frame, Canvas
 from PIL import ImageTk, Image
+from collections import OrderedDict
 from gui.properties import *
 
 class RenderPreview(Frame):
+        RESIZE_DELAY_MS = 300   # resizing is considered finished after this pause
+        SCALE_DELAY_MS  = 50    # <Configure> events within this time are merged
+        SCALED_CACHE_SIZE = 4   # scaled versions of the current image which are kept
+        
         def __init__(self, master):
             Frame.__init__(self, master, bg="black")
             
             self.original_image = Image.open(PATH_PREVIEW_UNAVAILABLE)
             self.img = ImageTk.PhotoImage(self.original_image)
+            self.img_mode = self.original_image.mode
             
             self.w = self.original_image.width
             self.h = self.original_image.height
             
+            self.lbl_status = tk.Label(self, anchor="w", fg="gray", bg="black")
+            self.lbl_status.pack(side=tk.BOTTOM, fill=tk.X)
             self.canvas = tk.Canvas(self, width=self.w, height=self.h)
             self.canvas.pack(fill=tk.BOTH, expand=True)
             self.canvas.bind("<Configure>", self.on_resize)
             self.canvas_img = self.canvas.create_image(0, 0, anchor="nw", image=self.img)
             
+            self.on_size_changed = None
+            self.resize_timer = None
+            self.scale_timer  = None
+            # (width, height, high quality) -> scaled original_image, most recently used last
+            self.scaled = OrderedDict()
             self.reload()
         
-        # Resize the image to given width/height
-        def resize(self, image, width, height):
-        
-            ratio = min(width / image.width, height / image.height)
-            new_w = image.width * ratio
-            new_h = image.height * ratio
+        # Scale the image to fit into width/height and display it
+        # high_quality: False uses a fast, blocky resample, used while the window is resized
+        def resize(self, image, width, height, high_quality: bool = True):
+            if image is not self.original_image:
+                self.original_image = image
+                self.scaled.clear()
+            
+            key = (width, height, high_quality)
+            resized = self.scaled.get(key)
+            if resized is None:
+                ratio = min(width / image.width, height / image.height)
+                size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+                resized = image.resize(size, Image.LANCZOS if high_quality else Image.NEAREST)
+                self.scaled[key] = resized
+                if len(self.scaled) > self.SCALED_CACHE_SIZE:
+                    self.scaled.popitem(last=False)
+            else:
+                self.scaled.move_to_end(key)
             
-            resized = image.resize((int(new_w), int(new_h)))
-            self.img = ImageTk.PhotoImage(resized)
-            self.canvas.itemconfig(self.canvas_img, image=self.img)
+            # Reuse the Tk image if the size did not change, creating one is expensive
+            if (self.img.width(), self.img.height()) == resized.size and self.img_mode == resized.mode:
+                self.img.paste(resized)
+            else:
+                self.img = ImageTk.PhotoImage(resized)
+                self.img_mode = resized.mode
+                self.canvas.itemconfig(self.canvas_img, image=self.img)
         
         # Automatically called when the canvas is resized
+        # The image is scaled quickly at most every SCALE_DELAY_MS, and properly once resizing stopped
         def on_resize(self, event):
             self.w = event.width
             self.h = event.height
+            if self.scale_timer is None:
+                self.scale_timer = self.after(self.SCALE_DELAY_MS, self.__scale_fast)
+            if self.resize_timer is not None:
+                self.after_cancel(self.resize_timer)
+            self.resize_timer = self.after(self.RESIZE_DELAY_MS, self.__size_changed)
+        
+        def __scale_fast(self):
+            self.scale_timer = None
+            if self.resize_timer is not None:
+                self.resize(self.original_image, self.w, self.h, high_quality=False)
+        
+        # callback(width, height) is called when the canvas size settled after resizing
+        def bind_resize(self, callback):
+            self.on_size_changed = callback
+            if self.canvas.winfo_ismapped() and self.resize_timer is None:
+                self.resize_timer = self.after(self.RESIZE_DELAY_MS, self.__size_changed)
+        
+        def __size_changed(self):
+            self.resize_timer = None
             self.resize(self.original_image, self.w, self.h)
+            if self.on_size_changed is not None:
+                self.on_size_changed(self.w, self.h)
+        
+        # Report mouse drags on the preview: on_drag(dx, dy) is called with the
+        # movement in pixels, on_release() once the mouse button is released
+        def bind_drag(self, on_drag, on_release):
+            def press(event):
+                self.drag_pos = (event.x, event.y)
+            
+            def motion(event):
+                dx = event.x - self.drag_pos[0]
+                dy = event.y - self.drag_pos[1]
+                self.drag_pos = (event.x, event.y)
+                on_drag(dx, dy)
+            
+            self.drag_pos = (0, 0)
+            self.canvas.bind("<ButtonPress-1>", press)
+            self.canvas.bind("<B1-Motion>", motion)
+            self.canvas.bind("<ButtonRelease-1>", lambda event: on_release())
+        
+        # Show a line of text below the preview
+        def set_status(self, text: str):
+            self.lbl_status.configure(text=text)
+        
+        # Display an image which is already in memory
+        def show(self, image):
+            self.resize(image, self.w, self.h)
         
-        # Preview is refreshed when called
+        # Preview is refreshed from disk when called
         def reload(self):
             try:
-                self.original_image = Image.open(PATH_PREVIEW)
+                image = Image.open(PATH_PREVIEW)
             except FileNotFoundError:
-                self.original_image = Image.open(PATH_PREVIEW_UNAVAILABLE)
-            self.resize(self.original_image, self.w, self.h)
\ No newline at end of file
+                image = Image.open(PATH_PREVIEW_UNAVAILABLE)
+            self.resize(image, self.w, self.h)
\ No newline at end of file
@@ -0,0 +1,126 @@
+# created on: 17/10/2026
+
+# description:
+# Runs preview renders on a background thread so the GUI stays responsive.
+# Requests are merged "latest wins": only the newest scene state gets rendered,
+# finished images (including intermediate passes) are handed back to the Tk
+# main loop through an after() poll. Renders which use Blender in this process
+# hand their work to the main loop with run_on_main(), since the scene must only
+# be used by the thread changing it.
+
+import threading
+import queue
+
+class PreviewScheduler:
+    POLL_MS = 50
+
+    # widget:  any Tk widget, used for after() polling on the main thread
+    # render:  render(job, cancelled, publish) -> result, called on the render thread,
+    #          publish(result) may be used to show intermediate results
+    # display: display(result), called on the Tk main thread
+    def __init__(self, widget, render, display):
+        self.widget  = widget
+        self.render  = render
+        self.display = display
+
+        self.generation = 0      # id of the newest request
+        self.displayed  = 0      # id of the request currently shown
+        self.pending    = None   # newest request not picked up by the render thread yet
+        self.busy       = False
+        self.running    = True
+        self.condition  = threading.Condition()
+        self.results    = queue.Queue()
+        self.calls      = queue.Queue()   # work of run_on_main waiting for the main thread
+
+        self.thread = threading.Thread(target=self.__run, name="preview-render", daemon=True)
+        self.thread.start()
+        self.widget.after(self.POLL_MS, self.__poll)
+
+    # Request a new preview, older requests which have not started yet are dropped
+    def request(self, job=None) -> int:
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, job)
+            self.condition.notify()
+            return self.generation
+
+    # True if a newer request arrived after the request with the given id
+    def is_outdated(self, generation: int) -> bool:
+        return generation != self.generation
+
+    # True while a preview is rendering or waiting to be rendered
+    def is_busy(self) -> bool:
+        return self.busy or self.pending is not None
+
+    # Drop the pending request and mark the one in flight as outdated
+    def cancel(self) -> None:
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+
+    # Run fn() on the Tk main thread and return its result, called from render()
+    # One call is run per poll, so the GUI handles its events between calls
+    def run_on_main(self, fn):
+        call = {"fn": fn, "done": threading.Event()}
+        self.calls.put(call)
+        call["done"].wait()
+        if "error" in call:
+            raise call["error"]
+        return call["result"]
+
+    def shutdown(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    # Render thread: wait for the newest request and render it
+    def __run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                generation, job = self.pending
+                self.pending = None
+                self.busy = True
+
+            def publish(result, generation=generation):
+                if not self.is_outdated(generation):
+                    self.results.put((generation, result))
+
+            try:
+                result = self.render(job, lambda: self.is_outdated(generation), publish)
+            except Exception as e:
+                print("Preview render failed: " + str(e))
+                result = None
+            finally:
+                self.busy = False
+
+            # A newer request cancelled this one, its result is outdated
+            if result is not None:
+                publish(result)
+
+    # Main thread: hand finished previews to the display callback
+    def __poll(self):
+        latest = None
+        while not self.results.empty():
+            latest = self.results.get_nowait()
+
+        if latest is not None:
+            generation, result = latest
+            if generation >= self.displayed:
+                self.displayed = generation
+                self.display(result)
+
+        if not self.calls.empty():
+            call = self.calls.get_nowait()
+            try:
+                call["result"] = call["fn"]()
+            except Exception as e:
+                call["error"] = e
+            finally:
+                call["done"].set()
+
+        if self.running:
+            self.widget.after(self.POLL_MS, self.__poll)
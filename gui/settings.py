@@ -9,8 +9,18 @@ from dataclasses import dataclass
 import typing as t
 import yaml
 import os, shutil
-from utils import Renderer, OrbitCam, FrameControl
+import time
+import threading
+import utils
+from utils import Renderer, OrbitCam, FrameControl, PreviewQuality, scene_fingerprint
+from engine.client import RenderEngine, EngineError, EngineCrashed, image_from_message
+from engine.jobs import RenderQueue, RenderJob, JobStore, JobStatus
+from engine.cost import RenderLog, CostModel, probe_seconds
 from gui.render_preview import RenderPreview
+from gui.scheduler import PreviewScheduler
+from gui.preview_cache import PreviewCache
+from image_cache import cache as image_cache
+from gui.quality import QualityController
 from materials.materials import MaterialController
 from gui.properties import *
 
@@ -35,13 +45,35 @@ class Settings():
     auto_updatecheck: bool
     aspect: AspectRatio
     timelimit: float
+    progressive: bool = True
+    preview_cache_mb: float = 256
+    persistent_data: bool = True
+    interactive_fps: float = 10
+    resolution_scale: float = 1.0
+    adaptive_quality: bool = True
+    latency_target: float = 2.0
+    render_process: bool = True
+    animation_workers: int = 1
+    image_cache_mb: float = 1024
     
+    # Options added in later versions fall back to their default,
+    # so older configuration files keep loading
     @classmethod
     def from_dict(cls: t.Type["Settings"], dic: dict):
         return cls(
             auto_updatecheck=dic["auto_updatecheck"],
             aspect = AspectRatio.from_dict(dic["aspect"]),
-            timelimit = dic["timelimit"]
+            timelimit = dic["timelimit"],
+            progressive = dic.get("progressive", True),
+            preview_cache_mb = dic.get("preview_cache_mb", 256),
+            persistent_data = dic.get("persistent_data", True),
+            interactive_fps = dic.get("interactive_fps", 10),
+            resolution_scale = dic.get("resolution_scale", 1.0),
+            adaptive_quality = dic.get("adaptive_quality", True),
+            latency_target = dic.get("latency_target", 2.0),
+            render_process = dic.get("render_process", True),
+            animation_workers = dic.get("animation_workers", 1),
+            image_cache_mb = dic.get("image_cache_mb", 1024)
         )
     
     def to_dict(self):
@@ -49,15 +81,34 @@ class Settings():
         dic["auto_updatecheck"] = self.auto_updatecheck
         dic["aspect"]           = self.aspect.to_dict()
         dic["timelimit"]        = self.timelimit
+        dic["progressive"]      = self.progressive
+        dic["preview_cache_mb"] = self.preview_cache_mb
+        dic["persistent_data"]  = self.persistent_data
+        dic["interactive_fps"]  = self.interactive_fps
+        dic["resolution_scale"] = self.resolution_scale
+        dic["adaptive_quality"] = self.adaptive_quality
+        dic["latency_target"]   = self.latency_target
+        dic["render_process"]   = self.render_process
+        dic["animation_workers"] = self.animation_workers
+        dic["image_cache_mb"]   = self.image_cache_mb
         return dic
     
 class Control:
+    ORBIT_DEGREES_PER_PIXEL = 0.5
+    PREFETCH_MS = 100   # pause between two prefetched images, see prefetch_images
+    
     renderer: Renderer
     preview: RenderPreview
     camera: OrbitCam
     settings: Settings
     material: MaterialController
     frames: FrameControl
+    scheduler: PreviewScheduler
+    cache: PreviewCache
+    quality: QualityController
+    engine: RenderEngine
+    queue: RenderQueue
+    cost: CostModel
     
     def __init__(self, renderer, settings, preview, camera, frames):
         self.renderer = renderer
@@ -68,12 +119,341 @@ class Control:
         if self.settings is None:
             print("Problem loading settings")
             exit()
+        self.scheduler = PreviewScheduler(preview, self.render_preview, self.show_preview)
+        self.cache = PreviewCache(self.settings.preview_cache_mb)
+        image_cache.set_limit(self.settings.image_cache_mb)
+        self.quality = QualityController(self.settings.latency_target)
+        self.preview_key = None   # fingerprint of the scene state shown or being rendered
+        self.interactive_timer = None
+        self.interactive_apply = None
+        self.last_interactive  = 0
+        self.prefetch_timer = None
+        self.engine = RenderEngine("preview")
+        self.probe_engine = RenderEngine("probe")   # probes never get between a preview's load and render
+        # the preview worker keeps a snapshot loaded, a new one is only exported when
+        # objects, materials or geometry changed, see sync_snapshot
+        self.snapshot = None          # ((snapshot fingerprint, geometry version), path) of the newest export
+        self.snapshot_count = 0
+        self.worker_snapshot = None   # path of the snapshot the worker loaded
+        self.snapshot_lock = threading.Lock()
+        # final renders run in their own worker, so they don't block previews
+        os.makedirs(PATH_JOBS, exist_ok=True)
+        # finished renders calibrate the render time estimates
+        render_log = RenderLog(PATH_RENDER_LOG)
+        self.cost = CostModel(render_log)
+        self.queue = RenderQueue(JobStore(PATH_JOB_STORE), os.getcwd(), render_log)
+        preview.bind_drag(self.orbit, self.re_render)
+        preview.bind_resize(self.resize_preview)
     
+    # Queue a preview of the current scene, returns immediately
+    # Unchanged scenes are skipped, already rendered ones are taken from the cache
     def re_render(self):
-        self.renderer.render(animation=False)
-        self.preview.reload()
+        if self.interactive_timer is not None:
+            self.preview.after_cancel(self.interactive_timer)
+            self.interactive_timer = None
+        self.apply_quality()
+        key = scene_fingerprint(self.renderer.scene)
+        if key == self.preview_key:
+            print("Preview is up to date")
+            return
+        self.preview_key = key
+        
+        image = self.cache.get(key)
+        if image is not None:
+            self.scheduler.cancel()
+            self.preview.show(image)
+            print("Preview taken from cache (" + self.cache.stats() + ")")
+            return
+        self.scheduler.request(self.preview_job(key, False))
         print("Updating preview...")
     
+    # Queue a low resolution preview while the user is dragging a slider or the camera
+    # Throttled to settings.interactive_fps, apply() is called right before requesting it
+    # and can be used to push slider values into the scene which are expensive to set
+    def re_render_interactive(self, apply=None):
+        self.interactive_apply = apply
+        if self.interactive_timer is not None:
+            return
+        wait = max(0, self.last_interactive + 1 / self.settings.interactive_fps - time.monotonic())
+        self.interactive_timer = self.preview.after(int(wait * 1000), self.__request_interactive)
+    
+    def __request_interactive(self):
+        self.interactive_timer = None
+        if self.interactive_apply is not None:
+            # apply() may add/remove objects, which must not happen during a render
+            if not self.renderer.lock.acquire(blocking=False):
+                self.re_render_interactive(self.interactive_apply)
+                return
+            try:
+                self.interactive_apply()
+            finally:
+                self.renderer.lock.release()
+        self.last_interactive = time.monotonic()
+        # the next full preview must not be skipped, even if the scene did not change
+        self.preview_key = None
+        self.scheduler.request(self.preview_job(None, True))
+    
+    # Render the preview at the size of the canvas, called after resizing finished
+    def resize_preview(self, width: int, height: int):
+        self.renderer.set_preview_size(width, height, self.settings.resolution_scale)
+        self.re_render()
+    
+    # Orbit the camera by dragging on the preview, dx/dy in pixels
+    def orbit(self, dx: int, dy: int):
+        if self.renderer.camera != self.camera.camera:
+            return   # the animation camera is active
+        self.camera.rotate_z(-dx * self.ORBIT_DEGREES_PER_PIXEL)
+        self.camera.rotate_x(-dy * self.ORBIT_DEGREES_PER_PIXEL)
+        self.re_render_interactive()
+    
+    # Job for the scheduler: (scene fingerprint, interactive, request time, snapshot path, scene state)
+    # For the render process the snapshot and the state are taken here, on the Tk thread, which is
+    # the one changing the scene. Previews in this process render the scene itself
+    def preview_job(self, key, interactive: bool) -> tuple:
+        requested = time.monotonic()
+        if not self.settings.render_process:
+            return (key, interactive, requested, None, None)
+        path = self.sync_snapshot()
+        with self.renderer.lock:
+            state = utils.scene_state(self.renderer.scene)
+        return (key, interactive, requested, path, state)
+    
+    # Export the scene for the preview worker if objects, materials or geometry changed since
+    # the last export. Returns the path of the newest snapshot, None if it could not be written
+    def sync_snapshot(self) -> str:
+        structure = (utils.snapshot_fingerprint(self.renderer.scene), self.renderer.geometry_version)
+        if self.snapshot is not None and self.snapshot[0] == structure:
+            return self.snapshot[1]
+        self.snapshot_count += 1
+        path = self.snapshot_path(f"preview_{self.snapshot_count}")
+        try:
+            with self.renderer.lock:
+                utils.export_snapshot(path)
+        except Exception as e:
+            print("Could not export the scene for the preview worker: " + str(e))
+            return None
+        with self.snapshot_lock:
+            previous = self.snapshot[1] if self.snapshot is not None else None
+            self.snapshot = (structure, path)
+        self.remove_snapshot(previous)
+        return path
+    
+    # Delete a preview snapshot unless it is the newest one or the worker has it loaded
+    def remove_snapshot(self, path: str):
+        with self.snapshot_lock:
+            if path is None or path == self.worker_snapshot \
+                    or (self.snapshot is not None and path == self.snapshot[1]):
+                return
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    # Forget the preview snapshots, the next preview in the render process exports one again
+    def drop_snapshots(self):
+        with self.snapshot_lock:
+            paths = [self.worker_snapshot, self.snapshot[1] if self.snapshot is not None else None]
+            self.snapshot = None
+            self.worker_snapshot = None
+        for path in paths:
+            self.remove_snapshot(path)
+    
+    # Called on the scheduler's render thread with a job of preview_job
+    # Returns (fingerprint, image, request time), intermediate images are published without fingerprint
+    def render_preview(self, job, cancelled, publish):
+        key = job[0]
+        result = None
+        try:
+            if self.settings.render_process:
+                result = self.render_preview_process(job, cancelled, publish)
+            else:
+                result = self.render_preview_local(job, cancelled, publish)
+        finally:
+            # failed or cancelled, nothing was shown for key, so asking for it again must render it
+            if result is None and key is not None and self.preview_key == key:
+                self.preview_key = None
+        return result
+    
+    # Render the preview in this process. The Tk thread changes the scene, so the renders run
+    # on it (see PreviewScheduler.run_on_main) and the GUI waits for every pass
+    def render_preview_local(self, job, cancelled, publish):
+        key, interactive, requested = job[:3]
+        run = self.scheduler.run_on_main
+        if cancelled():
+            return None
+        if interactive:
+            image = run(self.renderer.render_interactive)
+        elif self.settings.progressive:
+            image = self.renderer.render_progressive(lambda image: publish((None, image, requested)),
+                                                     cancelled, run)
+        else:
+            image = run(self.renderer.render_to_image)
+        return (key, image, requested) if image is not None else None
+    
+    # Same as render_preview, but the scene is rendered by the preview worker. It loads the
+    # snapshot only if it has another one loaded, the scene state is applied to it every time
+    def render_preview_process(self, job, cancelled, publish):
+        key, interactive, requested, path, state = job
+        if path is None or cancelled():
+            return None
+        with self.snapshot_lock:
+            newest = self.snapshot[1] if self.snapshot is not None else None
+            if path != newest and path != self.worker_snapshot:
+                return None   # replaced by a newer snapshot, which a newer request renders
+            previous = self.worker_snapshot
+            self.worker_snapshot = path
+        
+        if interactive:
+            mode = "interactive"
+        elif self.settings.progressive:
+            mode = "progressive"
+        else:
+            mode = "full"
+        def on_progress(event):
+            if "image" in event:
+                publish((None, image_from_message(event["image"]), requested))
+        try:
+            if path != previous:
+                self.engine.call("load", path=path, base_dir=os.getcwd(),
+                                 aspect=self.renderer.aspect, time_limit=self.renderer.time_limit)
+                self.remove_snapshot(previous)
+            message = self.engine.call("preview", on_progress=on_progress, cancelled=cancelled,
+                                       mode=mode, state=state)
+        except EngineError as e:
+            # which scene the worker has now is unknown, the next preview loads the snapshot again
+            with self.snapshot_lock:
+                self.worker_snapshot = None
+            self.remove_snapshot(previous)
+            self.remove_snapshot(path)
+            if not isinstance(e, EngineCrashed):
+                raise
+            print(str(e) + ", it is restarted for the next preview")
+            return None
+        image = image_from_message(message)
+        return (key, image, requested) if image is not None else None
+    
+    # Add a render of the current scene to the render queue, it is rendered in the background
+    # from a snapshot, so the scene can be changed right away
+    # views: turntable poses (yaw, elevation), filepath is a directory then, see Renderer.render_views
+    def submit_render(self, filepath: str, animation: bool, preview_quality: bool = False,
+                      views: list = None) -> RenderJob:
+        job = RenderJob(name=os.path.basename(filepath),
+                        snapshot="",
+                        output=os.path.abspath(filepath),
+                        animation=animation,
+                        aspect=self.renderer.aspect,
+                        time_limit=self.renderer.time_limit,
+                        frames_total=self.frames.get_max_frame() if animation else len(views or [1]),
+                        workers=self.settings.animation_workers if animation else 1,
+                        views=[list(pose) for pose in views] if views else None)
+        job.snapshot = os.path.abspath(os.path.join(PATH_JOBS, job.id + ".blend"))
+        with self.renderer.lock:
+            self.apply_render_settings(filepath, preview_quality)
+            try:
+                job.features = utils.scene_features(self.renderer.scene)
+                utils.export_snapshot(job.snapshot)
+            finally:
+                self.renderer.set_preview_render()
+        job.estimate = self.job_seconds(self.cost.predict(job.features), job.frames_total, job.workers)
+        print("Queued render " + job.name)
+        return self.queue.submit(job)
+    
+    # Settings of a final render, or of a render in preview quality. Needs the renderer lock,
+    # set_preview_render switches back
+    def apply_render_settings(self, filepath: str, preview_quality: bool) -> None:
+        if preview_quality:
+            self.renderer.set_preview_render(file_path=filepath)
+        else:
+            self.renderer.set_final_render(file_path=filepath)
+    
+    # Features of a render of the current scene for estimate_render, on the Tk thread
+    # The render settings are switched for a moment, so no preview may see them
+    # Returns the arguments of estimate_render
+    def prepare_estimate(self, animation: bool, preview_quality: bool = False) -> dict:
+        with self.renderer.lock:
+            self.apply_render_settings(self.renderer.scene.render.filepath, preview_quality)
+            try:
+                features = utils.scene_features(self.renderer.scene)
+            finally:
+                self.renderer.set_preview_render()
+        return {"features": features,
+                "frames": self.frames.get_max_frame() if animation else 1,
+                "workers": self.settings.animation_workers if animation else 1}
+    
+    # Predicted seconds of a render with the features of prepare_estimate, see engine/cost.py
+    # Fitting the model reads the render log, so it is called on a background thread
+    def estimate_render(self, features: dict, frames: int, workers: int) -> float:
+        return self.job_seconds(self.cost.predict(features), frames, workers)
+    
+    # Export the scene with the settings of the render for probe_render, on the Tk thread
+    # Returns the arguments of probe_render
+    def prepare_probe(self, animation: bool, preview_quality: bool = False) -> dict:
+        path = self.snapshot_path("probe")
+        with self.renderer.lock:
+            self.apply_render_settings(self.renderer.scene.render.filepath, preview_quality)
+            try:
+                utils.export_snapshot(path)
+            finally:
+                self.renderer.set_preview_render()
+        last = self.frames.get_max_frame() if animation else 1
+        # start, middle and end of an animation, they often differ most
+        frames = sorted({1, (last + 1) // 2, last}) if animation else [self.renderer.scene.frame_current]
+        return {"path": path, "frames": frames, "frames_total": last,
+                "workers": self.settings.animation_workers if animation else 1}
+    
+    # Like estimate_render, but measured with a quick probe render (a few seconds) of a scene
+    # exported by prepare_probe, in a worker of its own. Blocks, call it from a background thread
+    def probe_render(self, path: str, frames: list, frames_total: int, workers: int) -> float:
+        self.probe_engine.call("load", path=path, base_dir=os.getcwd(),
+                               aspect=self.renderer.aspect, time_limit=self.renderer.time_limit)
+        probe = self.probe_engine.call("probe", frames=frames)
+        return self.job_seconds(probe_seconds(probe, probe["features"]), frames_total, workers)
+    
+    # Wall time of frames with workers processes, using the speedup measured in earlier jobs
+    def job_seconds(self, frame_seconds: float, frames: int, workers: int) -> float:
+        speedups = [job.speedup for job in self.queue.list_jobs()
+                    if job.status == JobStatus.DONE and job.workers == workers and job.speedup > 0]
+        speedup = sum(speedups) / len(speedups) if speedups else 1
+        return frame_seconds * frames / speedup
+    
+    # Queue a turntable of the current scene: views evenly spaced around the model,
+    # starting at the current camera position
+    def submit_turntable(self, directory: str, views: int) -> RenderJob:
+        yaw, elevation = self.camera.get_pose()
+        poses = utils.turntable_poses(views, (elevation,), yaw)
+        return self.submit_render(directory, animation=False, views=poses)
+    
+    def snapshot_path(self, name: str) -> str:
+        os.makedirs(PATH_SNAPSHOTS, exist_ok=True)
+        return os.path.abspath(os.path.join(PATH_SNAPSHOTS, name + ".blend"))
+    
+    # Called on the Tk main thread once a preview is finished
+    def show_preview(self, result):
+        key, image, requested = result
+        self.preview.show(image)
+        if key is None:
+            return
+        self.cache.put(key, image)
+        
+        # Only full previews count towards the latency, including scene sync and display
+        if self.quality.update(time.monotonic() - requested) and self.settings.adaptive_quality:
+            self.apply_quality()
+        self.preview.set_status(self.quality.describe() if self.settings.adaptive_quality
+                                else self.renderer.preview_quality.describe())
+    
+    # Use the preview quality chosen by the quality controller (or the default one)
+    # Skipped while rendering, it is retried before the next preview then
+    def apply_quality(self):
+        quality = self.quality.quality() if self.settings.adaptive_quality else PreviewQuality()
+        if quality == self.renderer.preview_quality:
+            return
+        if not self.renderer.lock.acquire(blocking=False):
+            return
+        try:
+            self.renderer.set_preview_quality(quality)
+        finally:
+            self.renderer.lock.release()
+    
     def set_aspect_ratio(self, width: int, height: int) -> None:
         self.settings.aspect.width  = width
         self.settings.aspect.height = height
@@ -84,6 +464,77 @@ class Control:
         self.settings.timelimit = limit
         self.renderer.set_time_limit(limit)
     
+    # Must be called after changes to the geometry (import, point cloud, solidify, planes ...)
+    def invalidate_geometry(self):
+        self.renderer.invalidate_geometry()
+    
+    def set_persistent_data(self, enabled: bool):
+        self.settings.persistent_data = enabled
+        with self.renderer.lock:
+            self.renderer.set_persistent_data(enabled)
+            self.renderer.set_preview_render()
+    
+    def set_resolution_scale(self, scale: float):
+        assert scale > 0
+        self.settings.resolution_scale = scale
+        if self.renderer.preview_size is not None:
+            width, height, _ = self.renderer.preview_size
+            self.renderer.set_preview_size(width, height, scale)
+    
+    def set_adaptive_quality(self, enabled: bool, target: float):
+        assert target > 0
+        self.settings.adaptive_quality = enabled
+        self.settings.latency_target = target
+        self.quality.target = target
+        self.quality.reset()
+        self.apply_quality()
+    
+    def set_cache_size(self, megabytes: float):
+        assert megabytes >= 0
+        self.settings.preview_cache_mb = megabytes
+        self.cache.set_limit(megabytes)
+    
+    def set_image_cache_size(self, megabytes: float):
+        assert megabytes >= 0
+        self.settings.image_cache_mb = megabytes
+        image_cache.set_limit(megabytes)
+    
+    # Decode images the user may pick next while the GUI is idle, so picking them doesn't wait
+    # for the file. Previews rendered in the render process load the images themselves
+    def prefetch_images(self, paths: list):
+        if self.settings.render_process:
+            return
+        image_cache.prefetch(paths)
+        if self.prefetch_timer is None:
+            self.prefetch_timer = self.preview.after(self.PREFETCH_MS, self.__prefetch_image)
+    
+    # One image per call on the Tk thread, previews go first
+    def __prefetch_image(self):
+        self.prefetch_timer = None
+        if self.settings.render_process:
+            return
+        if self.scheduler.is_busy() or image_cache.prefetch_next():
+            self.prefetch_timer = self.preview.after(self.PREFETCH_MS, self.__prefetch_image)
+    
+    # Number of processes rendering an animation, 1 renders it directly into the video
+    def set_animation_workers(self, workers: int):
+        assert workers >= 1
+        self.settings.animation_workers = workers
+    
+    def set_render_process(self, enabled: bool):
+        self.settings.render_process = enabled
+        if not enabled:
+            self.engine.kill()
+            self.drop_snapshots()
+    
+    # Stop background rendering, called when the program is closed
+    def shutdown(self):
+        self.scheduler.shutdown()
+        self.engine.kill()
+        self.probe_engine.kill()
+        self.drop_snapshots()
+        self.queue.shutdown()
+    
 # Parses and returns a Settings object
 # May return NoneType, please check outside
 def load_settings() -> Settings:
@@ -0,0 +1,138 @@
+# created on: 17/10/2026
+
+# description:
+# Cache of Blender image datablocks for HDRIs and textures. Picking an image which was
+# loaded before reuses its datablock instead of reading the file again and leaving
+# ".001" copies behind. A file which changed on disk (size or modification time) is
+# reloaded into the same datablock. Images no material or world uses any more are
+# removed, least recently used first, once the decoded images exceed the memory limit.
+# prefetch() queues images the user is likely to pick next, prefetch_next() decodes one
+# of them. Blender data must only be changed by the thread changing the scene, so the
+# GUI calls it in idle slices of the Tk main loop (Control.prefetch_images).
+
+from collections import OrderedDict
+import os
+import threading
+import bpy
+
+class ImageCache:
+    def __init__(self, max_megabytes: float = 1024):
+        self.max_bytes = int(max_megabytes * 1024 * 1024)
+        self.entries = OrderedDict()   # absolute path -> {"image", "name", "filepath", "stamp", "pinned"}, least recently used first
+        self.lock = threading.RLock()
+        self.prefetching = []          # paths waiting for prefetch_next
+        self.hits = 0
+        self.misses = 0
+
+    # Image datablock of the file at path, loaded if it is not cached or changed on disk
+    def get(self, path: str) -> bpy.types.Image:
+        key = os.path.abspath(path)
+        stamp = file_stamp(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not is_valid(entry):
+                del self.entries[key]   # removed from Blender meanwhile
+                entry = None
+            if entry is None:
+                self.misses += 1
+                image = bpy.data.images.load(bpy.path.relpath(path))
+                entry = {"image": image, "name": image.name, "filepath": image.filepath,
+                         "stamp": stamp, "pinned": False}
+                self.entries[key] = entry
+            elif entry["stamp"] != stamp:
+                self.misses += 1
+                entry["image"].reload()
+                entry["stamp"] = stamp
+            else:
+                self.hits += 1
+            self.entries.move_to_end(key)
+            self.__evict()
+            return entry["image"]
+
+    # Like get, and the pixels are read right away instead of on first use
+    # pinned images are never evicted, e.g. ones a batch scene keeps loaded
+    def load(self, path: str, pin: bool = False) -> bpy.types.Image:
+        with self.lock:
+            image = self.get(path)
+            image.size[0]   # reading the size decodes the file
+            if pin:
+                self.entries[os.path.abspath(path)]["pinned"] = True
+            self.__evict()
+            return image
+
+    # Queue paths for prefetch_next
+    def prefetch(self, paths: list) -> None:
+        with self.lock:
+            for path in paths:
+                if path not in self.prefetching:
+                    self.prefetching.append(path)
+
+    # Decode the next queued image, returns False once the queue is empty
+    def prefetch_next(self) -> bool:
+        with self.lock:
+            if not self.prefetching:
+                return False
+            path = self.prefetching.pop(0)
+        try:
+            if os.path.isfile(path):
+                self.load(path)
+        except Exception as e:
+            print(f"Could not prefetch {path}: {e}")
+        with self.lock:
+            return len(self.prefetching) > 0
+
+    def set_limit(self, max_megabytes: float) -> None:
+        with self.lock:
+            self.max_bytes = int(max_megabytes * 1024 * 1024)
+            self.__evict()
+
+    def size(self) -> int:
+        with self.lock:
+            return sum(image_bytes(entry["image"]) for entry in self.entries.values() if is_valid(entry))
+
+    def stats(self) -> str:
+        with self.lock:
+            return (f"{len(self.entries)} images, {self.size() / 1024 / 1024:.1f} MB, "
+                    f"{self.hits} hits, {self.misses} misses")
+
+    # Remove unused images, least recently used first, until the decoded ones fit the limit
+    # The most recent one was just handed out and is kept. Must be called with the lock held
+    def __evict(self) -> None:
+        size = self.size()
+        for key in list(self.entries)[:-1]:
+            if size <= self.max_bytes:
+                return
+            entry = self.entries[key]
+            image = entry["image"]
+            if not is_valid(entry):
+                del self.entries[key]
+                continue
+            if entry["pinned"] or image.users > 0:
+                continue
+            size -= image_bytes(image)
+            del self.entries[key]
+            bpy.data.images.remove(image)
+
+# (size, modification time) of the file, None if it can't be read
+def file_stamp(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+# False once the datablock of entry was removed from Blender (e.g. a .blend was opened)
+# Looked up by name, using a removed datablock's Python object may crash Blender
+def is_valid(entry: dict) -> bool:
+    image = bpy.data.images.get(entry["name"])
+    return image is not None and image == entry["image"] and image.filepath == entry["filepath"]
+
+# Memory of the decoded pixels, 0 while the file was not read
+def image_bytes(image: bpy.types.Image) -> int:
+    if not image.has_data:
+        return 0
+    width, height = image.size
+    return width * height * image.channels * (4 if image.is_float else 1)
+
+# Shared by the HDRI and texture functions of the program
+cache = ImageCache()
@@ -3,35 +3,49 @@ import sys
 import getopt
 import argparse
 import logging
-from gui.gui_main import ProgramGUI
+import multiprocessing
 import gui.properties as props
 
-try:
-    import bpy
-except:
-    print("Failed to import bpy")
-    exit()
-else:
-    print("Successfully imported bpy!")
-
 verbose_help = "Enables detailed render logging from blender"
 debug_help   = "Debug mode, loads default value and creates additional sliders"
+worker_help  = "Internal, runs a render worker connecting to the given address"
 
 parser = argparse.ArgumentParser(description="Program description")
 parser.add_argument("--verbose", dest="verbose", action="store_true", help=verbose_help)
 # DO NOT call this "--debug", because blender will recognize it then as an argument
 parser.add_argument("--debugging", dest="debug", action="store_true", help=debug_help)
+parser.add_argument("--render-worker", dest="render_worker", metavar="ADDRESS", help=worker_help)
 
-args = parser.parse_args()
-if args.debug:
-    print("Debug mode enabled")
-    props.DEBUG = True
-if args.verbose:
-   props.VERBOSE = True
-
-root = tk.Tk()
-my_gui = ProgramGUI(root)
-root.columnconfigure(0, weight=1)
-root.rowconfigure(0, weight=1)
-my_gui.grid(row=0, column=0, sticky="news")
-root.mainloop()
\ No newline at end of file
+# Processes of the HDRI thumbnail pool (see gui/hdri_thumbnails.py) import this module again,
+# so Blender and the window are only loaded when it is run
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    
+    try:
+        import bpy
+    except:
+        print("Failed to import bpy")
+        exit()
+    else:
+        print("Successfully imported bpy!")
+    from gui.gui_main import ProgramGUI
+    
+    args = parser.parse_args()
+    # Frozen builds start their render workers through the program itself, see engine/client.py
+    if args.render_worker:
+        from engine.worker import serve
+        serve(args.render_worker)
+        sys.exit()
+    if args.debug:
+        print("Debug mode enabled")
+        props.DEBUG = True
+    if args.verbose:
+       props.VERBOSE = True
+    
+    root = tk.Tk()
+    my_gui = ProgramGUI(root)
+    root.columnconfigure(0, weight=1)
+    root.rowconfigure(0, weight=1)
+    my_gui.grid(row=0, column=0, sticky="news")
+    root.mainloop()
+    my_gui.control.shutdown()
@@ -10,6 +10,10 @@ import bpy
 
 DEFAULT_COLOR = (0, 0, 0.8, 1)
 
+# Color space of saved images with the view transform, the preview viewer converts to it
+def display_space(view_transform: str) -> str:
+    return "Filmic sRGB" if view_transform == "Filmic" else "sRGB"
+
 class Noise:
     def __init__(self, mat_control):
         
@@ -66,23 +70,43 @@ class CompositeNodes:
         self.rlayer = self.tree.nodes.new("CompositorNodeRLayers")   
         self.output = self.tree.nodes.new("CompositorNodeComposite")
         self.glare  = self.tree.nodes.new("CompositorNodeGlare")
-        self.tree.links.new(self.rlayer.outputs["Image"], self.output.inputs["Image"])
+        
+        # The viewer receives the final image in display space, so the preview
+        # can read it straight from memory (see utils.Renderer.render_to_image)
+        self.convert = self.tree.nodes.new("CompositorNodeConvertColorSpace")
+        self.viewer  = self.tree.nodes.new("CompositorNodeViewer")
+        self.set_display_space(bpy.context.scene.view_settings.view_transform)
+        self.tree.links.new(self.convert.outputs["Image"], self.viewer.inputs["Image"])
+        self.link_result(self.rlayer.outputs["Image"])
         
         # Glare properties
         self.glare.glare_type = "FOG_GLOW"
         self.glare.threshold = 0.5
         self.glare.size = 10
+        bpy.context.scene.use_nodes = self.glow
+    
+    # Connect the final image to the composite output and the viewer
+    def link_result(self, socket):
+        self.tree.links.new(socket, self.output.inputs["Image"])
+        self.tree.links.new(socket, self.convert.inputs["Image"])
     
+    # Match the viewer's color space to the view transform used when saving
+    # Previews update it before every grab, see utils.preview_compositing
+    def set_display_space(self, view_transform: str):
+        self.convert.from_color_space = "Linear"
+        self.convert.to_color_space   = display_space(view_transform)
+    
+    # Without glow the compositor is off, so final renders skip it. Previews turn it on
+    # for their render, the viewer then receives the render layer passed through
     def set_glow(self, is_glowing: bool):
+        bpy.context.scene.use_nodes = is_glowing
         if is_glowing:
-            bpy.context.scene.use_nodes = True
             self.glow = True
             self.tree.links.new(self.rlayer.outputs["Image"], self.glare.inputs["Image"])
-            self.tree.links.new(self.glare.outputs["Image"], self.output.inputs["Image"])
+            self.link_result(self.glare.outputs["Image"])
         else:
-            bpy.context.scene.use_nodes = False
             self.glow = False
-            self.tree.links.new(self.rlayer.outputs["Image"], self.output.inputs["Image"])
+            self.link_result(self.rlayer.outputs["Image"])
 
 class MaterialController:
 
@@ -235,6 +259,9 @@ class MaterialController:
         if self.emissive:
             self.bsdf.inputs["Emission Strength"].default_value = strength
     
+    def is_solidified(self) -> bool:
+        return self.solidify is not None and self.solidify.show_render
+    
     def set_solidified(self, obj, solidify_enabled: bool):
         if self.solidify is None:
             self.solidify = obj.modifiers.new("Solidify", "SOLIDIFY")
@@ -101,6 +101,7 @@ def convert_active_to_pointcloud(self):
                 bpy.data.node_groups["GeometryNodes"].nodes["Object Info"].inputs[0].default_value = self.sphere
                 set_right_after_import(self)
                 
+        self.control.invalidate_geometry()
         self.control.re_render()
 
 
@@ -201,6 +202,7 @@ def add_plane(self):
     
     bpy.ops.object.select_all(action = "DESELECT")
     bpy.data.objects[self.control.model.name].select_set(True) 
+    self.control.invalidate_geometry()
     self.control.re_render()
 
 # selects the self.control.model object in the scene 
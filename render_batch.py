@@ -0,0 +1,91 @@
+# description:
+# Headless entry point: renders images/videos described by scene spec files
+# (see batch/spec.py) without opening the GUI, e.g.
+#   python render_batch.py product1.yaml product2.json
+# A spec file may also contain a list of specs.
+# With --models, the spec is a template rendered for every model of a directory:
+#   python render_batch.py template.yaml --models assets/models --out renders --workers 2
+
+import sys
+import argparse
+import os
+import time
+import gui.properties as props
+
+try:
+    import bpy
+except:
+    print("Failed to import bpy")
+    sys.exit(1)
+
+from batch.spec import load_specs, SpecError
+from batch.catalog import find_models, catalog_specs, render_in_session, render_in_pool, write_report, summarize
+
+parser = argparse.ArgumentParser(description="Render scene spec files without the GUI")
+parser.add_argument("specs", nargs="+", help="yaml or json scene spec files")
+parser.add_argument("--verbose", dest="verbose", action="store_true", help="Enables detailed render logging from blender")
+parser.add_argument("--check", dest="check", action="store_true", help="Only validate the spec files")
+parser.add_argument("--keep-going", dest="keep_going", action="store_true", help="Continue with the next spec after a failed one")
+parser.add_argument("--models", dest="models", metavar="DIR", help="Render the (single) spec for every model in DIR")
+parser.add_argument("--out", dest="out", metavar="DIR", default="renders", help="Output directory of --models")
+parser.add_argument("--workers", dest="workers", type=int, default=0, help="Warm worker processes for --models (0 = render in this process)")
+parser.add_argument("--report", dest="report", metavar="CSV", help="Write the timing of every model of --models to CSV")
+
+def main(args) -> int:
+    props.VERBOSE = args.verbose
+    specs = []
+    for path in args.specs:
+        try:
+            specs.extend(load_specs(path))
+        except (OSError, SpecError) as e:
+            print(f"{path}: {e}")
+            return 2
+    if args.models:
+        if len(specs) != 1:
+            print("--models needs exactly one template spec")
+            return 2
+        specs = catalog_specs(specs[0], find_models(args.models), args.out)
+    print(f"{len(specs)} scene specs are valid")
+    if args.check:
+        return 0
+    if args.models:
+        return render_catalog(specs, args)
+
+    # imported late, so --check works without setting up a scene
+    from batch.scene import BatchScene
+    scene = BatchScene()
+    failed = 0
+    start = time.monotonic()
+    for spec in specs:
+        try:
+            timings = scene.render(spec)
+        except Exception as e:
+            failed += 1
+            print(f"{spec.name}: failed ({e})")
+            if not args.keep_going:
+                return 1
+        else:
+            print(f"{spec.name}: {spec.output.path} ({timings['setup'] + timings['render']:.1f} s)")
+    print(f"Rendered {len(specs) - failed} of {len(specs)} specs in {time.monotonic() - start:.1f} s")
+    return 1 if failed else 0
+
+# Render the specs of --models in one warm session (or a pool of them), reporting each model when done
+def render_catalog(specs, args) -> int:
+    def on_result(result):
+        if result.error:
+            print(f"{result.name}: failed ({result.error})", flush=True)
+        else:
+            print(f"{result.name}: {result.output} (setup {result.setup:.2f} s, render {result.render:.2f} s)", flush=True)
+
+    start = time.monotonic()
+    if args.workers > 0:
+        results = render_in_pool(specs, args.workers, on_result)
+    else:
+        results = render_in_session(specs, on_result)
+    print(summarize(results, time.monotonic() - start))
+    if args.report:
+        write_report(args.report, results)
+    return 1 if any(result.error for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main(parser.parse_args()))
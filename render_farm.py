@@ -0,0 +1,128 @@
+# description:
+# Render farm entry point (see engine/farm.py), renders the animation of a .blend file
+# (e.g. saved with "Export .blend") on several machines:
+#   python render_farm.py coordinator scene.blend --output video.avi --listen 0.0.0.0:5800
+#   python render_farm.py node coordinator-host:5800 --cache /tmp/render_cache
+# Coordinator and nodes need the same key, given with --key or RENDER_FARM_KEY. Anyone who
+# has the key can run code on the coordinator and the nodes, so it must be kept secret.
+# The coordinator only listens on localhost unless --listen says otherwise.
+# Nodes run from the program directory, like the GUI they start local render workers.
+# To try it on one machine, "local" starts a coordinator together with several nodes:
+#   python render_farm.py local scene.blend --output video.avi --nodes 3
+
+import sys
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+
+from engine.farm import FarmCoordinator, FarmNode, FARM_KEY_ENV
+
+parser = argparse.ArgumentParser(description="Render animations on several machines")
+commands = parser.add_subparsers(dest="command", required=True)
+
+def add_job_arguments(command):
+    command.add_argument("blend", help=".blend file with the animation to render")
+    command.add_argument("--output", dest="output", required=True, help="Video file to write")
+    command.add_argument("--frames-dir", dest="frames_dir", help="Where the frames are collected (default: next to the output)")
+    command.add_argument("--keep-frames", dest="keep_frames", action="store_true", help="Keep the frame images after encoding")
+    command.add_argument("--frames", dest="frames", metavar="START-END", help="Frame range (default: the one of the scene)")
+    command.add_argument("--aspect", dest="aspect", default="16:9", help="Aspect ratio of the render")
+    command.add_argument("--time-limit", dest="time_limit", type=float, default=0, help="Seconds per frame, 0 = no limit")
+
+coordinator = commands.add_parser("coordinator", help="Hand out the frames of a .blend to the nodes")
+add_job_arguments(coordinator)
+coordinator.add_argument("--listen", dest="listen", default="localhost:5800",
+                         help="Address the nodes connect to, e.g. 0.0.0.0:5800 for nodes on other machines")
+coordinator.add_argument("--key", dest="key", help=f"Shared key (default: ${FARM_KEY_ENV})")
+
+node = commands.add_parser("node", help="Render frames for a coordinator")
+node.add_argument("address", help="host:port of the coordinator")
+node.add_argument("--cache", dest="cache", default=os.path.join(tempfile.gettempdir(), "render_farm_cache"),
+                  help="Directory for shipped files and frames")
+node.add_argument("--threads", dest="threads", type=int, default=0, help="Render threads (0 = all)")
+node.add_argument("--name", dest="name", help="Name shown by the coordinator")
+node.add_argument("--keep-running", dest="keep_running", action="store_true", help="Wait for the next coordinator after a job")
+node.add_argument("--key", dest="key", help=f"Shared key (default: ${FARM_KEY_ENV})")
+
+local = commands.add_parser("local", help="Coordinator and several nodes on this machine")
+add_job_arguments(local)
+local.add_argument("--nodes", dest="nodes", type=int, default=2, help="Node processes to start")
+local.add_argument("--drop-node", dest="drop_node", type=float, metavar="SECONDS",
+                   help="Kill the first node after SECONDS, to see its frames being reassigned")
+
+def read_key(args) -> bytes:
+    key = args.key or os.environ.get(FARM_KEY_ENV)
+    if not key:
+        print(f"A shared key is needed, use --key or set {FARM_KEY_ENV}")
+        sys.exit(2)
+    return key.encode()
+
+def make_coordinator(args, address: str, key: bytes) -> FarmCoordinator:
+    aspect = tuple(int(x) for x in args.aspect.split(":"))
+    frames = None
+    if args.frames:
+        start, end = (int(x) for x in args.frames.split("-"))
+        frames = list(range(start, end + 1))
+    return FarmCoordinator(os.path.abspath(args.blend), os.path.abspath(args.output), frames_dir(args),
+                           address, key, os.getcwd(), aspect, args.time_limit, frames)
+
+def frames_dir(args) -> str:
+    return os.path.abspath(args.frames_dir or os.path.splitext(args.output)[0] + "_frames")
+
+def run_coordinator(coordinator: FarmCoordinator, args) -> int:
+    try:
+        coordinator.run()
+    except (RuntimeError, InterruptedError) as e:
+        print(f"Render failed: {e}")
+        print("Finished frames are kept, run the same command again to continue")
+        return 1
+    print(f"Wrote {args.output}")
+    if not args.keep_frames:
+        shutil.rmtree(frames_dir(args), ignore_errors=True)
+    return 0
+
+# Coordinator on a free local port and nodes with caches of their own in a temporary directory
+def run_local(args) -> int:
+    key = os.urandom(16).hex()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        address = f"127.0.0.1:{s.getsockname()[1]}"
+    cache = tempfile.mkdtemp(prefix="render_farm_")
+    env = dict(os.environ)
+    env[FARM_KEY_ENV] = key
+    threads = max(1, (os.cpu_count() or 1) // max(1, args.nodes))
+    nodes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "node", address,
+                               "--cache", os.path.join(cache, f"node{i + 1}"),
+                               "--threads", str(threads), "--name", f"local{i + 1}"], env=env)
+             for i in range(args.nodes)]
+    if args.drop_node and nodes:
+        timer = threading.Timer(args.drop_node, nodes[0].kill)
+        timer.daemon = True
+        timer.start()
+    try:
+        return run_coordinator(make_coordinator(args, address, key.encode()), args)
+    finally:
+        for process in nodes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(cache, ignore_errors=True)
+
+def main(args) -> int:
+    if args.command == "coordinator":
+        if args.listen.rsplit(":", 1)[0] not in ("localhost", "127.0.0.1", "::1"):
+            print(f"Listening on {args.listen}: nodes are only checked by the key, keep it secret "
+                  "and only open the port to trusted machines")
+        return run_coordinator(make_coordinator(args, args.listen, read_key(args)), args)
+    if args.command == "node":
+        FarmNode(args.address, read_key(args), args.cache, args.threads, args.name).serve(args.keep_running)
+        return 0
+    return run_local(args)
+
+if __name__ == "__main__":
+    sys.exit(main(parser.parse_args()))
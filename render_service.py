@@ -0,0 +1,81 @@
+# description:
+# Render service entry point (see batch/service.py), renders scene specs sent over HTTP
+# with a pool of warm worker processes:
+#   python render_service.py serve --port 8765 --workers 2
+# The service only listens on localhost unless --host is given. To try it, submit a
+# spec file and wait for the result:
+#   python render_service.py submit product.yaml --output product.png --wait 120
+
+import sys
+import argparse
+import json
+import os
+import time
+import urllib.request
+import urllib.error
+
+parser = argparse.ArgumentParser(description="Render scene specs sent over HTTP")
+commands = parser.add_subparsers(dest="command", required=True)
+
+serve = commands.add_parser("serve", help="Run the render service")
+serve.add_argument("--host", dest="host", default="127.0.0.1", help="Address to listen on")
+serve.add_argument("--port", dest="port", type=int, default=8765)
+serve.add_argument("--workers", dest="workers", type=int, default=2, help="Warm worker processes")
+serve.add_argument("--out", dest="out", default="assets/service", help="Directory for the results")
+serve.add_argument("--no-warm", dest="warm", action="store_false", help="Don't load the models and HDRIs ahead")
+serve.add_argument("--verbose", dest="verbose", action="store_true", help="Log every request")
+
+submit = commands.add_parser("submit", help="Send a spec file to a running service")
+submit.add_argument("spec", help="yaml or json scene spec (a single one)")
+submit.add_argument("--url", dest="url", default="http://127.0.0.1:8765")
+submit.add_argument("--format", dest="format", default="png", help="png, jpeg, avi or zip")
+submit.add_argument("--output", dest="output", help="Where to save the result")
+submit.add_argument("--wait", dest="wait", type=float, default=300, help="Seconds to wait for the result")
+
+def run_service(args) -> int:
+    from batch.service import RenderService, make_server
+    service = RenderService(args.workers, args.out, args.warm)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"Render service listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+# Submit the spec, then poll the job until its result can be downloaded
+def run_submit(args) -> int:
+    import yaml
+    with open(args.spec, "r") as f:
+        spec = yaml.safe_load(f)   # json is valid yaml as well
+    body = json.dumps({"spec": spec, "format": args.format}).encode()
+    request = urllib.request.Request(args.url + "/renders", data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(request) as response:
+            job = json.load(response)
+        print(f"Job {job['id']} is {job['status']}" + (" (shared with an earlier request)" if job["shared"] else ""))
+        while job["status"] in ("queued", "running") and time.monotonic() - start < args.wait:
+            time.sleep(0.5)
+            with urllib.request.urlopen(f"{args.url}/renders/{job['id']}") as response:
+                job = json.load(response)
+        if job["status"] != "done":
+            print(f"Job {job['id']} is {job['status']} {job['error']}")
+            return 1
+        output = args.output or f"{job['id']}.{args.format}"
+        with urllib.request.urlopen(args.url + job["result"]) as response, open(output, "wb") as f:
+            f.write(response.read())
+    except urllib.error.HTTPError as e:
+        print(f"Request failed ({e.code}): {e.read().decode()}")
+        return 1
+    print(f"Wrote {output} after {time.monotonic() - start:.1f} s "
+          f"(setup {job['setup']:.2f} s, render {job['render']:.2f} s)")
+    return 0
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    sys.exit(run_service(args) if args.command == "serve" else run_submit(args))
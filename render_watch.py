@@ -0,0 +1,43 @@
+# description:
+# Watch folder entry point (see batch/watch.py), renders every model which is dropped
+# into a directory with the look of a template spec, e.g.
+#   python render_watch.py incoming --spec look.yaml --out renders --workers 2
+# The template is a scene spec (batch/spec.py) without model, output.path is ignored.
+
+import sys
+import argparse
+
+from batch.spec import SpecError
+from batch.watch import IngestPipeline, load_template
+
+parser = argparse.ArgumentParser(description="Render models dropped into a directory")
+parser.add_argument("directory", help="Directory to watch, including its subdirectories")
+parser.add_argument("--spec", dest="spec", required=True, help="yaml or json template spec with the look")
+parser.add_argument("--out", dest="out", default="renders", help="Output directory")
+parser.add_argument("--workers", dest="workers", type=int, default=1, help="Warm worker processes")
+parser.add_argument("--debounce", dest="debounce", type=float, default=5,
+                    help="Seconds a file must stay unchanged before it is rendered")
+parser.add_argument("--max-pending", dest="max_pending", type=int, default=4,
+                    help="Files queued for the workers at most, others wait in the folder")
+parser.add_argument("--preview-width", dest="preview_width", type=int, default=480)
+parser.add_argument("--once", dest="once", action="store_true", help="Exit when everything present is rendered")
+
+def main(args) -> int:
+    try:
+        template = load_template(args.spec)
+    except (OSError, SpecError) as e:
+        print(f"{args.spec}: {e}")
+        return 2
+    pipeline = IngestPipeline(args.directory, template, args.out, args.workers, args.debounce,
+                              args.max_pending, args.preview_width)
+    try:
+        pipeline.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+    summary = pipeline.metrics.summary(0)
+    print(f"Rendered {summary['files']} files ({summary['failed']} failed), "
+          f"latency p50 {summary['latency_p50']:.1f} s, p95 {summary['latency_p95']:.1f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(parser.parse_args()))
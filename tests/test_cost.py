@@ -0,0 +1,77 @@
+# created on: 17/10/2026
+
+# description:
+# Render time model of engine/cost.py: ridge fit to logged renders, probe and ETA math
+
+import numpy as np
+
+from engine.cost import (RenderLog, CostModel, DEFAULT_WEIGHTS, design_row, probe_seconds,
+                         remaining_seconds, format_duration)
+from engine.jobs import RenderJob, JobStatus
+
+def features(pixels=1920 * 1080, samples=64, faces=1e5, transmission=0.0, emission=0,
+             bounces=4, lights=1, instances=0, time_limit=0) -> dict:
+    return {"pixels": pixels, "samples": samples, "faces": faces, "transmission": transmission,
+            "emission": emission, "bounces": bounces, "lights": lights, "instances": instances,
+            "time_limit": time_limit}
+
+def test_defaults_without_logged_renders(tmp_path):
+    model = CostModel(RenderLog(str(tmp_path / "log.yaml")))
+    f = features()
+    assert np.isclose(model.predict(f), design_row(f) @ DEFAULT_WEIGHTS)
+
+def test_fit_recovers_the_weights_of_logged_renders(tmp_path):
+    log = RenderLog(str(tmp_path / "log.yaml"))
+    weights = DEFAULT_WEIGHTS * np.array([1.5, 0.5, 2, 1, 0.5, 2, 1, 1])
+    rng = np.random.default_rng(3)
+    for _ in range(60):
+        f = features(pixels=int(rng.integers(1e5, 4e6)), samples=int(rng.integers(8, 512)),
+                     faces=float(rng.integers(0, 2e6)), transmission=float(rng.random()),
+                     emission=int(rng.integers(0, 2)), bounces=int(rng.integers(1, 12)),
+                     lights=int(rng.integers(0, 4)), instances=int(rng.integers(0, 5000)))
+        log.add(f, float(design_row(f) @ weights))
+    model = CostModel(log)
+    f = features(pixels=2e6, samples=256, faces=5e5, bounces=8)
+    assert np.isclose(model.predict(f), design_row(f) @ weights, rtol=0.02)
+
+def test_time_limited_renders_are_not_fitted(tmp_path):
+    log = RenderLog(str(tmp_path / "log.yaml"))
+    for _ in range(5):
+        log.add(features(time_limit=1), 1000.0)
+    model = CostModel(log)
+    f = features()
+    assert np.isclose(model.predict(f), design_row(f) @ DEFAULT_WEIGHTS)
+    assert model.predict(features(time_limit=1)) <= 1 + DEFAULT_WEIGHTS[0]
+
+def test_log_survives_a_restart(tmp_path):
+    path = str(tmp_path / "log.yaml")
+    RenderLog(path).add(features(), 12.5)
+    assert RenderLog(path).samples()[0]["seconds"] == 12.5
+
+def test_probe_seconds():
+    probe = {"overhead": 2.0, "per_sample": 1e-8}
+    assert np.isclose(probe_seconds(probe, features(pixels=1e6, samples=100)), 3.0)
+    assert np.isclose(probe_seconds(probe, features(pixels=1e6, samples=1000, time_limit=4)), 6.0)
+
+def job(**values) -> RenderJob:
+    job = RenderJob(name="job", snapshot="", output="", animation=True, aspect=(16, 9), time_limit=0)
+    for name, value in values.items():
+        setattr(job, name, value)
+    return job
+
+def test_remaining_time_moves_from_the_estimate_to_the_measured_frames():
+    now = 1000.0
+    queued = job(status=JobStatus.QUEUED, estimate=50)
+    assert remaining_seconds(queued, now) == 50
+    # 10 of 100 frames in 100 s, estimated 2 s per frame: half measured, half estimated
+    running = job(status=JobStatus.RUNNING, estimate=200, frames_total=100, frames_done=10, started=now - 100)
+    assert np.isclose(remaining_seconds(running, now), 90 * (0.5 * 10 + 0.5 * 2))
+    running.frames_done = 50
+    running.started = now - 500
+    assert np.isclose(remaining_seconds(running, now), 50 * 10)
+    assert remaining_seconds(job(status=JobStatus.DONE), now) == 0
+
+def test_format_duration():
+    assert format_duration(0.2) == "1 s"
+    assert format_duration(90) == "2 min"
+    assert format_duration(3 * 3600 + 600) == "3 h 10 min"
@@ -0,0 +1,90 @@
+# created on: 17/10/2026
+
+# description:
+# Frame assignment of engine/farm.py: reassignment when a node leaves, rescue of slow nodes
+
+import threading
+import time
+
+from engine.farm import FarmScheduler
+
+def scheduler(frames: int, *nodes: str) -> FarmScheduler:
+    farm = FarmScheduler(list(range(1, frames + 1)))
+    for node in nodes:
+        farm.join(node)
+    return farm
+
+# Render every chunk node gets until all frames are finished, returns the frames
+def render_all(farm: FarmScheduler, node: str) -> list:
+    rendered = []
+    while True:
+        chunk = farm.next_chunk(node)
+        if not chunk:
+            return rendered
+        for frame in chunk:
+            farm.frame_done(node, frame, 1.0)
+        rendered += chunk
+        farm.chunk_done(node)
+
+# "slow" takes frame 1 and "fast" renders frame 2, then the clock moves on by seconds
+def slow_and_fast(monkeypatch, seconds: float) -> FarmScheduler:
+    farm = scheduler(2, "slow", "fast")
+    assert farm.next_chunk("slow") == [1]
+    assert farm.next_chunk("fast") == [2]
+    farm.frame_done("fast", 2, 1.0)
+    farm.chunk_done("fast")
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    return farm
+
+def test_frames_of_a_node_which_left_are_handed_out_again():
+    farm = scheduler(3, "a", "b")
+    assert farm.next_chunk("a") == [1]
+    farm.leave("a")
+    assert farm.reassigned == 1
+    assert sorted(render_all(farm, "b")) == [1, 2, 3]
+    assert farm.is_complete()
+
+def test_finished_frames_are_not_handed_out_again():
+    farm = scheduler(2, "a", "b")
+    assert farm.next_chunk("a") == [1]
+    farm.frame_done("a", 1, 1.0)
+    farm.leave("a")
+    assert farm.reassigned == 0
+    assert render_all(farm, "b") == [2]
+
+def test_frames_rendered_twice_count_once():
+    farm = scheduler(1, "a")
+    farm.next_chunk("a")
+    farm.frame_done("a", 1, 1.0)
+    farm.frame_done("a", 1, 9.0)
+    assert farm.frame_seconds == 1.0
+    assert farm.is_complete()
+
+def test_slow_node_is_rescued(monkeypatch):
+    farm = slow_and_fast(monkeypatch, 10 * FarmScheduler.MIN_SLOW_SECONDS)
+    assert farm.next_chunk("fast") == [1]
+    assert farm.reassigned == 1
+    farm.frame_done("fast", 1, 1.0)
+    assert farm.is_obsolete("slow")
+    assert farm.is_complete()
+
+def test_node_making_progress_is_not_rescued(monkeypatch):
+    farm = slow_and_fast(monkeypatch, 1)
+    result = []
+    waiting = threading.Thread(target=lambda: result.append(farm.next_chunk("fast")))
+    waiting.start()
+    waiting.join(0.3)
+    assert waiting.is_alive()   # waits for slow, which may still turn out slow or leave
+    farm.cancel()
+    waiting.join(5)
+    assert result == [[]]
+    assert farm.reassigned == 0
+
+def test_rescued_frames_go_back_to_pending_when_both_nodes_leave(monkeypatch):
+    farm = slow_and_fast(monkeypatch, 10 * FarmScheduler.MIN_SLOW_SECONDS)
+    assert farm.next_chunk("fast") == [1]
+    farm.leave("slow")
+    assert farm.pending == []   # still rendered by fast
+    farm.leave("fast")
+    assert farm.pending == [1]
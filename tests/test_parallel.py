@@ -0,0 +1,102 @@
+# created on: 17/10/2026
+
+# description:
+# Chunk scheduling and the frame manifest of engine/parallel.py
+
+import os
+from PIL import Image
+
+from engine.parallel import FrameScheduler, FrameManifest, file_signature
+from engine.worker import frame_file
+
+def test_first_chunk_is_a_single_frame():
+    scheduler = FrameScheduler(list(range(1, 101)), workers=2)
+    assert scheduler.next_chunk() == [1]
+
+def test_chunks_follow_cost_and_fair_share():
+    scheduler = FrameScheduler(list(range(1, 101)), workers=2)
+    scheduler.next_chunk()
+    scheduler.done()
+    scheduler.measured(1.0)
+    chunk = scheduler.next_chunk()
+    # 20 s per chunk allows 20 frames, half a fair share of the 99 left only 24
+    assert chunk == list(range(2, 22))
+    scheduler.measured(0.1)
+    scheduler.measured(0.1)
+    # cheap frames: the share of what is left decides
+    assert len(scheduler.next_chunk()) == 79 // 4
+
+def test_chunks_get_smaller_towards_the_end():
+    scheduler = FrameScheduler(list(range(1, 11)), workers=4)
+    scheduler.measured(0.01)
+    sizes = []
+    while True:
+        chunk = scheduler.next_chunk()
+        if not chunk:
+            break
+        sizes.append(len(chunk))
+        scheduler.done()
+    assert sum(sizes) == 10
+    assert sizes[-1] == 1
+
+def test_unfinished_frames_are_handed_out_again():
+    scheduler = FrameScheduler([1, 2, 3], workers=1)
+    scheduler.measured(0.01)
+    first = scheduler.next_chunk()
+    scheduler.done(unfinished=first)
+    again = []
+    while True:
+        chunk = scheduler.next_chunk()
+        if not chunk:
+            break
+        again += chunk
+        scheduler.done()
+    assert sorted(again) == [1, 2, 3]
+
+def write_frame(directory: str, frame: int) -> None:
+    Image.new("RGB", (8, 8), (frame, 0, 0)).save(frame_file(directory, frame))
+
+def test_manifest_round_trip(tmp_path):
+    directory = str(tmp_path)
+    manifest = FrameManifest(directory, "scene-a")
+    for frame in (1, 2, 3):
+        write_frame(directory, frame)
+        manifest.add(frame, 0.5)
+    loaded = FrameManifest(directory, "scene-a")
+    loaded.load()
+    assert sorted(loaded.frames) == [1, 2, 3]
+
+def test_manifest_of_another_signature_is_ignored(tmp_path):
+    directory = str(tmp_path)
+    manifest = FrameManifest(directory, "scene-a")
+    write_frame(directory, 1)
+    manifest.add(1, 0.5)
+    changed = FrameManifest(directory, "scene-b")
+    changed.load()
+    assert changed.frames == {}
+
+def test_broken_frames_are_rendered_again(tmp_path):
+    directory = str(tmp_path)
+    manifest = FrameManifest(directory, "scene-a")
+    for frame in (1, 2, 3):
+        write_frame(directory, frame)
+        manifest.add(frame, 0.5)
+    with open(frame_file(directory, 2), "r+b") as f:
+        f.truncate(os.path.getsize(frame_file(directory, 2)) // 2)
+    os.remove(frame_file(directory, 3))
+    loaded = FrameManifest(directory, "scene-a")
+    loaded.load()
+    assert sorted(loaded.frames) == [1]
+
+def test_broken_manifest_is_ignored(tmp_path):
+    (tmp_path / FrameManifest.FILENAME).write_text("frames: [unclosed")
+    manifest = FrameManifest(str(tmp_path), "scene-a")
+    manifest.load()
+    assert manifest.frames == {}
+
+def test_file_signature_follows_the_content(tmp_path):
+    path = tmp_path / "scene.blend"
+    path.write_bytes(b"a" * 10)
+    before = file_signature(str(path))
+    path.write_bytes(b"a" * 9 + b"b")
+    assert file_signature(str(path)) != before
@@ -0,0 +1,47 @@
+# created on: 17/10/2026
+
+# description:
+# LRU eviction of gui/preview_cache.py
+
+from PIL import Image
+
+from gui.preview_cache import PreviewCache, image_bytes
+
+MEGABYTE = 1024 * 1024
+
+# RGB image of about megabytes
+def image(megabytes: float) -> Image.Image:
+    return Image.new("RGB", (1024, int(megabytes * 1024 / 3)))
+
+def test_least_recently_used_is_evicted():
+    cache = PreviewCache(2.5)
+    cache.put("a", image(1))
+    cache.put("b", image(1))
+    assert cache.get("a") is not None   # b is the least recently used now
+    cache.put("c", image(1))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size <= 2.5 * MEGABYTE
+
+def test_replacing_a_key_keeps_the_size_right():
+    cache = PreviewCache(10)
+    first, second = image(1), image(2)
+    cache.put("a", first)
+    cache.put("a", second)
+    assert cache.size == image_bytes(second)
+    assert cache.get("a") is second
+
+def test_lower_limit_evicts():
+    cache = PreviewCache(10)
+    for key in "abcd":
+        cache.put(key, image(1))
+    cache.set_limit(2)
+    assert list(cache.images) == ["c", "d"]
+
+def test_hits_and_misses():
+    cache = PreviewCache(10)
+    cache.put("a", image(0.1))
+    cache.get("a")
+    cache.get("x")
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert "50% hit rate" in cache.stats()
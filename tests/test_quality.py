@@ -0,0 +1,47 @@
+# created on: 17/10/2026
+
+# description:
+# Quality ladder of gui/quality.py
+
+from gui.quality import QualityController
+
+def test_slow_preview_lowers_quality():
+    controller = QualityController(1.0)
+    assert controller.update(1.5)
+    assert controller.level == QualityController.DEFAULT_LEVEL + 1
+
+def test_much_too_slow_preview_skips_a_level():
+    controller = QualityController(1.0)
+    controller.update(3.0)
+    assert controller.level == QualityController.DEFAULT_LEVEL + 2
+
+def test_fast_previews_raise_quality_after_some_in_a_row():
+    controller = QualityController(1.0)
+    for _ in range(QualityController.UPGRADE_AFTER - 1):
+        assert not controller.update(0.1)
+    assert controller.update(0.1)
+    assert controller.level == QualityController.DEFAULT_LEVEL - 1
+
+def test_preview_within_target_resets_the_fast_streak():
+    controller = QualityController(1.0)
+    controller.update(0.1)
+    controller.update(0.1)
+    controller.update(0.8)
+    controller.update(0.1)
+    assert controller.level == QualityController.DEFAULT_LEVEL
+
+def test_levels_are_clamped():
+    controller = QualityController(1.0)
+    for _ in range(20):
+        controller.update(10)
+    assert controller.level == len(QualityController.LEVELS) - 1
+    assert not controller.update(10)
+    for _ in range(100):
+        controller.update(0.01)
+    assert controller.level == 0
+
+def test_reset():
+    controller = QualityController(1.0)
+    controller.update(5)
+    controller.reset()
+    assert controller.quality() == QualityController.LEVELS[QualityController.DEFAULT_LEVEL]
@@ -0,0 +1,107 @@
+# created on: 17/10/2026
+
+# description:
+# Round trips of synthetic Radiance files through the NumPy reader of HDRI/radiance.py
+
+import numpy as np
+import pytest
+
+from HDRI.radiance import read_hdr, rgbe_to_float, downsample, tone_map, hdri_thumbnail
+
+# RGBE pixels with runs of equal bytes, so RLE files contain both kinds of runs
+def make_rgbe(width: int, height: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rgbe = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    rgbe[:, width // 3: width // 2] = rgbe[:, width // 3: width // 3 + 1]
+    rgbe[..., 3] = rng.integers(120, 140, (height, width), dtype=np.uint8)
+    rgbe[0, :4, 3] = 0   # black pixels
+    return rgbe
+
+# Encode one component of a scanline into runs, the way Radiance writes them
+def encode_component(values: np.ndarray) -> bytes:
+    out = bytearray()
+    i = 0
+    while i < len(values):
+        run = 1
+        while i + run < len(values) and run < 127 and values[i + run] == values[i]:
+            run += 1
+        if run >= 4:
+            out += bytes((128 + run, values[i]))
+            i += run
+            continue
+        start = i
+        while i < len(values) and i - start < 128:
+            if i + 3 < len(values) and values[i] == values[i + 1] == values[i + 2] == values[i + 3]:
+                break
+            i += 1
+        out += bytes((i - start,)) + values[start:i].tobytes()
+    return bytes(out)
+
+def write_hdr(path, rgbe: np.ndarray, rle: bool = True, resolution: str = None) -> None:
+    height, width = rgbe.shape[:2]
+    resolution = resolution or f"-Y {height} +X {width}"
+    with open(path, "wb") as f:
+        f.write(b"#?RADIANCE\nFORMAT=32-bit_rle_rgbe\n\n" + resolution.encode() + b"\n")
+        if not rle:
+            f.write(rgbe.tobytes())
+            return
+        for row in rgbe:
+            f.write(bytes((2, 2, width >> 8, width & 0xff)))
+            for c in range(4):
+                f.write(encode_component(np.ascontiguousarray(row[:, c])))
+
+def test_rle_round_trip(tmp_path):
+    rgbe = make_rgbe(300, 70)
+    path = tmp_path / "rle.hdr"
+    write_hdr(path, rgbe)
+    assert np.array_equal(read_hdr(str(path)), rgbe_to_float(rgbe))
+
+def test_flat_round_trip(tmp_path):
+    rgbe = make_rgbe(40, 10)
+    path = tmp_path / "flat.hdr"
+    write_hdr(path, rgbe, rle=False)
+    assert np.array_equal(read_hdr(str(path)), rgbe_to_float(rgbe))
+
+def test_bottom_up_files_are_flipped(tmp_path):
+    rgbe = make_rgbe(64, 8)
+    path = tmp_path / "flipped.hdr"
+    write_hdr(path, rgbe, resolution="+Y 8 +X 64")
+    assert np.array_equal(read_hdr(str(path)), rgbe_to_float(rgbe)[::-1])
+
+def test_black_and_scale():
+    rgbe = np.array([[[128, 64, 0, 0], [128, 64, 0, 129]]], dtype=np.uint8)
+    rgb = rgbe_to_float(rgbe)
+    assert np.all(rgb[0, 0] == 0)
+    assert np.allclose(rgb[0, 1], np.array([128.5, 64.5, 0.5]) / 256 * 2)
+
+@pytest.mark.parametrize("rle", (True, False))
+def test_truncated_file_raises(tmp_path, rle):
+    path = tmp_path / "truncated.hdr"
+    write_hdr(path, make_rgbe(100, 20), rle=rle)
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) * 2 // 3])
+    with pytest.raises(ValueError):
+        read_hdr(str(path))
+
+def test_not_a_radiance_file(tmp_path):
+    path = tmp_path / "text.hdr"
+    path.write_bytes(b"hello\n\n-Y 1 +X 1\n....")
+    with pytest.raises(ValueError):
+        read_hdr(str(path))
+
+def test_downsample_averages_blocks():
+    rgb = np.arange(4 * 6 * 3, dtype=np.float32).reshape(4, 6, 3)
+    small = downsample(rgb, 2)
+    assert small.shape == (2, 3, 3)
+    assert np.allclose(small[0, 0], rgb[:2, :2].mean(axis=(0, 1)))
+
+def test_tone_map_range():
+    rgb = np.array([[[0, 0, 0], [1e4, 1e4, 1e4], [0.18, 0.18, 0.18]]], dtype=np.float32)
+    ldr = tone_map(rgb)
+    assert ldr.dtype == np.uint8
+    assert ldr[0, 0].max() == 0 and ldr[0, 1].min() > 250
+
+def test_thumbnail_size(tmp_path):
+    path = tmp_path / "panorama.hdr"
+    write_hdr(path, make_rgbe(512, 256))
+    assert hdri_thumbnail(str(path), 64).size == (64, 64)
@@ -0,0 +1,47 @@
+# created on: 17/10/2026
+
+# description:
+# Validation of the scene specs of batch/spec.py
+
+import json
+import pytest
+
+from batch.spec import SceneSpec, SpecError, load_specs
+
+@pytest.fixture
+def model(tmp_path):
+    path = tmp_path / "model.obj"
+    path.write_text("v 0 0 0\n")
+    return str(path)
+
+def test_defaults(model):
+    spec = SceneSpec.from_dict({"model": model, "output": {"path": "out.png"}}, "spec")
+    assert spec.material.preset == "default"
+    assert spec.output.quality == "final"
+    assert not spec.is_animation()
+    assert spec.name == "spec"
+
+@pytest.mark.parametrize("dic, message", [
+    ({"output": {"path": "out.png"}}, "model is missing"),
+    ({"output": {}}, "output.path is missing"),
+    ({"output": {"path": "out.png"}, "material": {"preset": "wood"}}, "material.preset"),
+    ({"output": {"path": "out.png"}, "light": {"colour": 1}}, "unknown keys colour"),
+    ({"output": {"path": "out.png"}, "camera": {"orbit": [1]}}, "camera.orbit"),
+    ({"output": {"path": "out.png"}, "animation": {"frame_start": 10, "frame_end": 5}}, "before frame_start"),
+    ({"output": {"path": "out.png"}, "views": {"count": 4}, "animation": {}}, "can't be combined"),
+    ({"output": {"path": "out.png"}, "texture": "missing.png"}, "file not found"),
+])
+def test_invalid_specs(model, dic, message):
+    dic = dict(dic)
+    if message != "model is missing":
+        dic["model"] = model
+    with pytest.raises(SpecError, match=message):
+        SceneSpec.from_dict(dic)
+
+def test_load_list_of_specs(tmp_path, model):
+    path = tmp_path / "specs.json"
+    path.write_text(json.dumps([{"model": model, "output": {"path": "a.png"}},
+                                {"model": model, "output": {"path": "b.mp4"}, "animation": {"frame_end": 10}}]))
+    specs = load_specs(str(path))
+    assert [spec.name for spec in specs] == ["specs[0]", "specs[1]"]
+    assert specs[1].is_animation()
@@ -9,15 +9,24 @@ Will need to be expanded and adapted as the project progresses.
 
 import bpy
 import os
-from math import radians
+from math import radians, degrees, ceil, sqrt
 import fnmatch
 from PIL import Image, ImageOps
+import numpy as np
 import sys
 import gui.properties as props
 from gui.properties import PATH_THUMB, PATH_PREVIEW
+from HDRI.radiance import save_thumbnail
+from materials.materials import display_space
+from gui.quality import PreviewQuality
 from contextlib import contextmanager, redirect_stdout
 from tkinter import IntVar
 import enum
+import threading
+import time
+import hashlib
+import re
+import tempfile
 
 
 # Disable console output if verbose flag is not set
@@ -115,6 +124,15 @@ class OrbitCam:
             newDist = 0.1 
         self.distance_constraint.distance = newDist
 
+    # place the camera at an absolute position on its orbit
+    # yaw: degrees around global z, elevation: degrees above the horizon
+    def set_pose(self, yaw: float, elevation: float) -> None:
+        set_orbit_pose(self.controller, yaw, elevation)
+    
+    # (yaw, elevation) in degrees, see set_pose
+    def get_pose(self) -> (float, float):
+        return (degrees(self.controller.rotation_euler[2]), -degrees(self.controller.rotation_euler[1]))
+    
     # resets camera to default position
     def reset_position(self) -> None:
         self.distance_constraint.distance = 5
@@ -123,8 +141,40 @@ class OrbitCam:
         self.controller.location = (0,0,0)
 
 
+# Rotate the controller of an OrbitCam, also used on loaded scenes without an OrbitCam object
+def set_orbit_pose(controller: bpy.types.Object, yaw: float, elevation: float) -> None:
+    controller.rotation_euler[1] = radians(-elevation)
+    controller.rotation_euler[2] = radians(yaw)
+
+# Poses (yaw, elevation) of a turntable: views evenly spaced around the model,
+# repeated for every elevation. The default start matches OrbitCam.reset_position
+def turntable_poses(views: int, elevations=(30,), start: float = 45) -> list:
+    assert views > 0
+    return [(start + i * 360 / views, elevation) for elevation in elevations for i in range(views)]
+
+# Combine images into a grid, columns = 0 makes it about square
+# Every image is scaled to tile_width
+def make_contact_sheet(files: list, path: str, columns: int = 0, tile_width: int = 320) -> None:
+    columns = columns if columns > 0 else ceil(sqrt(len(files)))
+    rows = ceil(len(files) / columns)
+    tiles = []
+    for file in files:
+        with Image.open(file) as image:
+            height = max(1, int(image.height * tile_width / image.width))
+            tiles.append(image.convert("RGB").resize((tile_width, height), Image.LANCZOS))
+    tile_height = max(tile.height for tile in tiles)
+    sheet = Image.new("RGB", (columns * tile_width, rows * tile_height), "white")
+    for i, tile in enumerate(tiles):
+        sheet.paste(tile, ((i % columns) * tile_width, (i // columns) * tile_height))
+    sheet.save(path)
+
 # basic renderer
 class Renderer:
+    # (resolution percentage, fraction of preview samples) of each progressive preview pass
+    PROGRESSIVE_PASSES = ((25, 0), (50, 0.25), (100, 1))
+    # (resolution percentage, samples) of previews rendered while dragging
+    INTERACTIVE_PASS = (25, 1)
+
     def __init__(self, 
                  camera: bpy.types.Object,
                  timelimit: int,
@@ -134,34 +184,197 @@ class Renderer:
         self.scene.camera = self.camera
         self.time_limit = timelimit
         self.aspect = aspect
+        self.preview_samples = self.scene.cycles.samples
+        # held while the scene is rendered or exported, in the GUI previews render on the Tk thread
+        self.lock = threading.RLock()
+        # keep cycles' scene data (BVH, synced meshes) alive between previews
+        self.persistent_data = False
+        self.geometry_changed = False
+        self.geometry_version = 0   # counts geometry changes, see snapshot_fingerprint
+        # (width, height, scale) of the area showing the preview, None renders 640px wide
+        self.preview_size = None
+        self.preview_quality = PreviewQuality()
     
     # render image/video to configured output destination 
-    def render(self, animation: bool) -> None:
+    # write_still: if False, the image is only kept in memory
+    def render(self, animation: bool, write_still: bool = True) -> None:
         self.scene.render.image_settings.file_format = "AVI_JPEG" if animation else "PNG"
+        if self.geometry_changed:
+            self.free_persistent_data()
         if props.VERBOSE:
-            bpy.ops.render.render(write_still=True, animation=animation)
+            bpy.ops.render.render(write_still=write_still, animation=animation)
         else:
             with hide_output():
-                bpy.ops.render.render(write_still=True, animation=animation)
+                bpy.ops.render.render(write_still=write_still, animation=animation)
+    
+    # render a still image and return it without writing it to disk
+    def render_to_image(self) -> Image.Image:
+        with preview_compositing(self.scene):
+            self.render(animation=False, write_still=False)
+            return grab_render_result(self.scene)
     
     # apply settings for preview rendering
+    # num_samples: overrides the samples of the preview quality
     def set_preview_render(self,
                            file_path: str = "assets/gui/preview.png",
                            use_transparent_bg: bool = False,
-                           num_samples: int = 8) -> None:
+                           num_samples: int = None) -> None:
 
+        quality = self.preview_quality
+        num_samples = quality.samples if num_samples is None else num_samples
         self.scene.render.engine = 'CYCLES'
         self.scene.render.filepath = bpy.path.relpath(file_path)
         self.scene.render.film_transparent = use_transparent_bg
-        self.scene.view_layers[0].cycles.use_denoising = False
+        self.scene.view_layers[0].cycles.use_denoising = quality.denoise
         self.scene.cycles.use_adaptive_sampling = True
         self.scene.cycles.samples = num_samples
-        self.scene.render.use_persistent_data = False
-        self.scene.cycles.max_bounces = 4
+        self.preview_samples = num_samples
+        self.scene.render.use_persistent_data = self.persistent_data
+        self.scene.cycles.max_bounces = quality.max_bounces
         self.scene.cycles.tile_size = 4096
         self.scene.cycles.time_limit = self.time_limit
-        self.set_resolution(self.aspect[0], self.aspect[1], 640)
+        if self.preview_size is None:
+            self.set_resolution(self.aspect[0], self.aspect[1], int(640 * quality.scale))
+        else:
+            self.fit_preview_resolution()
+    
+    # Change the quality of following previews, the preview settings must be active
+    def set_preview_quality(self, quality: PreviewQuality) -> None:
+        self.preview_quality = quality
+        self.set_preview_render()
+    
+    # Render previews at the size they are displayed at, times scale
+    def set_preview_size(self, width: int, height: int, scale: float = 1) -> None:
+        self.preview_size = (width, height, scale)
+        self.fit_preview_resolution()
+    
+    # Largest resolution with the configured aspect ratio that fits into the preview size
+    def fit_preview_resolution(self) -> None:
+        width, height, scale = self.preview_size
+        ratio = min(width / self.aspect[0], height / self.aspect[1]) * scale * self.preview_quality.scale
+        self.scene.render.resolution_x = max(1, int(self.aspect[0] * ratio))
+        self.scene.render.resolution_y = max(1, int(self.aspect[1] * ratio))
+    
+    # Render a single preview pass with reduced resolution/samples and return the image
+    # percentage: resolution in percent of the preview resolution
+    def render_pass(self, percentage: int, samples: int, time_limit: float) -> Image.Image:
+        self.scene.render.resolution_percentage = percentage
+        self.scene.cycles.samples = samples
+        self.scene.cycles.time_limit = time_limit
+        try:
+            return self.render_to_image()
+        finally:
+            self.scene.render.resolution_percentage = 100
+            self.scene.cycles.samples = self.preview_samples
+            self.scene.cycles.time_limit = self.time_limit
+    
+    # Render the preview in passes of increasing quality, publish(image) is called after every
+    # intermediate pass. They are skipped once they would eat up more than half of the time limit,
+    # the last pass always uses the normal preview settings, so the final quality is unchanged
+    # run(render) renders a pass, by default right here, see PreviewScheduler.run_on_main
+    # Returns the image of the last pass, or None if cancelled() requested to stop before
+    def render_progressive(self, publish, cancelled, run=None) -> Image.Image:
+        run = run if run is not None else lambda render: render()
+        start = time.monotonic()
+        passes = [(percentage, max(1, int(self.preview_samples * fraction)))
+                  for percentage, fraction in self.PROGRESSIVE_PASSES]
+        for i, (percentage, samples) in enumerate(passes):
+            is_last = i == len(passes) - 1
+            if cancelled():
+                return None
+            if not is_last and i > 0 and self.time_limit > 0 \
+                    and time.monotonic() - start > self.time_limit / 2:
+                continue
+            image = run(lambda: self.render_pass(percentage, samples, self.time_limit if is_last else 0))
+            if not is_last:
+                publish(image)
+        return image
+    
+    # Measure what the current settings cost without rendering them: frames are rendered at
+    # percentage of the resolution, once to sync the scene and then with two sample counts,
+    # which separates the fixed cost of a frame from the cost per pixel and sample
+    # Returns {"overhead": seconds per frame, "per_sample": seconds per pixel sample}
+    def probe(self, frames: list, percentage: int = 25, samples: tuple = (4, 16)) -> dict:
+        render, cycles = self.scene.render, self.scene.cycles
+        saved = (render.resolution_percentage, cycles.samples, cycles.time_limit, self.scene.frame_current)
+        pixels = int(render.resolution_x * percentage / 100) * int(render.resolution_y * percentage / 100)
+        overheads, per_sample = [], []
+        try:
+            render.resolution_percentage = percentage
+            cycles.time_limit = 0
+            for frame in frames:
+                self.scene.frame_set(frame)
+                times = []
+                for count in (samples[0],) + tuple(samples):
+                    cycles.samples = count
+                    start = time.monotonic()
+                    self.render(animation=False, write_still=False)
+                    times.append(time.monotonic() - start)
+                cost = max(0, times[2] - times[1]) / (pixels * (samples[1] - samples[0]))
+                per_sample.append(cost)
+                overheads.append(max(0, times[0] - cost * pixels * samples[0]))
+        finally:
+            render.resolution_percentage, cycles.samples, cycles.time_limit = saved[:3]
+            self.scene.frame_set(saved[3])
+        return {"overhead": sum(overheads) / len(overheads),
+                "per_sample": sum(per_sample) / len(per_sample)}
+
+    # Render a very fast, low resolution preview, used while the user drags sliders
+    def render_interactive(self) -> Image.Image:
+        percentage, samples = self.INTERACTIVE_PASS
+        return self.render_pass(percentage, samples, 0)
         
+    # Render the current settings from every pose (yaw, elevation) of the orbit camera
+    # controller into directory/view_000.png ... The scene is synced once, only the
+    # camera moves between the views. on_view(index, seconds) is called after each view
+    # Returns the written files, the camera pose is restored afterwards
+    def render_views(self, controller: bpy.types.Object, poses: list, directory: str,
+                     on_view=None, cancelled=None) -> list:
+        os.makedirs(directory, exist_ok=True)
+        rotation = tuple(controller.rotation_euler)
+        persistent = self.scene.render.use_persistent_data
+        self.scene.render.use_persistent_data = True
+        files = []
+        start = time.monotonic()
+        try:
+            for i, (yaw, elevation) in enumerate(poses):
+                if cancelled is not None and cancelled():
+                    break
+                view_start = time.monotonic()
+                set_orbit_pose(controller, yaw, elevation)
+                self.scene.render.filepath = os.path.join(directory, f"view_{i:03d}.png")
+                self.render(animation=False)
+                files.append(self.scene.render.filepath)
+                if on_view is not None:
+                    on_view(i, time.monotonic() - view_start)
+        finally:
+            controller.rotation_euler = rotation
+            self.scene.render.use_persistent_data = persistent
+        elapsed = time.monotonic() - start
+        if files:
+            print(f"Rendered {len(files)} views in {elapsed:.1f} s ({len(files) * 60 / elapsed:.1f} views per minute)")
+        return files
+    
+    # Enable/disable keeping the render data between previews
+    def set_persistent_data(self, enabled: bool) -> None:
+        self.persistent_data = enabled
+        if not enabled:
+            self.free_persistent_data()
+    
+    # Mark the kept render data as outdated, must be called whenever meshes are
+    # added, removed or modified. Only camera, light and material changes are
+    # picked up by cycles without rebuilding, the data is freed before the next render
+    def invalidate_geometry(self) -> None:
+        self.geometry_changed = True
+        self.geometry_version += 1
+    
+    # Disabling persistent data makes blender free the data cycles kept
+    def free_persistent_data(self) -> None:
+        enabled = self.scene.render.use_persistent_data
+        self.scene.render.use_persistent_data = False
+        self.scene.render.use_persistent_data = enabled
+        self.geometry_changed = False
+    
     # Change the maximum render time
     def set_time_limit(self, limit: float):
         self.time_limit = limit
@@ -196,7 +409,10 @@ class Renderer:
     # set aspect ratio
     def set_aspect_ratio(self, w: int, h: int) -> None:
         self.aspect = (w, h)
-        self.scene.render.resolution_y = int(self.scene.render.resolution_x / (w / h))
+        if self.preview_size is not None:
+            self.fit_preview_resolution()
+        else:
+            self.scene.render.resolution_y = int(self.scene.render.resolution_x / (w / h))
     
     # set camera
     def set_camera(self, camera: bpy.types.Object) -> None:
@@ -286,9 +502,361 @@ def import_mesh(filepath: str) -> bpy.types.Object:
     scale_to_unit_cube(newObj)
     return newObj
 
+# Runs the compositor for a preview render, so its viewer node receives the image, even
+# while glow is off and final renders skip the compositor. The viewer's color space
+# follows the current view transform (see materials.CompositeNodes)
+@contextmanager
+def preview_compositing(scene: bpy.types.Scene):
+    use_nodes = scene.use_nodes
+    scene.use_nodes = True
+    for node in scene.node_tree.nodes if scene.node_tree else ():
+        if node.bl_idname == "CompositorNodeConvertColorSpace":
+            space = display_space(scene.view_settings.view_transform)
+            if node.to_color_space != space:
+                node.to_color_space = space
+    try:
+        yield
+    finally:
+        scene.use_nodes = use_nodes
+
+# Returns the composited image of the last render as PIL image
+# Reads the pixels of the compositor's viewer node (see materials.CompositeNodes),
+# which are already in display space, so no file has to be written and decoded again
+def grab_render_result(scene: bpy.types.Scene) -> Image.Image:
+    viewer = bpy.data.images.get("Viewer Node")
+    if viewer is None or viewer.size[0] == 0 or not scene.use_nodes:
+        # No viewer in this scene, fall back to a file round trip
+        bpy.data.images["Render Result"].save_render(PATH_PREVIEW, scene=scene)
+        image = Image.open(PATH_PREVIEW)
+        image.load()
+        return image
+
+    width, height = viewer.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    viewer.pixels.foreach_get(pixels)
+    return pixels_to_image(pixels, width, height)
+
+# Converts a flat float RGBA buffer (values in [0, 1], bottom row first) to a PIL image
+def pixels_to_image(pixels: np.ndarray, width: int, height: int) -> Image.Image:
+    rgba = (np.clip(pixels, 0, 1) * 255 + 0.5).astype(np.uint8)
+    # negative stride flips the image, blender stores the bottom row first
+    return Image.frombuffer("RGBA", (width, height), rgba.tobytes(), "raw", "RGBA", 0, -1)
+
+# Node properties which only affect the node editor, not the render
+UI_NODE_PROPERTIES = {"name", "label", "location", "width", "width_hidden", "height", "dimensions",
+                      "select", "hide", "color", "use_custom_color", "show_options", "show_preview",
+                      "show_texture", "parent", "internal_links", "bl_idname", "bl_label",
+                      "bl_description", "bl_icon", "bl_static_type", "bl_width_default",
+                      "bl_width_min", "bl_width_max", "bl_height_default", "bl_height_min",
+                      "bl_height_max", "type", "inputs", "outputs", "rna_type"}
+
+# Turns a blender property value into something with a stable repr()
+def stable_value(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, (bool, int, str)) or value is None:
+        return value
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if hasattr(value, "filepath"):
+        return value.filepath
+    if hasattr(value, "name"):
+        return value.name
+    try:
+        return tuple(stable_value(v) for v in value)
+    except TypeError:
+        return repr(value)
+
+# with_values: False leaves out the inputs a loaded snapshot takes over, see node_input_values
+def describe_node_tree(tree: bpy.types.NodeTree, with_values: bool = True) -> tuple:
+    if tree is None:
+        return ()
+    nodes = []
+    for node in sorted(tree.nodes, key=lambda n: n.name):
+        props = tuple((p.identifier, stable_value(getattr(node, p.identifier)))
+                      for p in node.bl_rna.properties if p.identifier not in UI_NODE_PROPERTIES)
+        inputs = tuple((i.identifier, stable_value(i.default_value))
+                       for i in node.inputs if hasattr(i, "default_value")
+                       and (with_values or socket_value(i) is None))
+        nodes.append((node.name, node.bl_idname, props, inputs))
+    links = sorted((l.from_node.name, l.from_socket.identifier, l.to_node.name, l.to_socket.identifier)
+                   for l in tree.links)
+    return (tuple(nodes), tuple(links))
+
+# The parts of an object a loaded snapshot can't take over, see object_state for the others
+def describe_object_structure(obj: bpy.types.Object) -> tuple:
+    desc = [obj.name, obj.type,
+            obj.parent.name if obj.parent else None,
+            obj.active_material.name if obj.active_material else None,
+            tuple((m.name, m.type, m.show_render, m.node_group.name if getattr(m, "node_group", None) else None)
+                  for m in obj.modifiers),
+            tuple((c.type, c.target.name if getattr(c, "target", None) else None)
+                  for c in obj.constraints)]
+    if obj.type == "MESH":
+        mesh = obj.data
+        desc += [mesh.name, len(mesh.vertices), len(mesh.polygons), tuple(l.name for l in mesh.vertex_colors)]
+    elif obj.type == "LIGHT":
+        desc += [obj.data.type]
+    return tuple(desc)
+
+def describe_object(obj: bpy.types.Object) -> tuple:
+    return describe_object_structure(obj) + (stable_value(tuple(object_state(obj).values())),)
+
+# Transform, visibility, constraint distances, light and lens of an object
+# Picklable, so it can be sent to a render worker, see apply_object_state
+def object_state(obj: bpy.types.Object) -> dict:
+    state = {"hide_render": obj.hide_render,
+             "matrix_basis": [tuple(row) for row in obj.matrix_basis],
+             "distances": [getattr(c, "distance", None) for c in obj.constraints]}
+    if obj.type == "LIGHT":
+        light = obj.data
+        state.update(energy=light.energy, color=tuple(light.color), shadow_soft_size=light.shadow_soft_size)
+    elif obj.type == "CAMERA":
+        state["lens"] = obj.data.lens
+    return state
+
+def apply_object_state(obj: bpy.types.Object, state: dict) -> None:
+    set_if_changed(obj, "hide_render", state["hide_render"])
+    set_if_changed(obj, "matrix_basis", state["matrix_basis"])
+    for constraint, distance in zip(obj.constraints, state["distances"]):
+        if distance is not None:
+            set_if_changed(constraint, "distance", distance)
+    for name in ("energy", "color", "shadow_soft_size"):
+        if name in state:
+            set_if_changed(obj.data, name, state[name])
+    if "lens" in state:
+        set_if_changed(obj.data, "lens", state["lens"])
+
+# Value of an input socket a loaded snapshot can take over: a number, color or vector
+# None for other inputs (shaders, objects, images, strings ...)
+def socket_value(socket):
+    if not hasattr(socket, "default_value"):
+        return None
+    value = socket.default_value
+    if isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return None
+    try:
+        values = tuple(value)
+    except TypeError:
+        return None
+    return values if all(isinstance(v, (int, float)) for v in values) else None
+
+# {node name: {input index: value}} of the inputs socket_value takes over
+def node_input_values(tree: bpy.types.NodeTree) -> dict:
+    values = {}
+    for node in tree.nodes:
+        inputs = {}
+        for i, socket in enumerate(node.inputs):
+            value = socket_value(socket)
+            if value is not None:
+                inputs[i] = value
+        if inputs:
+            values[node.name] = inputs
+    return values
+
+# Set a property only if its value differs, every assignment makes Blender tag the
+# data for an update, which throws away cycles' persistent data of objects and meshes
+def set_if_changed(owner, name: str, value) -> None:
+    if stable_value(getattr(owner, name)) != stable_value(value):
+        setattr(owner, name, value)
+
+# (key, node tree) of the materials, node groups and world of the scene, the key is
+# (bpy.data collection, name) and identifies the tree in a loaded snapshot
+def state_node_trees(scene: bpy.types.Scene) -> list:
+    trees = [(("materials", m.name), m.node_tree) for m in bpy.data.materials if m.users and m.node_tree]
+    trees += [(("node_groups", g.name), g) for g in bpy.data.node_groups]
+    if scene.world and scene.world.node_tree:
+        trees.append((("worlds", scene.world.name), scene.world.node_tree))
+    return trees
+
+# Deterministic fingerprint of everything that influences a rendered preview:
+# render settings, objects, materials, world and compositor nodes
+# Reads only stored values, so no depsgraph evaluation is needed
+def scene_fingerprint(scene: bpy.types.Scene) -> str:
+    world = scene.world
+    state = (
+        (scene.render.resolution_x, scene.render.resolution_y, scene.render.resolution_percentage,
+         scene.render.film_transparent, scene.render.engine, scene.cycles.samples,
+         scene.cycles.max_bounces, round(scene.cycles.time_limit, 6),
+         scene.view_layers[0].cycles.use_denoising, scene.view_settings.view_transform,
+         scene.frame_current, scene.camera.name if scene.camera else None, scene.use_nodes),
+        tuple(describe_object(o) for o in sorted(scene.objects, key=lambda o: o.name)),
+        tuple((m.name, describe_node_tree(m.node_tree))
+              for m in sorted(bpy.data.materials, key=lambda m: m.name) if m.users),
+        tuple((g.name, describe_node_tree(g)) for g in sorted(bpy.data.node_groups, key=lambda g: g.name)),
+        (world.name, world.cycles_visibility.diffuse, world.cycles_visibility.scatter,
+         describe_node_tree(world.node_tree)) if world else None,
+        describe_node_tree(scene.node_tree),
+    )
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+# Fingerprint of the parts of the scene only a new snapshot brings into a render worker:
+# objects and their hierarchy, modifiers, meshes, node trees without their input values.
+# Everything else is sent along with every preview, see scene_state
+def snapshot_fingerprint(scene: bpy.types.Scene) -> str:
+    world = scene.world
+    state = (
+        (scene.render.engine, scene.use_nodes),
+        tuple(describe_object_structure(o) for o in sorted(scene.objects, key=lambda o: o.name)),
+        tuple((m.name, describe_node_tree(m.node_tree, with_values=False))
+              for m in sorted(bpy.data.materials, key=lambda m: m.name) if m.users),
+        tuple((g.name, describe_node_tree(g, with_values=False))
+              for g in sorted(bpy.data.node_groups, key=lambda g: g.name)),
+        (world.name, world.cycles_visibility.diffuse, world.cycles_visibility.scatter,
+         describe_node_tree(world.node_tree, with_values=False)) if world else None,
+        describe_node_tree(scene.node_tree),
+    )
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+# Render settings, frame, camera, object states and node input values of the scene,
+# which a render worker applies to the snapshot it loaded, see apply_scene_state
+def scene_state(scene: bpy.types.Scene) -> dict:
+    render, cycles = scene.render, scene.cycles
+    return {
+        "render": {"resolution_x": render.resolution_x, "resolution_y": render.resolution_y,
+                   "resolution_percentage": render.resolution_percentage,
+                   "film_transparent": render.film_transparent,
+                   "use_persistent_data": render.use_persistent_data},
+        "cycles": {"samples": cycles.samples, "max_bounces": cycles.max_bounces,
+                   "time_limit": cycles.time_limit, "use_adaptive_sampling": cycles.use_adaptive_sampling,
+                   "tile_size": cycles.tile_size},
+        "denoise": scene.view_layers[0].cycles.use_denoising,
+        "view_transform": scene.view_settings.view_transform,
+        "frame": scene.frame_current,
+        "camera": scene.camera.name if scene.camera else None,
+        "objects": {obj.name: object_state(obj) for obj in scene.objects},
+        "node_trees": {key: node_input_values(tree) for key, tree in state_node_trees(scene)},
+    }
+
+# Only values which differ are set, so cycles keeps the data it can keep
+def apply_scene_state(scene: bpy.types.Scene, state: dict) -> None:
+    for owner, values in ((scene.render, state["render"]), (scene.cycles, state["cycles"])):
+        for name, value in values.items():
+            set_if_changed(owner, name, value)
+    set_if_changed(scene.view_layers[0].cycles, "use_denoising", state["denoise"])
+    set_if_changed(scene.view_settings, "view_transform", state["view_transform"])
+    # the frame first, animated objects are set by it and then get the state of the GUI
+    if scene.frame_current != state["frame"]:
+        scene.frame_set(state["frame"])
+    camera = scene.objects.get(state["camera"]) if state["camera"] else None
+    if scene.camera != camera:
+        scene.camera = camera
+    for name, object_values in state["objects"].items():
+        obj = scene.objects.get(name)
+        if obj is not None:
+            apply_object_state(obj, object_values)
+    for (collection, name), nodes in state["node_trees"].items():
+        owner = getattr(bpy.data, collection).get(name)
+        if owner is None:
+            continue
+        tree = owner if collection == "node_groups" else owner.node_tree
+        for node_name, inputs in nodes.items():
+            node = tree.nodes.get(node_name)
+            if node is None:
+                continue
+            for i, value in inputs.items():
+                set_if_changed(node.inputs[i], "default_value", value)
+
+# Features of the scene which drive the render time, see engine/cost.py
+# Uses the current render settings, so they should be the ones of the render in question
+def scene_features(scene: bpy.types.Scene) -> dict:
+    render = scene.render
+    scale = render.resolution_percentage / 100
+    features = {"pixels": int(render.resolution_x * scale) * int(render.resolution_y * scale),
+                "samples": scene.cycles.samples,
+                "bounces": scene.cycles.max_bounces,
+                "time_limit": scene.cycles.time_limit,
+                "faces": 0, "lights": 0, "instances": 0,
+                "transmission": 0.0, "emission": 0}
+    # evaluated, so modifiers (solidify) and point cloud instances count
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    for instance in depsgraph.object_instances:
+        obj = instance.object
+        if instance.is_instance:
+            features["instances"] += 1
+        if obj.type == "LIGHT":
+            features["lights"] += 1
+        elif obj.type == "MESH" and not instance.is_instance:
+            features["faces"] += len(obj.data.polygons)
+    for material in bpy.data.materials:
+        if not material.users or material.node_tree is None:
+            continue
+        for node in material.node_tree.nodes:
+            if node.type != "BSDF_PRINCIPLED":
+                continue
+            inputs = node.inputs
+            features["transmission"] = max(features["transmission"], float(inputs["Transmission"].default_value))
+            if inputs["Emission Strength"].default_value > 0 and any(inputs["Emission"].default_value[:3]):
+                features["emission"] = 1
+    return features
+
 def export_blend(filepath: str) -> None:
     bpy.ops.wm.save_as_mainfile(filepath=filepath, copy=True)
 
+# Save a copy of the current scene for a render worker, see engine/worker.py
+# Uncompressed, because it is loaded again right away
+def export_snapshot(filepath: str) -> None:
+    bpy.ops.wm.save_as_mainfile(filepath=filepath, copy=True, compress=False)
+
+# Write the images in files (all in the same directory) into a video using the sequencer,
+# in a scene of its own, so the current scene stays untouched
+def encode_image_sequence(files: list, output: str, fps: int) -> None:
+    scene = bpy.data.scenes.new("encode")
+    try:
+        scene.sequence_editor_create()
+        strip = scene.sequence_editor.sequences.new_image(
+            name="frames", filepath=files[0], channel=1, frame_start=1)
+        for file in files[1:]:
+            strip.elements.append(os.path.basename(file))
+        # the frames already went through the view transform
+        strip.colorspace_settings.name = "sRGB"
+        scene.view_settings.view_transform = "Standard"
+        
+        width, height = Image.open(files[0]).size
+        scene.render.resolution_x = width
+        scene.render.resolution_y = height
+        scene.render.resolution_percentage = 100
+        scene.render.fps = fps
+        scene.frame_start = 1
+        scene.frame_end = len(files)
+        scene.render.use_sequencer = True
+        scene.render.image_settings.file_format = "AVI_JPEG"
+        scene.render.filepath = output
+        with hide_output():
+            bpy.ops.render.render(animation=True, scene=scene.name)
+    finally:
+        bpy.data.scenes.remove(scene)
+
+# Load a scene saved with export_snapshot
+# base_dir: working directory of the program which saved it. Image paths are relative
+# to it ("//assets/..."), they are fixed up if they don't resolve next to the snapshot
+# remap: image paths as stored in the file -> files to use instead (e.g. on a render node)
+def load_snapshot(filepath: str, base_dir: str, remap: dict = None) -> None:
+    bpy.ops.wm.open_mainfile(filepath=filepath, load_ui=False)
+    for image in bpy.data.images:
+        if remap and image.filepath in remap:
+            image.filepath = remap[image.filepath]
+            continue
+        if not image.filepath.startswith("//") or os.path.exists(bpy.path.abspath(image.filepath)):
+            continue
+        candidate = os.path.join(base_dir, image.filepath[2:])
+        if os.path.exists(candidate):
+            image.filepath = candidate
+
+# External files the loaded scene needs for rendering (images which are not packed)
+# Returns (path as stored in the file, absolute path) of every existing file
+def scene_assets() -> list:
+    assets = []
+    for image in bpy.data.images:
+        if image.source not in ("FILE", "SEQUENCE", "MOVIE") or image.packed_file is not None:
+            continue
+        path = os.path.normpath(bpy.path.abspath(image.filepath))
+        if os.path.isfile(path):
+            assets.append((image.filepath, path))
+    return assets
+
 #scale obj down so that its bounding box fits into the unit cube (2 x 2 x 2)
 def scale_to_unit_cube(obj: bpy.types.Object) -> None:
     obj.dimensions = obj.dimensions / max(obj.dimensions) * 2 #downscaling
@@ -309,29 +877,38 @@ def convert_color_to_bpy(color: (int, int, int)) -> (float, float, float, float)
         case _:
             return None
 
-def generate_hdri_thumbnail(filepath):
+# output: thumbnail file, by default PATH_THUMB + <name of the HDRI>.png
+# Radiance .hdr files are read with HDRI/radiance.py, Blender only decodes other formats
+def generate_hdri_thumbnail(filepath, output: str = None):
     filename = os.path.basename(filepath)
+    if output is None:
+        output = PATH_THUMB + filename + ".png"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    if filepath.lower().endswith(".hdr"):
+        save_thumbnail(filepath, output)
+        return
     img = bpy.data.images.load(bpy.path.relpath(filepath))
     thumb_width, thumb_height = (256, 256)
     
-    # May be a good idea to use the module "tempfile" here
-    # But haven't figured out how to make blender save to this tempfile yet
-    temp_file = "assets/temp.png"
-    
     # blender doesn't support saving to buffer, so we write to file and then load it with PIL
-    img.save_render(temp_file, scene=bpy.context.scene)
-    image = Image.open(temp_file)
+    # the file is unique, several workers may make thumbnails at once
+    fd, temp_file = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    try:
+        img.save_render(temp_file, scene=bpy.context.scene)
+        with Image.open(temp_file) as opened:
+            image = opened.copy()
+    finally:
+        bpy.data.images.remove(img)
+        os.remove(temp_file)
 
     w, h = image.size
     CROP_FACTOR = h / 5
     area = (0, CROP_FACTOR, h-2*CROP_FACTOR, h-CROP_FACTOR)
     cropped = image.crop(area)
 
-    thumb = ImageOps.fit(cropped, (256, 256), Image.ANTIALIAS)
-    
-    if not os.path.exists(PATH_THUMB):
-        os.mkdir(PATH_THUMB)
-    thumb.save(PATH_THUMB + filename + ".png", "PNG")
+    thumb = ImageOps.fit(cropped, (thumb_width, thumb_height), Image.LANCZOS)
+    thumb.save(output, "PNG")
 
 # rotate obj around Z axis and angle
 def rotate_object(obj: bpy.types.Object, angle: float) -> None:
@@ -342,15 +919,79 @@ def rotate_object(obj: bpy.types.Object, angle: float) -> None:
 class Handler(enum.Enum):
     PER_FRAME = enum.auto()
     FINISHED  = enum.auto()
+    RENDER_PRE  = enum.auto()   # before each rendered frame
+    RENDER_POST = enum.auto()   # after each rendered frame
+    STATS = enum.auto()         # render statistics, called with the stats string instead of the scene
+
+def handler_list(handlertype: Handler) -> list:
+    return {Handler.PER_FRAME: bpy.app.handlers.frame_change_pre,
+            Handler.FINISHED: bpy.app.handlers.render_complete,
+            Handler.RENDER_PRE: bpy.app.handlers.render_pre,
+            Handler.RENDER_POST: bpy.app.handlers.render_post,
+            Handler.STATS: bpy.app.handlers.render_stats}[handlertype]
 
 def unregister_handler(render_handler, handlertype: Handler):
-    if handlertype == Handler.PER_FRAME:
-        bpy.app.handlers.frame_change_pre.remove(render_handler)
-    elif handlertype == Handler.FINISHED:
-        bpy.app.handlers.render_complete.remove(render_handler)
+    handlers = handler_list(handlertype)
+    if render_handler in handlers:
+        handlers.remove(render_handler)
 
 def register_handler(render_handler, handlertype: Handler):
-    if handlertype == Handler.PER_FRAME:
-        bpy.app.handlers.frame_change_pre.append(render_handler)
-    elif handlertype == Handler.FINISHED:
-        bpy.app.handlers.render_complete.append(render_handler)
\ No newline at end of file
+    handler_list(handlertype).append(render_handler)
+
+# Reports the progress of renders while they run, used as context manager around them
+# on_event(event) is called with
+#   {"stage": "frame", "frame"}                                 a frame starts rendering
+#   {"stage": "sample", "frame", "sample", "samples", "remaining"}  while it renders, at most every interval seconds
+#   {"stage": "rendered", "frame", "seconds"}                   the frame is finished
+# "remaining" are the seconds Cycles expects for the rest of the frame, None if it has no guess yet.
+# The stats handler may be called from a render thread, on_event must be thread-safe
+class RenderMonitor:
+    SAMPLE = re.compile(r"Sample (\d+)/(\d+)")
+    REMAINING = re.compile(r"Remaining:(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)")
+
+    def __init__(self, on_event, interval: float = 0.1):
+        self.on_event = on_event
+        self.interval = interval
+        self.frame = 0
+        self.frame_start = 0
+        self.last_sample = 0
+        self.handlers = ((self.frame_changed, Handler.PER_FRAME),
+                         (self.render_pre, Handler.RENDER_PRE),
+                         (self.render_post, Handler.RENDER_POST),
+                         (self.render_stats, Handler.STATS))
+
+    def __enter__(self):
+        for handler, handlertype in self.handlers:
+            register_handler(handler, handlertype)
+        return self
+
+    def __exit__(self, *exc):
+        for handler, handlertype in self.handlers:
+            unregister_handler(handler, handlertype)
+
+    def frame_changed(self, scene, *args):
+        self.frame = scene.frame_current
+
+    def render_pre(self, scene, *args):
+        self.frame = scene.frame_current
+        self.frame_start = time.monotonic()
+        self.last_sample = 0
+        self.on_event({"stage": "frame", "frame": self.frame})
+
+    def render_post(self, scene, *args):
+        self.on_event({"stage": "rendered", "frame": self.frame,
+                       "seconds": time.monotonic() - self.frame_start})
+
+    def render_stats(self, stats, *args):
+        match = self.SAMPLE.search(str(stats))
+        now = time.monotonic()
+        if match is None or now - self.last_sample < self.interval:
+            return
+        self.last_sample = now
+        remaining = self.REMAINING.search(str(stats))
+        if remaining is not None:
+            hours, minutes, seconds = remaining.groups()
+            remaining = int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+        self.on_event({"stage": "sample", "frame": self.frame,
+                       "sample": int(match.group(1)), "samples": int(match.group(2)),
+                       "remaining": remaining})